@@ -8,11 +8,13 @@ Names of the classes must be like `SomeModelAdmin`, where `SomeModel` must
 exactly match name of the model used in the project
 """
 from django.contrib import admin
-from django.contrib.admin import SimpleListFilter
+from django.contrib.admin import SimpleListFilter, helpers
 from django.contrib.auth.admin import UserAdmin
+from django.template.response import TemplateResponse
 from django.utils.translation import gettext as _
 from askbot import models
 from askbot.const import TAG_EMAIL_FILTER_FULL_STRATEGY_CHOICES
+from askbot.models.user_merge import merge_users
 from askbot.models.user_profile import USER_PROFILE_PROPERTIES
 
 
@@ -332,3 +334,44 @@ def user_admin_email_tag_filter_strategy(self, instance):
 
 
 UserAdmin.email_tag_filter_strategy = user_admin_email_tag_filter_strategy
+
+
+def merge_selected_users(modeladmin, request, queryset):
+    """merges the selected accounts into the oldest one,
+    after a confirmation page, like the `delete_selected` action"""
+    users = list(queryset.order_by('id'))
+    if len(users) < 2:
+        modeladmin.message_user(request, _('Select at least two accounts to merge'))
+        return None
+
+    if not request.POST.get('post'):
+        opts = modeladmin.model._meta
+        context = {
+            **modeladmin.admin_site.each_context(request),
+            'title': _('Are you sure?'),
+            'to_user': users[0],
+            'from_users': users[1:],
+            'queryset': queryset,
+            'opts': opts,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+            'media': modeladmin.media,
+        }
+        request.current_app = modeladmin.admin_site.name
+        return TemplateResponse(
+            request,
+            'admin/askbot/merge_selected_users_confirmation.html',
+            context
+        )
+
+    to_user = users[0]
+    for from_user in users[1:]:
+        to_user = merge_users(from_user, to_user)
+    data = {'count': len(users) - 1, 'username': to_user.username}
+    modeladmin.message_user(request, _('%(count)d accounts merged into %(username)s') % data)
+    return None
+
+merge_selected_users.short_description = _('Merge selected users into the oldest account')
+merge_selected_users.allowed_permissions = ('delete',)
+
+
+UserAdmin.actions = list(UserAdmin.actions or []) + [merge_selected_users]
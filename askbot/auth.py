@@ -8,9 +8,11 @@ Many of these functions are being replaced with assertions:
 User.assert_can...
 """
 from django.db import transaction
+from django.db.models import F, Subquery
+from django.db.models.functions import Greatest
 from django.utils import timezone
 from django.contrib.auth import logout as _logout
-from askbot.models import Repute
+from askbot.models import Post, Repute, Thread, UserStats
 # from askbot.models import Answer
 from askbot import signals
 from askbot.conf import settings as askbot_settings
@@ -271,16 +273,46 @@ def onAnswerAcceptCanceled(answer, user, timestamp=None):
     reputation.save()
 
 
+def update_post_vote_counts(post, up=0, down=0):
+    """Changes vote counts and the score of the post by `up` and `down`
+    upvotes and downvotes, with F-expression updates, which do not
+    rewrite the post rows and do not lose concurrent votes.
+    Score of a question post is also copied onto the thread.
+    The post object in memory is adjusted accordingly.
+    """
+    points = up - down
+    updates = {'points': F('points') + points}
+    post.points = int(post.points) + points
+    if post.post_type != 'comment':
+        if up:
+            updates['vote_up_count'] = Greatest(F('vote_up_count') + up, 0)
+            post.vote_up_count = max(int(post.vote_up_count) + up, 0)
+        if down:
+            updates['vote_down_count'] = Greatest(F('vote_down_count') + down, 0)
+            post.vote_down_count = max(int(post.vote_down_count) + down, 0)
+    Post.objects.filter(pk=post.pk).update(**updates)
+
+    if post.post_type == 'question':
+        #denormalize the question post score on the thread
+        post_points = Post.objects.filter(pk=post.pk).values('points')
+        Thread.objects.filter(pk=post.thread_id).update(
+                                    points=Subquery(post_points[:1]))
+        post.thread.points = post.points
+
+
+def get_reputed_question(post):
+    if post.post_type == 'question':
+        return post
+    return post.thread._question_post() #pylint: disable=protected-access
+
+
 @transaction.atomic
 def onUpVoted(vote, post, _user, timestamp=None):
     if timestamp is None:
         timestamp = timezone.now()
     vote.save()
 
-    if post.post_type != 'comment':
-        post.vote_up_count = int(post.vote_up_count) + 1
-    post.points = int(post.points) + 1
-    post.save()
+    update_post_vote_counts(post, up=1)
 
     if post.post_type == 'comment':
         # reputation is not affected by the comment votes
@@ -288,20 +320,19 @@ def onUpVoted(vote, post, _user, timestamp=None):
 
     if not (post.wiki or post.is_anonymous):
         author = post.author
-        todays_rep_gain = Repute.objects.get_reputation_by_upvoted_today(author)
-        if todays_rep_gain < askbot_settings.MAX_REP_GAIN_PER_USER_PER_DAY:
-            author.receive_reputation(
-                askbot_settings.REP_GAIN_FOR_RECEIVING_UPVOTE,
-                post.language_code)
-            author.save()
-
-            # TODO: this is suboptimal if post is already a question
-            question = post.thread._question_post() #pylint: disable=protected-access
+        points = askbot_settings.REP_GAIN_FOR_RECEIVING_UPVOTE
+        has_gain = UserStats.objects.add_upvote_reputation(
+                        author,
+                        points,
+                        limit=askbot_settings.MAX_REP_GAIN_PER_USER_PER_DAY
+                    )
+        if has_gain:
+            author.receive_reputation(points, post.language_code)
 
             reputation = Repute(
                 user=author,
-                positive=askbot_settings.REP_GAIN_FOR_RECEIVING_UPVOTE,
-                question=question,
+                positive=points,
+                question=get_reputed_question(post),
                 reputed_at=timestamp,
                 reputation_type=1,
                 reputation=author.reputation)
@@ -314,11 +345,7 @@ def onUpVotedCanceled(vote, post, _user, timestamp=None):
         timestamp = timezone.now()
     vote.delete()
 
-    if post.post_type != 'comment':
-        post.vote_up_count = max(int(post.vote_up_count) - 1, 0)
-
-    post.points = int(post.points) - 1
-    post.save()
+    update_post_vote_counts(post, up=-1)
 
     if post.post_type == 'comment':
         # comment votes do not affect reputation
@@ -326,18 +353,14 @@ def onUpVotedCanceled(vote, post, _user, timestamp=None):
 
     if not (post.wiki or post.is_anonymous):
         author = post.author
-        author.receive_reputation(
-            -askbot_settings.REP_GAIN_FOR_RECEIVING_UPVOTE,
-            post.language_code)
-        author.save()
-
-        # TODO: this is suboptimal if post is already a question
-        question = post.thread._question_post() #pylint: disable=protected-access
+        points = askbot_settings.REP_GAIN_FOR_RECEIVING_UPVOTE
+        UserStats.objects.add_upvote_reputation(author, -points)
+        author.receive_reputation(-points, post.language_code)
 
         reputation = Repute(
             user=author,
-            negative=-askbot_settings.REP_GAIN_FOR_RECEIVING_UPVOTE,
-            question=question,
+            negative=-points,
+            question=get_reputed_question(post),
             reputed_at=timestamp,
             reputation_type=-8,
             reputation=author.reputation)
@@ -350,19 +373,15 @@ def onDownVoted(vote, post, user, timestamp=None):
         timestamp = timezone.now()
     vote.save()
 
-    post.vote_down_count = int(post.vote_down_count) + 1
-    post.points = int(post.points) - 1
-    post.save()
+    update_post_vote_counts(post, down=1)
 
     if not (post.wiki or post.is_anonymous):
         author = post.author
         author.receive_reputation(
             askbot_settings.REP_LOSS_FOR_RECEIVING_DOWNVOTE,
             post.language_code)
-        author.save()
 
-        # TODO: this is suboptimal if post is already a question
-        question = post.thread._question_post() #pylint: disable=protected-access
+        question = get_reputed_question(post)
 
         reputation = Repute(
             user=author,
@@ -376,7 +395,6 @@ def onDownVoted(vote, post, user, timestamp=None):
         user.receive_reputation(
             askbot_settings.REP_LOSS_FOR_DOWNVOTING,
             post.language_code)
-        user.save()
 
         reputation = Repute(
             user=user,
@@ -394,19 +412,15 @@ def onDownVotedCanceled(vote, post, user, timestamp=None):
         timestamp = timezone.now()
     vote.delete()
 
-    post.vote_down_count = max(int(post.vote_down_count) - 1, 0)
-    post.points = post.points + 1
-    post.save()
+    update_post_vote_counts(post, down=-1)
 
     if not (post.wiki or post.is_anonymous):
         author = post.author
         author.receive_reputation(
             -askbot_settings.REP_LOSS_FOR_RECEIVING_DOWNVOTE,
             post.language_code)
-        author.save()
 
-        # TODO: this is suboptimal if post is already a question
-        question = post.thread._question_post() #pylint: disable=protected-access
+        question = get_reputed_question(post)
 
         reputation = Repute(
             user=author,
@@ -420,7 +434,6 @@ def onDownVotedCanceled(vote, post, user, timestamp=None):
         user.receive_reputation(
             -askbot_settings.REP_LOSS_FOR_DOWNVOTING,
             post.language_code)
-        user.save()
 
         reputation = Repute(
             user=user,
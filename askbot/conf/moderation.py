@@ -22,12 +22,21 @@ CONTENT_MODERATION_MODE_CHOICES = (
     ('premoderation', _('pre-moderate watched users and audit flagged posts')),
 )
 
+def content_moderation_mode_callback(old, new):
+    """question counts in the user stats depend
+    on the moderation mode, they are recounted on the next read"""
+    if old != new:
+        from askbot.models import UserStats
+        UserStats.objects.update(posts_are_stale=True)
+    return new
+
 settings.register(
     StringValue(
         MODERATION,
         'CONTENT_MODERATION_MODE',
         choices=CONTENT_MODERATION_MODE_CHOICES,
         default='flags',
+        update_callback=content_moderation_mode_callback,
         description=_('Content moderation method'),
         help_text=_(
             "Audit is made after the posts are published, pre-moderation "
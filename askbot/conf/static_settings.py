@@ -48,10 +48,13 @@ class AskbotStaticSettings(AppConf):
     DEBUG_INCOMING_EMAIL = False
     EXTRA_SKINS_DIR = None #None or path to directory with skins
     IP_MODERATION_ENABLED = False
+    JINJA2_BYTECODE_CACHE_DIR = None # directory of the compiled templates, django cache is used if None
     LANGUAGE_MODE = 'single-lang' # 'single-lang', 'url-lang' or 'user-lang'
     MAIN_PAGE_BASE_URL = pgettext('urls', 'questions') + '/'
     MAX_UPLOAD_FILE_SIZE = 1024 * 1024 #result in bytes
     NEW_ANSWER_FORM = None # path to custom form class
+    PAGE_CACHE_TIMEOUT = 600 # seconds the pages cached for anonymous visitors are fresh
+    PAGE_CACHE_STALE_TIMEOUT = 60*60 # seconds the stale pages are served while rendered anew
     POST_RENDERERS = { # generators of html from source content
             'plain-text': 'askbot.utils.markup.plain_text_input_converter',
             'markdown': 'askbot.utils.markup.markdown_input_converter',
@@ -64,7 +67,9 @@ class AskbotStaticSettings(AppConf):
     QUESTION_PAGE_BASE_URL = pgettext('urls', 'question') + '/'
     SERVICE_URL_PREFIX = 's/' # prefix for non-UI urls
     SELF_TEST = True # if true - run startup self-test
+    SPAM_CHECKER_ASYNC = False # if true - posts are checked for spam by a celery task
     SPAM_CHECKER_FUNCTION = 'askbot.spam_checker.akismet_spam_checker.is_spam'
+    SPAM_CHECKER_MODEL_FILE = None # model of the local spam classifier, see askbot_train_spam_classifier
     SPAM_CHECKER_API_KEY = None
     SPAM_CHECKER_API_URL = None
     SPAM_CHECKER_TIMEOUT_SECONDS = 1
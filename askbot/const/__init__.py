@@ -30,6 +30,11 @@ CLOSE_REASONS = (
 )
 
 LONG_TIME = 60*60*24*30 #30 days is a lot of time
+CACHE_INVALIDATION_BATCH_SIZE = 500 #threads per cache delete_many call
+#users contributing to more threads have their caches cleared by celery
+MAX_THREADS_TO_INVALIDATE_INLINE = 200
+#content of users with more posts is deleted by celery
+MAX_POSTS_TO_DELETE_INLINE = 200
 DATETIME_FORMAT = '%I:%M %p, %d %b %Y'
 
 SHARE_NOTHING = 0
@@ -160,6 +165,30 @@ ANSWERS_PAGE_SIZE = 10
 USER_POSTS_PAGE_SIZE = 10
 QUESTIONS_PER_PAGE_USER_CHOICES = ((10, '10'), (30, '30'), (50, '50'),)
 TAGS_PAGE_SIZE = 60
+TAG_AUTOCOMPLETE_MAX_ITEMS = 100 #max number of names per completion
+TAG_AUTOCOMPLETE_DEFAULT_ITEMS = 20
+TAG_INDEX_CACHE_TIMEOUT = 60*60 #tag index is rebuilt at least hourly
+TITLE_SEARCH_CACHE_TIMEOUT = 60 #search as you type results are cached briefly
+MODERATION_QUEUE_PAGE_SIZE = 50
+MODERATION_QUEUE_CACHE_TIMEOUT = 60*60*24 #rendered items are keyed by content hash
+USER_DATA_EXPORT_CHUNK_SIZE = 500
+USER_DATA_EXPORT_PROGRESS_CACHE_KEY = 'askbot-user-data-export-progress-%d'
+USER_DATA_EXPORT_PROGRESS_TIMEOUT = 60*60
+USER_CONTENT_DELETION_BATCH_SIZE = 500 #posts deleted in one transaction
+USER_CONTENT_DELETION_PROGRESS_CACHE_KEY = 'askbot-user-content-deletion-progress-%d'
+USER_CONTENT_DELETION_PROGRESS_TIMEOUT = 60*60
+SITEMAP_SECTION_SIZE = 2000 #thread ids per section, rendered sections must fit the cache
+SITEMAP_CACHE_TIMEOUT = 60*60*24*7 #sections are invalidated by thread changes
+FEED_CACHE_TIMEOUT = 60*60*24 #feeds are invalidated by post activity
+REMINDER_USER_BATCH_SIZE = 1000 #users processed together by the reminder commands
+GLOBAL_GROUP_VERSION_CACHE_KEY = 'askbot-global-group-version'
+USER_GROUPS_CACHE_KEY = 'askbot-user-groups-%d'
+GROUPS_CACHE_TIMEOUT = 60*60*24 #invalidated by the group and membership changes
+QUESTION_VIEW_CACHE_KEY = 'askbot-question-view-%d-%s'
+QUESTION_VIEW_CACHE_TIMEOUT = 60*60*24 #repeated anonymous views are counted at most daily
+PAGE_CACHE_VERSION_TIMEOUT = 60*60*24 #cached pages are invalidated by thread events
+PAGE_CACHE_REBUILD_TIMEOUT = 30 #stale page is served while one request renders it anew
+JINJA2_BYTECODE_CACHE_TIMEOUT = 60*60*24*7 #compiled templates are checked against the source
 
 UNANSWERED_QUESTION_MEANING_CHOICES = (
     ('NO_ANSWERS', _('Question has no answers')),
@@ -503,6 +532,9 @@ AVATAR_TYPE_CHOICES = AVATAR_TYPE_CHOICES_FOR_NEW_USERS + (
     ('a', _('Uploaded Avatar')),
 )
 
+#key of the settings token in the UserProfile.avatar_urls
+AVATAR_URLS_VERSION_KEY = 'version'
+
 #chars that can go before or after @mention
 TWITTER_STYLE_MENTION_TERMINATION_CHARS = '\n ;:,.!?<>"\''
 
@@ -19,3 +19,27 @@ class LoginFormTests(TestCase):
         self.assertFalse(result)
         self.assertEqual(form.initial.get('new_password'), None)
         #self.assertFalse('new_password_retyped' in form.cleaned_data)
+
+
+class EmailPatternMatcherTests(TestCase):
+
+    def test_combined_patterns(self):
+        from askbot.deps.django_authopenid.util import EmailPatternMatcher
+        matcher = EmailPatternMatcher(r' @spam\.com$  ^bot\d+@ ')
+        self.assertTrue(matcher.combined is not None)
+        self.assertTrue(matcher.matches('joe@spam.com'))
+        self.assertTrue(matcher.matches('bot12@example.com'))
+        self.assertFalse(matcher.matches('joe@example.com'))
+
+    def test_invalid_and_grouped_patterns(self):
+        from askbot.deps.django_authopenid.util import EmailPatternMatcher
+        matcher = EmailPatternMatcher(r'[invalid (\w)\1@ @spam\.com$')
+        self.assertEqual(len(matcher.separate), 1)
+        self.assertTrue(matcher.matches('aa@example.com'))
+        self.assertTrue(matcher.matches('joe@spam.com'))
+        self.assertFalse(matcher.matches('ab@example.com'))
+
+    def test_empty_patterns(self):
+        from askbot.deps.django_authopenid.util import EmailPatternMatcher
+        matcher = EmailPatternMatcher('   ')
+        self.assertFalse(matcher.matches('joe@example.com'))
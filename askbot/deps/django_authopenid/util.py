@@ -44,18 +44,62 @@ ALLOWED_LOGIN_TYPES = (
 def get_next_url_from_session(session):
     return session.pop('next_url', None) or reverse('index')
 
-def email_is_blacklisted(email):
+class EmailPatternMatcher:
+    """Matches email addresses against a whitespace-separated
+    list of regular expressions.
+
+    Patterns are compiled once. Patterns without capturing groups
+    are joined into a single alternation, so a lookup is one regex
+    scan no matter how many patterns there are. Patterns with groups
+    (which may use backreferences) and patterns that cannot be
+    combined are matched separately. Invalid patterns are ignored.
+    """
+    def __init__(self, patterns):
+        self.patterns = patterns
+        combinable = list()
+        separate = list()
+        for pattern in patterns.strip().split():
+            try:
+                regex = re.compile(fr'{pattern}')
+            except Exception: # pylint: disable=broad-except
+                continue
+            if regex.groups:
+                separate.append(regex)
+            else:
+                combinable.append(pattern)
+
+        self.combined = None
+        if combinable:
+            try:
+                self.combined = re.compile('|'.join(f'(?:{p})' for p in combinable))
+            except Exception: # pylint: disable=broad-except
+                #e.g. inline global flags are only allowed at the start
+                separate = [re.compile(p) for p in combinable] + separate
+        self.separate = tuple(separate)
+
+    def matches(self, email):
+        """True if any of the patterns is found in the email"""
+        if self.combined and self.combined.search(email):
+            return True
+        return any(regex.search(email) for regex in self.separate)
+
+
+_BLACKLIST_MATCHER = EmailPatternMatcher('')
+
+def get_email_blacklist_matcher():
+    """returns matcher for the current value of
+    `BLACKLISTED_EMAIL_PATTERNS`, the matcher is rebuilt
+    only when the setting value changes"""
+    global _BLACKLIST_MATCHER # pylint: disable=global-statement
     patterns = askbot_settings.BLACKLISTED_EMAIL_PATTERNS
-    patterns = patterns.strip().split()
-    for pattern in patterns:
-        try:
-            regex = re.compile(fr'{pattern}')
-        except Exception: # pylint: disable=broad-except
-            pass
-        else:
-            if regex.search(email):
-                return True
-    return False
+    matcher = _BLACKLIST_MATCHER
+    if matcher.patterns != patterns:
+        matcher = EmailPatternMatcher(patterns)
+        _BLACKLIST_MATCHER = matcher
+    return matcher
+
+def email_is_blacklisted(email):
+    return get_email_blacklist_matcher().matches(email)
 
 
 class OpenID:
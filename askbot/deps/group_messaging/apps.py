@@ -1,5 +1,7 @@
 from django.apps import AppConfig
 
 class AskbotConfig(AppConfig):
-    name = 'AskbotMessaging'
+    name = 'askbot.deps.group_messaging'
+    label = 'group_messaging'
     verbose_name = 'Askbot Messaging'
+    default_auto_field = 'django.db.models.AutoField'
@@ -0,0 +1,18 @@
+from django.core.management import BaseCommand
+from askbot.models import User
+from askbot.utils.console import ProgressBar
+from askbot.deps.group_messaging.models import InboxEntry
+from askbot.deps.group_messaging.models import get_unread_inbox_counter
+
+class Command(BaseCommand):
+    help = 'Recreates inbox entries and unread counts of all users'
+
+    def handle(self, *args, **kwargs):
+        users = User.objects.all()
+        count = users.count()
+        message = 'Rebuilding inbox entries for the users'
+        for user in ProgressBar(users.iterator(), count, message):
+            InboxEntry.objects.rebuild_for_user(user)
+            counter = get_unread_inbox_counter(user)
+            counter.recalculate()
+            counter.save()
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('group_messaging', '0002_auto_20190911_0735'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InboxEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_active_at', models.DateTimeField()),
+                ('responses_count', models.PositiveIntegerField(default=0)),
+                ('senders_info', models.TextField(default='')),
+                ('status', models.SmallIntegerField(choices=[(0, 'seen'), (1, 'archived'), (2, 'deleted')], default=0)),
+                ('is_received', models.BooleanField(default=False)),
+                ('is_sent', models.BooleanField(default=False)),
+                ('is_unread', models.BooleanField(default=True)),
+                ('sender', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('thread', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inbox_entries', to='group_messaging.Message')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='group_messaging_inbox_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'thread')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='inboxentry',
+            index=models.Index(fields=['user', 'status', '-last_active_at'], name='gm_inbox_user_status_active'),
+        ),
+    ]
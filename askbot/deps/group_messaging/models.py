@@ -24,6 +24,7 @@ import urllib.request, urllib.parse, urllib.error
 
 MAX_HEADLINE_LENGTH = 80
 MAX_SUBJECT_LINE_LENGTH = 30
+INBOX_THREADS_PER_PAGE = 50
 
 #dummy parse message function
 parse_message = lambda v: v
@@ -139,6 +140,215 @@ class MessageMemo(models.Model):
         app_label = 'group_messaging'
 
 
+class InboxEntryManager(models.Manager):
+    """model manager for the :class:`InboxEntry`"""
+
+    def get_inbox(self, user, sender_id=None):
+        """entries of threads received by the user,
+        optionally - only of those started by the sender"""
+        entries = self.filter(
+                        user=user,
+                        is_received=True,
+                        status=MessageMemo.SEEN
+                    )
+        if sender_id:
+            entries = entries.filter(sender_id=sender_id)
+        return entries
+
+    def get_sent(self, user):
+        """entries of threads started or responded to by the user"""
+        return self.filter(user=user, is_sent=True, status=MessageMemo.SEEN)
+
+    def get_archived(self, user):
+        """entries of threads archived by the user"""
+        return self.filter(user=user, status=MessageMemo.ARCHIVED)
+
+    def get_unread_count(self, user):
+        """number of unread threads in the inbox of the user"""
+        return self.get_inbox(user).filter(is_unread=True).count()
+
+    def add_thread(self, thread):
+        """creates entries of a new thread for
+        the recipients and the sender"""
+        entry_data = {
+            'thread': thread,
+            'sender_id': thread.sender_id,
+            'last_active_at': thread.last_active_at,
+            'senders_info': thread.senders_info
+        }
+        entries = [
+            self.model(user=user, is_received=True, **entry_data)
+            for user in thread.get_recipients_users()
+        ]
+        entries.append(
+            self.model(
+                user_id=thread.sender_id,
+                is_sent=True,
+                is_unread=False,
+                **entry_data
+            )
+        )
+        self.bulk_create(entries)
+
+    def add_response(self, message):
+        """updates entries of the thread upon a new response
+        and adds entries for the new participants"""
+        root = message.get_root_message()
+        entries = self.filter(thread=root)
+        entries.update(
+            last_active_at=root.last_active_at,
+            senders_info=root.senders_info,
+            responses_count=models.F('responses_count') + 1
+        )
+        #own response does not make the thread unread
+        entries.exclude(user_id=message.sender_id).update(is_unread=True)
+        entries.filter(user_id=message.sender_id).update(is_sent=True)
+
+        recipient_ids = set(
+            message.get_recipients_users().values_list('id', flat=True)
+        )
+        entries.filter(
+            user_id__in=recipient_ids,
+            is_received=False
+        ).update(is_received=True)
+
+        existing_ids = set(entries.values_list('user_id', flat=True))
+        new_recipient_ids = recipient_ids - existing_ids
+        add_responder = message.sender_id not in existing_ids
+        if not (new_recipient_ids or add_responder):
+            return
+
+        entry_data = {
+            'thread': root,
+            'sender_id': root.sender_id,
+            'last_active_at': root.last_active_at,
+            'senders_info': root.senders_info,
+            'responses_count': root.descendants.count()
+        }
+        new_entries = [
+            self.model(user_id=user_id, is_received=True, **entry_data)
+            for user_id in new_recipient_ids
+        ]
+        if add_responder:
+            new_entries.append(
+                self.model(
+                    user_id=message.sender_id,
+                    is_sent=True,
+                    is_unread=False,
+                    **entry_data
+                )
+            )
+        self.bulk_create(new_entries)
+
+    def rebuild_for_user(self, user):
+        """recreates entries of the user from the messages,
+        memos and last visit times"""
+        self.filter(user=user).delete()
+        roots = Message.objects.filter(root=None, message_type=Message.STORED)
+        received_ids = set(
+            roots.filter(
+                recipients__in=user.groups.all()
+            ).values_list('id', flat=True)
+        )
+        sent_ids = set(roots.filter(sender=user).values_list('id', flat=True))
+        responded_ids = Message.objects.filter(
+                                    sender=user,
+                                    message_type=Message.STORED
+                                ).exclude(
+                                    root=None
+                                ).values_list('root_id', flat=True)
+        sent_ids.update(responded_ids)
+
+        thread_ids = received_ids | sent_ids
+        statuses = dict(
+            MessageMemo.objects.filter(
+                user=user,
+                message_id__in=thread_ids
+            ).values_list('message_id', 'status')
+        )
+        threads = roots.filter(
+                            id__in=thread_ids
+                        ).annotate(
+                            responses_count=models.Count('descendants')
+                        )
+        entries = list()
+        for thread in threads:
+            entries.append(
+                self.model(
+                    user=user,
+                    thread=thread,
+                    sender_id=thread.sender_id,
+                    last_active_at=thread.last_active_at,
+                    senders_info=thread.senders_info,
+                    responses_count=thread.responses_count,
+                    status=statuses.get(thread.id, MessageMemo.SEEN),
+                    is_received=(thread.id in received_ids),
+                    is_sent=(thread.id in sent_ids),
+                    is_unread=thread.is_unread_by_user(user)
+                )
+            )
+        self.bulk_create(entries)
+
+
+class InboxEntry(models.Model):
+    """Denormalized per-user record about a conversation
+    in the user's mailbox, so that the thread lists
+    and the unread counts are read with a single query,
+    instead of joining through the recipient groups and memos.
+
+    Entries are created and updated upon the `thread_created`
+    and `response_created` signals and follow the memos
+    and the last visit times of the user.
+    """
+    user = models.ForeignKey(
+                    User,
+                    related_name='group_messaging_inbox_entries',
+                    on_delete=models.CASCADE
+                )
+    thread = models.ForeignKey(
+                    'Message',
+                    related_name='inbox_entries',
+                    on_delete=models.CASCADE
+                )
+    #sender of the root message
+    sender = models.ForeignKey(
+                    User,
+                    related_name='+',
+                    on_delete=models.CASCADE
+                )
+    last_active_at = models.DateTimeField()
+    responses_count = models.PositiveIntegerField(default=0)
+    senders_info = models.TextField(default='')
+    status = models.SmallIntegerField(
+            choices=MessageMemo.STATUS_CHOICES, default=MessageMemo.SEEN
+        )
+    #True, if user is among the recipients of the thread
+    is_received = models.BooleanField(default=False)
+    #True, if user started the thread or responded to it
+    is_sent = models.BooleanField(default=False)
+    is_unread = models.BooleanField(default=True)
+
+    objects = InboxEntryManager()
+
+    class Meta:
+        unique_together = ('user', 'thread')
+        indexes = [
+            models.Index(
+                fields=['user', 'status', '-last_active_at'],
+                name='gm_inbox_user_status_active'
+            ),
+        ]
+        app_label = 'group_messaging'
+
+    def get_senders_info(self, user):
+        """names of the conversation participants,
+        except the `user`"""
+        senders_names = self.senders_info.split(',')
+        if user.username in senders_names:
+            senders_names.remove(user.username)
+        return ', '.join(senders_names)
+
+
 class MessageManager(models.Manager):
     """model manager for the :class:`Message`"""
 
@@ -492,6 +702,8 @@ class Message(models.Model):
             archived_filter['user'] = user
         memos = self.memos.filter(**archived_filter)
         memos.delete()
+        entries = self.inbox_entries.filter(**archived_filter)
+        entries.update(status=MessageMemo.SEEN)
 
     def set_status_for_user(self, status, user):
         """set specific status to the message for the user"""
@@ -547,10 +759,7 @@ class UnreadInboxCounter(models.Model):
         """recalculates count of unread messages
         for the user and sets the updated value.
         Does not call .save()"""
-        self.reset()
-        for thread in Message.objects.get_threads(recipient=self.user):
-            if thread.is_unread_by_user(self.user):
-                self.increment()
+        self.count = InboxEntry.objects.get_unread_count(self.user)
 
     class Meta:
         app_label = 'group_messaging'
@@ -580,6 +789,31 @@ def send_email(sender, message, **kwargs):
     message.send_email_alert()
 
 
+def add_thread_to_inboxes(sender, message, **kwargs):
+    InboxEntry.objects.add_thread(message)
+
+
+def add_response_to_inboxes(sender, message, **kwargs):
+    InboxEntry.objects.add_response(message)
+
+
+def update_inbox_entry_status(sender, instance, **kwargs):
+    """copies status of the memo onto the inbox entry"""
+    InboxEntry.objects.filter(
+                    user_id=instance.user_id,
+                    thread_id=instance.message_id
+                ).update(status=instance.status)
+
+
+def mark_inbox_entry_as_read(sender, instance, **kwargs):
+    """thread is read, if visited after the last response"""
+    InboxEntry.objects.filter(
+                    user_id=instance.user_id,
+                    thread_id=instance.message_id,
+                    last_active_at__lte=instance.at
+                ).update(is_unread=False)
+
+
 thread_created.connect(
     receiver=send_email,
     dispatch_uid="thread_send_email"
@@ -599,3 +833,25 @@ response_created.connect(
     receiver=increment_unread_inbox_counters,
     dispatch_uid="response_increment_unread_inbox_counters"
 )
+
+thread_created.connect(
+    receiver=add_thread_to_inboxes,
+    dispatch_uid="thread_add_to_inboxes"
+)
+
+response_created.connect(
+    receiver=add_response_to_inboxes,
+    dispatch_uid="response_add_to_inboxes"
+)
+
+signals.post_save.connect(
+    update_inbox_entry_status,
+    sender=MessageMemo,
+    dispatch_uid="update_inbox_entry_status_on_memo_save"
+)
+
+signals.post_save.connect(
+    mark_inbox_entry_as_read,
+    sender=LastVisitTime,
+    dispatch_uid="mark_inbox_entry_as_read_on_visit"
+)
@@ -1,4 +1,5 @@
 import django.dispatch
 
-thread_created = django.dispatch.Signal(providing_args=['message',])
-response_created = django.dispatch.Signal(providing_args=['message',])
+#both signals send argument `message`
+thread_created = django.dispatch.Signal()
+response_created = django.dispatch.Signal()
@@ -12,8 +12,7 @@ import copy
 from django.template.loader import get_template
 from django.template import Context
 from django.contrib.auth.models import User
-from django.db import models
-from django.db.models import Q
+from django.core.paginator import Paginator
 from django.forms import IntegerField
 from django.http import HttpResponse
 from django.http import HttpResponseNotAllowed
@@ -21,6 +20,8 @@ from django.http import HttpResponseForbidden
 import json
 from django.utils import timezone
 from askbot.utils.views import PjaxView
+from askbot.deps.group_messaging.models import INBOX_THREADS_PER_PAGE
+from askbot.deps.group_messaging.models import InboxEntry
 from askbot.deps.group_messaging.models import Message
 from askbot.deps.group_messaging.models import MessageMemo
 from askbot.deps.group_messaging.models import SenderList
@@ -143,65 +144,44 @@ class ThreadsList(PjaxView):
         else:
             user = request.user
 
-        #get threads and the last visit time
         sender_id = IntegerField().clean(request.GET.get('sender_id',request.POST.get('sender_id', '-1')))
+        page_number = IntegerField(required=False).clean(
+                                request.GET.get('page', request.POST.get('page'))
+                            )
 
         if sender_id == -2:
-            received = Message.objects.get_threads(recipient=user, deleted=True)
-            sent = Message.objects.get_threads(sender=user, deleted=True)
-            threads = (received | sent).distinct()
+            entries = InboxEntry.objects.get_archived(user)
         elif sender_id == -1:
-            threads = Message.objects.get_threads(recipient=user)
+            entries = InboxEntry.objects.get_inbox(user)
         elif sender_id == user.id:
-            threads = Message.objects.get_sent_threads(sender=user)
+            entries = InboxEntry.objects.get_sent(user)
         else:
-            sender = User.objects.get(id=sender_id)
-            threads = Message.objects.get_threads(
-                                            recipient=user,
-                                            sender=sender
-                                        )
-        threads = threads.order_by('-last_active_at')
+            entries = InboxEntry.objects.get_inbox(user, sender_id=sender_id)
+        entries = entries.select_related('thread').order_by('-last_active_at')
+
+        paginator = Paginator(entries, INBOX_THREADS_PER_PAGE)
+        page = paginator.get_page(page_number)
 
         #for each thread we need to know if there is something
         #unread for the user - to mark "new" threads as bold
+        threads = list()
         threads_data = dict()
-        for thread in threads:
-            thread_data = dict()
-            #determine status
-            thread_data['status'] = 'new'
-            #determine the senders info
-            senders_names = thread.senders_info.split(',')
-            if user.username in senders_names:
-                senders_names.remove(user.username)
-            thread_data['senders_info'] = ', '.join(senders_names)
-            thread_data['thread'] = thread
-            threads_data[thread.id] = thread_data
-
-        ids = [thread.id for thread in threads]
-        counts = Message.objects.filter(
-                                id__in=ids
-                            ).annotate(
-                                responses_count=models.Count('descendants')
-                            ).values('id', 'responses_count')
-        for count in counts:
-            thread_id = count['id']
-            responses_count = count['responses_count']
-            threads_data[thread_id]['responses_count'] = responses_count
-
-        last_visit_times = LastVisitTime.objects.filter(
-                                            user=user,
-                                            message__in=threads
-                                        )
-        for last_visit in last_visit_times:
-            thread_data = threads_data[last_visit.message_id]
-            if thread_data['thread'].last_active_at <= last_visit.at:
-                thread_data['status'] = 'seen'
+        for entry in page.object_list:
+            thread = entry.thread
+            threads.append(thread)
+            threads_data[thread.id] = {
+                'status': 'new' if entry.is_unread else 'seen',
+                'senders_info': entry.get_senders_info(user),
+                'responses_count': entry.responses_count,
+                'thread': thread
+            }
 
         return {
             'threads': threads,
-            'threads_count': threads.count(),
+            'threads_count': paginator.count,
             'threads_data': threads_data,
-            'sender_id': sender_id
+            'sender_id': sender_id,
+            'page': page
         }
 
 
@@ -14,26 +14,100 @@
 #encoding:utf-8
 from django.contrib.syndication.views import Feed
 
+import hashlib
 import itertools
+import uuid
 import askbot.utils.timezone
 
 from django.conf import settings as django_settings
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.urls import reverse
-from django.http import Http404
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import parse_etags, parse_http_date_safe
 from django.utils.translation import gettext as _
 
+from askbot import const
+from askbot import spam_checker
 from askbot.utils.translation import get_language
 from askbot.conf import settings as askbot_settings
 from askbot.models import Post
 from askbot.utils.html import site_url
 
 def get_content_filter():
-    if askbot_settings.CONTENT_MODERATION_MODE == 'premoderation':
+    if askbot_settings.CONTENT_MODERATION_MODE == 'premoderation' \
+        or spam_checker.is_async():
         return {'approved': True}
     return {}
 
-class RssIndividualQuestionFeed(Feed):
+FEED_VERSION_CACHE_KEY = 'askbot-feed-version'
+
+def get_feed_version():
+    """returns version token of the cached feeds"""
+    version = cache.get(FEED_VERSION_CACHE_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.set(FEED_VERSION_CACHE_KEY, version, const.FEED_CACHE_TIMEOUT)
+    return version
+
+def invalidate_feeds():
+    """all cached feeds will be rendered anew"""
+    cache.delete(FEED_VERSION_CACHE_KEY)
+
+
+class CachedFeedMixin(object):
+    """Caches rendered feeds until the next post activity
+    and answers conditional requests with 304 responses.
+
+    ETag is derived from the cache key, which includes the version
+    token of the feeds, so a request with a matching If-None-Match
+    header costs one cache lookup"""
+
+    def get_cache_key_parts(self, request, *args, **kwargs):
+        """returns tuple of values, which
+        distinguish the feed contents"""
+        raise NotImplementedError()
+
+    def get_cache_key(self, request, *args, **kwargs):
+        parts = (get_language(), askbot_settings.CONTENT_MODERATION_MODE)
+        parts += self.get_cache_key_parts(request, *args, **kwargs)
+        digest = hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+        return 'askbot-feed-%s-%s' % (get_feed_version(), digest)
+
+    def __call__(self, request, *args, **kwargs):
+        if not askbot_settings.RSS_ENABLED:
+            raise Http404
+
+        cache_key = self.get_cache_key(request, *args, **kwargs)
+        etag = quote_etag(hashlib.md5(cache_key.encode('utf-8')).hexdigest())
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        data = cache.get(cache_key)
+        if data is None:
+            response = super(CachedFeedMixin, self).__call__(request, *args, **kwargs)
+            data = {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'last_modified': response.get('Last-Modified')
+            }
+            cache.set(cache_key, data, const.FEED_CACHE_TIMEOUT)
+
+        response = HttpResponse(data['content'], content_type=data['content_type'])
+        response['ETag'] = etag
+        last_modified = None
+        if data['last_modified']:
+            response['Last-Modified'] = data['last_modified']
+            last_modified = parse_http_date_safe(data['last_modified'])
+        return get_conditional_response(
+            request, etag=etag, last_modified=last_modified, response=response
+        )
+
+
+class RssIndividualQuestionFeed(CachedFeedMixin, Feed):
     """rss feed class for particular questions
     """
 
@@ -52,11 +126,15 @@ class RssIndividualQuestionFeed(Feed):
         # hack to get the request object into the Feed class
         self.request = request
         question = Post.objects.get_questions().get(id__exact = pk)
-        if askbot_settings.CONTENT_MODERATION_MODE == 'premoderation':
+        if askbot_settings.CONTENT_MODERATION_MODE == 'premoderation' \
+            or spam_checker.is_async():
             if question.approved == False:
                 raise Http404
         return question
 
+    def get_cache_key_parts(self, request, pk):
+        return ('question', int(pk))
+
     def item_link(self, item):
         """get full url to the item
         """
@@ -113,7 +191,7 @@ class RssIndividualQuestionFeed(Feed):
         return item.text
 
 
-class RssLastestQuestionsFeed(Feed):
+class RssLastestQuestionsFeed(CachedFeedMixin, Feed):
     """rss feed class for the latest questions
     """
 
@@ -126,6 +204,11 @@ class RssLastestQuestionsFeed(Feed):
     def description(self):
         return askbot_settings.APP_DESCRIPTION
 
+    def get_cache_key_parts(self, request):
+        query = request.GET.get('q', '').strip()
+        tags = tuple(sorted(set(request.GET.getlist('tags'))))
+        return ('questions', query, tags)
+
     def item_link(self, item):
         """get full url to the item
         """
@@ -1,20 +1,28 @@
 
 #todo: http://stackoverflow.com/questions/837828/how-to-use-a-slug-in-django
 DEBUGME = False
+import json
 import os
 import re
 import sys
 from unidecode import unidecode
 import zipfile
+from collections import defaultdict
+from django.apps import apps
 from django.conf import settings as django_settings
+from django.core import management
+from django.core.exceptions import FieldDoesNotExist
 from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 import askbot.importers.stackexchange.parse_models as se_parser
 from xml.etree import ElementTree as et
-from django.db.models import fields
+from django.db.transaction import atomic
 from django.db.utils import IntegrityError
 from django.db import models
 import askbot.models as askbot
+from askbot import signals
+from askbot.models.tag_index import TagPrefixIndex
+from askbot.utils.translation import get_language_codes
 import askbot.deps.django_authopenid.models as askbot_openid
 import askbot.importers.stackexchange.models as se
 from askbot.forms import EditUserEmailFeedsForm
@@ -63,6 +71,78 @@ ANSWER = {}
 COMMENT = {}
 NUMBERED_NAME_RE = re.compile(r'^(.*)\*(\d+)\*$')
 
+#stages of the data transfer from the SE tables to askbot,
+#(name, title, method name), each stage runs in one transaction
+TRANSFER_STAGES = (
+    ('users', 'Transferring users...', 'transfer_users'),
+    ('revisions', 'Transferring content edits...', 'transfer_question_and_answer_activity'),
+    ('view_counts', 'Transferring view counts...', 'transfer_question_view_counts'),
+    ('comments', 'Transferring comments...', 'transfer_comments'),
+    ('badges', 'Transferring badges and badge awards...', 'transfer_badges'),
+    ('qa_votes', 'Transferring Q&A votes...', 'transfer_QA_votes'),
+    ('comment_votes', 'Transferring comment votes...', 'transfer_comment_votes'),
+    ('messages', 'Transferring messages...', 'transfer_all_messages'),
+    ('preferences', 'Transferring preferences...', 'transfer_preferences'),
+    ('derived_data', 'Rebuilding counters and caches...', 'rebuild_derived_data'),
+)
+
+#SE id --> askbot id maps, kept in the checkpoint file
+ID_MAPS = (
+    ('users', USER, askbot.User),
+    ('questions', QUESTION, askbot.Post),
+    ('answers', ANSWER, askbot.Post),
+    ('comments', COMMENT, askbot.Post),
+)
+
+
+class ImportCheckpoint(object):
+    """Progress of the import, stored in a json file,
+    so that an interrupted import can be resumed.
+
+    Remembers numbers of rows read from each of the
+    dump files, completed transfer stages and the
+    SE id --> askbot id maps"""
+
+    def __init__(self, path):
+        self.path = path
+        self.data = {'files': {}, 'stages': [], 'id_maps': {}}
+        if os.path.isfile(path):
+            with open(path, 'r') as checkpoint_file:
+                self.data.update(json.load(checkpoint_file))
+
+    def save(self):
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as checkpoint_file:
+            json.dump(self.data, checkpoint_file)
+        os.replace(temp_path, self.path)
+
+    def reset(self):
+        self.data = {'files': {}, 'stages': [], 'id_maps': {}}
+        self.save()
+
+    def get_rows_read(self, xml_path):
+        """number of rows of the file saved in the database,
+        -1 if file was read completely"""
+        return self.data['files'].get(xml_path, 0)
+
+    def set_rows_read(self, xml_path, count):
+        self.data['files'][xml_path] = count
+        self.save()
+
+    def is_stage_done(self, name):
+        return name in self.data['stages']
+
+    def mark_stage_done(self, name):
+        self.data['stages'].append(name)
+        self.save()
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def set(self, key, value):
+        self.data[key] = value
+        self.save()
+
 class X(object):#
     """class with methods for handling some details
     of SE --> ASKBOT mapping
@@ -298,6 +378,7 @@ it may be helpful to split this procedure in two:\n
     args = 'se_dump_dir'
 
     def add_arguments(self, parser):
+        parser.add_argument('args', nargs='*', help='path to the SE dump .zip file')
         parser.add_argument(
             '-r', '--read-dump',
             action='store_true',
@@ -309,6 +390,23 @@ it may be helpful to split this procedure in two:\n
             dest='process_data',
             default=False,
             help='Only process the data, assuming that the dump is loaded')
+        parser.add_argument('--chunk-size',
+            action='store',
+            type=int,
+            dest='chunk_size',
+            default=1000,
+            help='Number of rows inserted into the database at once')
+        parser.add_argument('--checkpoint',
+            action='store',
+            dest='checkpoint',
+            default=None,
+            help='Path of the file with the import progress, '
+                 'by default - <dump file>.checkpoint')
+        parser.add_argument('--restart',
+            action='store_true',
+            dest='restart',
+            default=False,
+            help='Ignore the saved progress and start from the beginning')
 
     def handle(self, *arg, **kwarg):
 
@@ -340,13 +438,17 @@ it may be helpful to split this procedure in two:\n
         if len(arg) < 1 or not os.path.isfile(arg[0]):
             raise CommandError('Error: first argument must be a zip file with the SE forum data')
 
+        self.chunk_size = max(kwarg['chunk_size'], 1)
+        self.checkpoint = ImportCheckpoint(kwarg['checkpoint'] or arg[0] + '.checkpoint')
+        if kwarg['restart']:
+            self.checkpoint.reset()
+
         if kwarg['read_dump']:
             self.zipfile = self.open_dump(arg[0])
             #read the data into SE tables
             for item in xml_read_order:
                 time_before = timezone.now()
                 self.load_xml_file(item)
-                transaction.commit()
                 time_after = timezone.now()
                 if DEBUGME == True:
                     print(time_after - time_before)
@@ -361,60 +463,76 @@ it may be helpful to split this procedure in two:\n
         #this is important so that when we clean up messages
         #automatically generated by the procedures below
         #we do not delete old messages
-        #todo: unfortunately this may need to be redone
-        #when we upgrade to django 1.2 and definitely by 1.4 when
-        #the current message system will be replaced with the
-        #django messages framework
         self.save_askbot_message_id_list()
 
-        #transfer data into ASKBOT tables
-        print('Transferring users...')
-        self.transfer_users()
-        transaction.commit()
-        print('done.')
-        print('Transferring content edits...')
-        sys.stdout.flush()
-        self.transfer_question_and_answer_activity()
-        transaction.commit()
-        print('done.')
-        print('Transferring view counts...')
-        sys.stdout.flush()
-        self.transfer_question_view_counts()
-        transaction.commit()
-        print('done.')
-        print('Transferring comments...')
-        sys.stdout.flush()
-        self.transfer_comments()
-        transaction.commit()
-        print('done.')
-        print('Transferring badges and badge awards...')
-        sys.stdout.flush()
-        self.transfer_badges()
-        transaction.commit()
-        print('done.')
-        print('Transferring Q&A votes...')
-        sys.stdout.flush()
-        self.transfer_QA_votes()#includes favorites, accepts and flags
-        transaction.commit()
-        print('done.')
-        print('Transferring comment votes...')
-        sys.stdout.flush()
-        self.transfer_comment_votes()
-        transaction.commit()
-
+        #transfer data into ASKBOT tables, with the signals disabled,
+        #the derived data is rebuilt in the last stage
+        signal_data = signals.pop_all_db_signal_receivers()
+        try:
+            self.load_id_maps()
+            for name, title, method_name in TRANSFER_STAGES:
+                if self.checkpoint.is_stage_done(name):
+                    print('%s already done' % title)
+                    continue
+                print(title)
+                sys.stdout.flush()
+                with atomic():
+                    getattr(self, method_name)()
+                self.save_id_maps()
+                self.checkpoint.mark_stage_done(name)
+                print('done.')
+        finally:
+            signals.set_all_db_signal_receivers(signal_data)
+
+    def load_id_maps(self):
+        """restores SE id --> askbot object maps
+        saved in the checkpoint"""
+        saved_maps = self.checkpoint.get('id_maps', {})
+        for name, id_map, model in ID_MAPS:
+            saved_map = saved_maps.get(name)
+            if not saved_map:
+                continue
+            objects = model.objects.in_bulk(list(saved_map.values()))
+            for se_id, askbot_id in saved_map.items():
+                if askbot_id in objects:
+                    id_map[int(se_id)] = objects[askbot_id]
+
+    def save_id_maps(self):
+        saved_maps = dict()
+        for name, id_map, model in ID_MAPS:
+            saved_maps[name] = dict((se_id, obj.id) for se_id, obj in id_map.items())
+        self.checkpoint.set('id_maps', saved_maps)
+
+    def transfer_all_messages(self):
         self.cleanup_messages()#delete autogenerated messages
-        transaction.commit()
         self.transfer_messages()
-        transaction.commit()
 
+    def transfer_preferences(self):
         #todo: these are not clear how to go about
         self.transfer_update_subscriptions()
-        transaction.commit()
         self.transfer_tag_preferences()
-        transaction.commit()
         self.transfer_meta_pages()
-        transaction.commit()
-        print('done.')
+
+    def rebuild_derived_data(self):
+        """recomputes data normally maintained by
+        the signal handlers, which are off during the import.
+        Search vectors of the posts are updated by the database
+        triggers, when these are installed"""
+        threads = askbot.Thread.objects.all()
+        message = 'Recounting answers and favorites'
+        for thread in ProgressBar(threads.iterator(), threads.count(), message):
+            thread.update_answer_count()
+            thread.update_favorite_count()
+        askbot.Thread.objects.clear_cached_data(threads.values_list('id', flat=True))
+
+        for language_code in get_language_codes():
+            TagPrefixIndex.invalidate(language_code)
+
+        management.call_command('askbot_add_users_to_default_groups')
+        management.call_command('add_missing_subscriptions')
+        management.call_command('askbot_rebuild_user_stats')
+        if getattr(django_settings, 'ENABLE_HAYSTACK_SEARCH', False):
+            management.call_command('rebuild_index', interactive=False)
 
     def open_dump(self, path):
         """open the zipfile, raise error if it
@@ -430,15 +548,19 @@ it may be helpful to split this procedure in two:\n
         return dump
 
     def save_askbot_message_id_list(self):
-        id_list = list(DjangoMessage.objects.all().values('id'))
-        self._askbot_message_id_list = id_list
+        """remembers the last message id before the transfer,
+        messages added later are generated by the load process"""
+        last_message_id = self.checkpoint.get('last_message_id')
+        if last_message_id is None:
+            last_message = DjangoMessage.objects.order_by('-id').first()
+            last_message_id = last_message.id if last_message else 0
+            self.checkpoint.set('last_message_id', last_message_id)
+        self._last_message_id = last_message_id
 
     def cleanup_messages(self):
         """deletes messages generated by the load process
         """
-        id_list = self._askbot_message_id_list
-        mset = DjangoMessage.objects.all().exclude(id__in=id_list)
-        mset.delete()
+        DjangoMessage.objects.filter(id__gt=self._last_message_id).delete()
 
     def transfer_messages(self):
         """transfers some messages from
@@ -864,35 +986,114 @@ it may be helpful to split this procedure in two:\n
         pass
 
     def load_xml_file(self, item):
-        """read data from the zip file for the item
+        """reads data from the zip file for the item
+        with an incremental parser and saves it in chunks,
+        rows saved before an interruption are skipped
         """
         xml_path = self.get_xml_path(item)
         table_name = self.get_table_name(item)
+        rows_read = self.checkpoint.get_rows_read(xml_path)
+        if rows_read == -1:
+            print('%s already loaded' % xml_path)
+            return
 
-        xml_data = self.zipfile.read(xml_path)
-
-        tree = et.fromstring(xml_data)
         print('loading from %s to %s' % (xml_path, table_name))
-        model = models.get_model('stackexchange', table_name)
-        i = 0
-        rows = tree.findall('.//row')
-        for row in ProgressBar(iter(rows), len(rows)):
-            model_entry = model()
-            i += 1
-            for col in row.getchildren():
-                field_name = se_parser.parse_field_name(col.tag)
-                try:
-                    field_type = model._meta.get_field(field_name)
-                except fields.FieldDoesNotExist as e:
-                    print("Warning: %s" % str(e))
+        model = apps.get_model('stackexchange', table_name)
+        self._field_cache = dict()
+
+        count = 0
+        chunk = list()
+        with self.zipfile.open(xml_path) as xml_file:
+            root = None
+            for event, elem in et.iterparse(xml_file, events=('start', 'end')):
+                if root is None:
+                    root = elem
+                if event != 'end' or elem.tag != 'row':
                     continue
-                field_value = se_parser.parse_value(col.text, field_type)
-                setattr(model_entry, field_name, field_value)
-            model_entry.save()
-            #transaction.commit()
-        print('... %d objects saved' % i)
+                count += 1
+                if count > rows_read:
+                    chunk.append(self.make_model_entry(model, elem))
+                #free the memory taken by the parsed rows
+                elem.clear()
+                root.clear()
+                if len(chunk) >= self.chunk_size:
+                    self.save_chunk(model, chunk)
+                    self.checkpoint.set_rows_read(xml_path, count)
+                    chunk = list()
+                    print('... %d objects saved' % count)
+                    sys.stdout.flush()
+
+        self.save_chunk(model, chunk)
+        self.checkpoint.set_rows_read(xml_path, -1)
+        print('... %d objects saved' % count)
         sys.stdout.flush()
 
+    def get_model_field(self, model, name):
+        """returns model field for the xml tag or attribute name,
+        or None if there is no such field"""
+        if name not in self._field_cache:
+            field_name = se_parser.parse_field_name(name)
+            try:
+                self._field_cache[name] = model._meta.get_field(field_name)
+            except FieldDoesNotExist as e:
+                print("Warning: %s" % str(e))
+                self._field_cache[name] = None
+        return self._field_cache[name]
+
+    def make_model_entry(self, model, row):
+        """returns unsaved model instance with the data of the row,
+        values are given either as attributes or as child elements"""
+        values = dict(row.attrib)
+        for col in row:
+            values[col.tag] = col.text
+
+        model_entry = model()
+        for name, value in values.items():
+            field = self.get_model_field(model, name)
+            if field is None:
+                continue
+            if isinstance(field, models.ForeignKey):
+                #set ids directly, missing related rows are
+                #created as placeholders when the chunk is saved
+                value = int(value) if value is not None else None
+                setattr(model_entry, field.attname, value)
+            else:
+                setattr(model_entry, field.name, se_parser.parse_value(value, field))
+        return model_entry
+
+    def save_chunk(self, model, entries):
+        """inserts entries to the database in one transaction,
+        rows with existing ids are updated, so that a chunk
+        can be saved again after an interruption"""
+        if not entries:
+            return
+
+        related_ids = defaultdict(set)
+        fk_fields = [f for f in model._meta.concrete_fields if isinstance(f, models.ForeignKey)]
+        for entry in entries:
+            for field in fk_fields:
+                value = getattr(entry, field.attname)
+                if value is not None:
+                    related_ids[field.related_model].add(value)
+
+        update_fields = [
+            f.name for f in model._meta.concrete_fields if not f.primary_key
+        ]
+        with atomic():
+            for related_model, ids in related_ids.items():
+                #save fake empty objects, as the old loader did
+                placeholders = [related_model(id=related_id) for related_id in ids]
+                related_model.objects.bulk_create(placeholders, ignore_conflicts=True)
+            if update_fields:
+                model.objects.bulk_create(
+                                entries,
+                                update_conflicts=True,
+                                unique_fields=['id'],
+                                update_fields=update_fields
+                            )
+            else:
+                model.objects.bulk_create(entries, ignore_conflicts=True)
+
     def get_table_name(self, xml_file_basename):
         return se_parser.get_table_name(xml_file_basename)
 
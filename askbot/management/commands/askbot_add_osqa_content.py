@@ -1,15 +1,15 @@
 from datetime import datetime
 
 import django.db.utils
-from bs4 import BeautifulSoup
 from urllib.parse import quote as django_urlquote
 from django.db.models import Q
-from django.utils import translation
 from django.conf import settings as django_settings
 from django.utils import timezone
 from django.template.defaultfilters import slugify
 from askbot.deps.django_authopenid.models import UserAssociation
 from askbot.management.commands.base import BaseImportXMLCommand
+from askbot.management.commands.base import ImportProgress
+from askbot.management.commands.base import iter_dump_objects
 from askbot.models import Award
 from askbot.models import BadgeData
 from askbot.models import Post
@@ -38,15 +38,15 @@ def decode_datetime(data):
 
 
 class DataObject:
-    def __init__(self, soup):
+    def __init__(self, elem):
         """Initializes object based on the values passed
-        via BeautifulSoup instance for that object"""
-        self.soup = soup
+        via the xml element of that object"""
+        self.elem = elem
         self.data = {}
 
     def decode_typed_value(self, field):
-        field_type = field['type']
-        value = field.text.strip()
+        field_type = field.get('type')
+        value = ''.join(field.itertext()).strip()
         if field_type == 'BooleanField':
             return value != 'False'
         if field_type in ('CharField', 'TextField'):
@@ -58,18 +58,15 @@ class DataObject:
         raise ValueError(f'unknown field type: {field_type}')
 
     def decode_rel_value(self, field):
-        rel_type = field['rel']
+        rel_type = field.get('rel')
         if rel_type in ('ManyToOneRel', 'OneToOneRel'):
-            try:
-                if field.text == '':
-                    return None
-                else:
-                    return int(field.text)
-            except AttributeError:
-                return None
+            value = (field.text or '').strip()
+            if value == '':
+                return None #<None/>
+            return int(value)
         if rel_type == 'ManyToManyRel':
-            items = field.find_all('object')
-            return [item['pk'] for item in items]
+            items = field.findall('object')
+            return [item.get('pk') for item in items]
         raise ValueError(f'unknown relation type {rel_type}')
 
     def decode_value(self, key):
@@ -78,8 +75,8 @@ class DataObject:
         type="DateTimeField">
         """
         if key in ('pk', 'id'):
-            return int(self.soup['pk'])
-        field = self.soup.find('field', attrs={'name': key})
+            return int(self.elem.get('pk'))
+        field = self.elem.find(f"field[@name='{key}']")
         if field is None:
             raise ValueError('could not find field %s' % key)
         if field.get('type') is not None:
@@ -90,7 +87,7 @@ class DataObject:
 
     def __getattr__(self, key):
         """Returns value of property, if decoded
-        or decodes the property first from the bs4 soup"""
+        or decodes the property first from the xml element"""
         if key not in self.data:
             value = self.decode_value(key)
             self.data[key] = value
@@ -98,19 +95,9 @@ class DataObject:
 
 
 class Command(BaseImportXMLCommand):
-    help = 'Adds XML OSQA data produced by the "dumpdata" command \n ' \
-           'Potentially uses more than 20GB of RAM on import when importing large files.'
-
-    def handle(self, *args, **options):
-        translation.activate(django_settings.LANGUAGE_CODE)
-
-        self.setup_run()
-        self.redirect_format = self.get_redirect_format(options['redirect_format'])
-
-        dump_file_name = options['xml_file']
-        xml = open(dump_file_name, 'r').read()
-        self.soup = BeautifulSoup(xml, ['lxml', 'xml', 'lxml-xml'])
+    help = 'Adds XML OSQA data produced by the "dumpdata" command'
 
+    def handle_import(self):
         # site settings
         # forum.keyvalue
         self.import_users()
@@ -155,9 +142,17 @@ class Command(BaseImportXMLCommand):
         # self.import_badge_awards()
 
     def get_objects_for_model(self, model_name):
-        objects_soup = self.soup.find_all(attrs={'model': model_name})
-        for item_soup in objects_soup:
-            yield DataObject(item_soup)
+        """OSQA models are not installed, so the objects
+        are decoded from the xml elements instead of
+        being deserialized"""
+        path = self.model_files.get(model_name)
+        if path is None:
+            return
+
+        count = self.model_counts[model_name]
+        objects = iter_dump_objects(path)
+        for elem in ImportProgress(objects, count, 'Importing ' + model_name):
+            yield DataObject(elem)
 
     def import_users(self):
         """import OSQA users to Askbot users"""
@@ -177,7 +172,7 @@ class Command(BaseImportXMLCommand):
             self.copy_bool_parameter(from_user, to_user, 'is_staff')
             self.copy_bool_parameter(from_user, to_user, 'is_active')
             self.copy_bool_parameter(from_user, to_user, 'is_superuser')
-            if from.user.is_superuser:
+            if from_user.is_superuser:
                 to_user.set_status('d')
             self.copy_numeric_parameter(from_user, to_user, 'last_login', operator='max')
             self.copy_numeric_parameter(from_user, to_user, 'date_joined', operator='min')
@@ -1,8 +1,8 @@
 from askbot.models import BadgeData
 from askbot.models import FavoriteQuestion
 from askbot.models import Group
-from askbot.models import ImportedObjectInfo
 from askbot.models import Post
+from askbot.models import PostRevision
 from askbot.models import Tag
 from askbot.models import Thread
 from askbot.models import User
@@ -10,8 +10,9 @@ from askbot.management.commands.base import BaseImportXMLCommand
 from django.conf import settings as django_settings
 from django.contrib.auth.models import Group as AuthGroup
 from django.contrib.contenttypes.models import ContentType
+from collections import Counter
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import F, Q
 
 if 'avatar' in django_settings.INSTALLED_APPS:
     from avatar.models import Avatar
@@ -66,24 +67,14 @@ class Command(BaseImportXMLCommand):
         #model="askbot.activity"
 
     def log_personal_group(self, group):
-        info = ImportedObjectInfo()
-        info.old_id = group.id
-        info.new_id = int(group.name.split('_')[-1])
-        info.model = 'personal_group'
-        info.run = self.run
-        info.save()
+        self.log_old_id('personal_group', group.id, int(group.name.split('_')[-1]))
 
     def get_group_by_old_id(self, old_id):
         normal_group = self.get_imported_object_by_old_id(AuthGroup, old_id)
         if normal_group:
             return Group.objects.get(group_ptr=normal_group)
 
-        log = ImportedObjectInfo.objects.get(
-                                        model='personal_group',
-                                        old_id=old_id,
-                                        run=self.run
-                                    )
-        old_user_id = log.new_id
+        old_user_id = self.id_map.get('personal_group', old_id)
         new_user = self.get_imported_object_by_old_id(User, old_user_id)
         return new_user.get_personal_group()
 
@@ -358,9 +349,8 @@ class Command(BaseImportXMLCommand):
 
     def import_threads(self):
         """import thread objects"""
-        count = 0
+        tag_counts = Counter()
         for thread in self.get_objects_for_model('askbot.thread'):
-            count += 1
             new_thread = Thread(
                 title=thread.title,
                 tagnames=thread.tagnames,
@@ -392,10 +382,8 @@ class Command(BaseImportXMLCommand):
                 new_thread.tagnames = ' '.join([tag.name for tag in tags])
 
                 new_thread.save()
-                for tag in tags:
-                    new_thread.tags.add(tag)
-                    tag.used_count += 1
-                    tag.save()
+                new_thread.tags.add(*tags)
+                tag_counts.update(tag.id for tag in tags)
 
             else:
                 new_thread.save()
@@ -410,6 +398,11 @@ class Command(BaseImportXMLCommand):
             </object>
             """
 
+        #tag counts are updated once per tag, not per thread
+        with transaction.atomic():
+            for tag_id, count in tag_counts.items():
+                Tag.objects.filter(id=tag_id).update(used_count=F('used_count') + count)
+
     def apply_question_followers(self):
         """mark followed questions"""
         for fave in self.get_objects_for_model('askbot.favoritequestion'):
@@ -483,12 +476,21 @@ class Command(BaseImportXMLCommand):
             post.add_to_groups([group,])
 
     def import_post_revisions(self):
-        for revision in self.get_objects_for_model('askbot.postrevision'):
-            revision.post = self.get_imported_object_by_old_id(Post, revision.post_id)
-            revision.author = self.get_imported_object_by_old_id(User, revision.author_id)
-            revision.approved_by = self.get_imported_object_by_old_id(User, revision.approved_by_id)
-            revision.id = None
-            revision.save()
+        """revisions are inserted in batches, bypassing
+        `PostRevision.save()`, revisions of the posts
+        that were not imported are skipped"""
+        for batch in self.get_object_batches_for_model('askbot.postrevision'):
+            revisions = list()
+            for revision in batch:
+                revision.post_id = self.get_imported_object_id_by_old_id(Post, revision.post_id)
+                if revision.post_id is None:
+                    continue
+                revision.author_id = self.get_imported_object_id_by_old_id(User, revision.author_id)
+                revision.approved_by_id = self.get_imported_object_id_by_old_id(User, revision.approved_by_id)
+                revision.ip_addr = revision.ip_addr or '0.0.0.0'
+                revision.id = None
+                revisions.append(revision)
+            PostRevision.objects.bulk_create(revisions)
 
     def import_badges(self):
         """imports badgedata objects"""
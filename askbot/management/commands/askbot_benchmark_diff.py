@@ -0,0 +1,113 @@
+"""Microbenchmark of the html revision diff.
+Compares difflib.SequenceMatcher over the token lists (the old behavior)
+with the patience diff of ``askbot.utils.diff``.
+
+The corpus is made of revision pairs of typical post sizes - text
+paragraphs with code blocks and a few edits, or, with ``--from-db``,
+of the latest revision pairs of the posts in the database.
+"""
+import difflib
+import random
+import string
+import timeit
+from django.core.management.base import BaseCommand
+from askbot.utils import diff
+
+
+def diff_with_difflib(a, b):
+    """the old diff, opcodes only"""
+    a, b = diff.html2list(a), diff.html2list(b)
+    return difflib.SequenceMatcher(None, a, b).get_opcodes()
+
+
+def diff_with_patience(a, b):
+    a, b = diff.html2list(a), diff.html2list(b)
+    return diff.get_opcodes(a, b)
+
+
+def random_word():
+    return ''.join(random.choice(string.ascii_lowercase) for _ in range(random.randint(2, 9)))
+
+
+def make_post(size):
+    """returns html of about `size` characters"""
+    parts = list()
+    length = 0
+    while length < size:
+        if random.random() < 0.3:
+            #code blocks have many repeated tokens
+            lines = ['    x = foo(x, %d)' % random.randint(0, 9) for _ in range(random.randint(5, 40))]
+            part = '<pre><code>%s</code></pre>' % '\n'.join(lines)
+        else:
+            part = '<p>%s</p>' % ' '.join(random_word() for _ in range(random.randint(20, 120)))
+        parts.append(part)
+        length += len(part)
+    return '\n'.join(parts)
+
+
+def edit_post(html, edits):
+    """returns html with some words replaced, inserted or deleted"""
+    words = html.split(' ')
+    for _ in range(edits):
+        pos = random.randrange(len(words))
+        action = random.choice(('replace', 'insert', 'delete'))
+        if action == 'replace':
+            words[pos] = random_word()
+        elif action == 'insert':
+            words.insert(pos, random_word())
+        elif len(words) > 1:
+            del words[pos]
+    return ' '.join(words)
+
+
+class Command(BaseCommand): # pylint: disable=missing-docstring
+    help = 'Measures speed of the html revision diff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=str, default='2000,20000,100000',
+                            help='comma separated sizes of the posts in characters')
+        parser.add_argument('--edits', type=int, default=20,
+                            help='number of word edits per revision')
+        parser.add_argument('--from-db', type=int, default=0, dest='from_db',
+                            help='use latest revision pairs of this many posts instead')
+
+    def get_db_corpus(self, count):
+        from askbot.models import Post
+        posts = Post.objects.filter(revisions__revision=2).distinct().order_by('-id')[:count]
+        corpus = list()
+        for post in posts:
+            revisions = list(post.revisions.exclude(revision=0).order_by('-id')[:2])
+            if len(revisions) == 2:
+                corpus.append((revisions[1].html, revisions[0].html))
+        return [('database', corpus)]
+
+    def get_synthetic_corpus(self, sizes, edits):
+        random.seed(0)
+        corpora = list()
+        for size in sizes:
+            pairs = list()
+            for _ in range(5):
+                html = make_post(size)
+                pairs.append((html, edit_post(html, edits)))
+            corpora.append(('%d chars' % size, pairs))
+        return corpora
+
+    def handle(self, *args, **options):
+        if options['from_db']:
+            corpora = self.get_db_corpus(options['from_db'])
+        else:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+            corpora = self.get_synthetic_corpus(sizes, options['edits'])
+
+        for corpus_name, pairs in corpora:
+            if not pairs:
+                continue
+            for name, func in (('difflib', diff_with_difflib),
+                               ('patience', diff_with_patience)):
+                def run():
+                    for a, b in pairs:
+                        func(a, b)
+                elapsed = min(timeit.repeat(run, number=1, repeat=3))
+                self.stdout.write('%-14s %-9s %8.4fs  %8.2fms/pair' % (
+                    corpus_name, name, elapsed, 1e3 * elapsed / len(pairs)
+                ))
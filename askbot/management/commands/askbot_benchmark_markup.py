@@ -0,0 +1,91 @@
+"""Microbenchmark of the post html pipeline.
+Compares the chain of sanitize, urlize with BeautifulSoup and
+sanitize again (the old behavior) with the single pass of
+``askbot.utils.html.sanitize_and_urlize_html``.
+
+The corpus is made of markdown texts of typical post sizes - paragraphs
+with links, inline code and code blocks, or, with ``--from-db``,
+of the texts of the latest posts in the database.
+"""
+import random
+import string
+import timeit
+from django.core.management.base import BaseCommand
+from askbot.utils.html import sanitize_and_urlize_html, sanitize_html, urlize_html
+from askbot.utils.markup import get_parser
+
+
+def convert_with_chain(html):
+    return sanitize_html(urlize_html(sanitize_html(html)))
+
+
+def random_word():
+    word = ''.join(random.choice(string.ascii_lowercase) for _ in range(random.randint(2, 9)))
+    choice = random.random()
+    if choice < 0.02:
+        return 'http://%s.com/%s' % (word, random_word())
+    if choice < 0.03:
+        return 'www.%s.org' % word
+    if choice < 0.05:
+        return '`%s`' % word
+    if choice < 0.06:
+        return '**%s**' % word
+    return word
+
+
+def make_text(size):
+    """returns markdown text of about `size` characters"""
+    parts = list()
+    length = 0
+    while length < size:
+        if random.random() < 0.2:
+            lines = ['    x = foo(x, %d)' % random.randint(0, 9) for _ in range(random.randint(3, 20))]
+            part = '\n'.join(lines)
+        else:
+            part = ' '.join(random_word() for _ in range(random.randint(20, 120)))
+        parts.append(part)
+        length += len(part)
+    return '\n\n'.join(parts)
+
+
+class Command(BaseCommand): # pylint: disable=missing-docstring
+    help = 'Measures speed of the sanitizing and urlizing of the post html'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=str, default='500,5000,50000',
+                            help='comma separated sizes of the texts in characters')
+        parser.add_argument('--count', type=int, default=20,
+                            help='number of texts of each size')
+        parser.add_argument('--from-db', type=int, default=0, dest='from_db',
+                            help='use texts of this many latest posts instead')
+
+    def get_db_corpus(self, count):
+        from askbot.models import Post
+        texts = Post.objects.order_by('-id').values_list('text', flat=True)[:count]
+        return [('database', list(texts))]
+
+    def get_synthetic_corpus(self, sizes, count):
+        random.seed(0)
+        return [('%d chars' % size, [make_text(size) for _ in range(count)]) for size in sizes]
+
+    def handle(self, *args, **options):
+        if options['from_db']:
+            corpora = self.get_db_corpus(options['from_db'])
+        else:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+            corpora = self.get_synthetic_corpus(sizes, options['count'])
+
+        parser = get_parser()
+        for corpus_name, texts in corpora:
+            if not texts:
+                continue
+            htmls = [parser.convert(text) for text in texts]
+            for name, func in (('chain', convert_with_chain),
+                               ('single pass', sanitize_and_urlize_html)):
+                def run():
+                    for html in htmls:
+                        func(html)
+                elapsed = min(timeit.repeat(run, number=1, repeat=3))
+                self.stdout.write('%-12s %-12s %8.4fs  %8.2fms/post' % (
+                    corpus_name, name, elapsed, 1e3 * elapsed / len(htmls)
+                ))
@@ -0,0 +1,28 @@
+"""Compiles the templates of all skins and languages
+and stores them in the shared bytecode cache, so that the
+new worker processes do not compile the templates.
+Meant to be run at deploy time, after the skins are updated."""
+from django.core.management.base import BaseCommand
+from django.template import engines
+from jinja2 import TemplateSyntaxError
+from askbot.skins.askbot_environments import SkinEnvironment
+
+class Command(BaseCommand):
+    """The management command class"""
+    help = 'Compiles templates of all skins and languages into the bytecode cache'
+
+    def handle(self, *args, **kwargs):
+        #environments of the skins are created with the template engine
+        engines.all()
+
+        count = 0
+        for key, env in sorted(SkinEnvironment.siblings.items()):
+            for name in env.list_templates(extensions=('html', 'txt', 'xml')):
+                try:
+                    #get_template of the SkinEnvironment picks the default skin
+                    super(SkinEnvironment, env).get_template(name)
+                except TemplateSyntaxError as error:
+                    self.stderr.write(f'{key}: {name}: {error}')
+                else:
+                    count += 1
+        self.stdout.write(f'Compiled {count} templates')
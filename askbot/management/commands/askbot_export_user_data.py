@@ -1,16 +1,23 @@
-"""Exports data for a user with given ID"""
+"""Exports data for a user with given ID.
+
+Posts are read from the database in chunks and the records
+are written to the zip archive as they are read, uploaded files
+are copied into the archive as streams, so the memory use does
+not depend on the amount of the user's content.
+"""
+import io
 import json
 import os
 import re
 import shutil
-import tempfile
-from optparse import make_option
+import zipfile
 from django.conf import settings as django_settings
+from django.core.cache import cache
 from django.core.management.base import BaseCommand, CommandError
 from django.utils import translation
+from askbot import const
 from askbot.models import User
 from askbot.utils.html import site_url
-from askbot.utils.functions import list_directory_files, zipzip
 
 class Command(BaseCommand):
     """Exports data for a user given his or her ID"""
@@ -28,17 +35,57 @@ class Command(BaseCommand):
                     type=str,
                     default=None,
                     help='Path to the output file, absolute or relative to CWD')
+        parser.add_argument('--chunk-size',
+                    action='store',
+                    type=int,
+                    dest='chunk_size',
+                    default=const.USER_DATA_EXPORT_CHUNK_SIZE,
+                    help='Number of posts read from the database at once')
 
     def handle(self, *args, **options): # pylint: disable=too-many-locals
         """Does the job of the command"""
         translation.activate(django_settings.LANGUAGE_CODE)
         uid, file_name = self.get_params(options)
+        self.chunk_size = max(options['chunk_size'], 1)
 
         try:
             user = User.objects.get(pk=uid)
         except User.DoesNotExist: # pylint: disable=no-member
             raise CommandError('User with id {} does not exist'.format(uid))
 
+        zip_path = os.path.abspath(file_name)
+        if os.path.exists(zip_path):
+            raise CommandError('File {} already exists'.format(file_name))
+
+        #the archive appears under its name only when complete
+        temp_path = zip_path + '.part'
+        self.progress_key = const.USER_DATA_EXPORT_PROGRESS_CACHE_KEY % user.pk
+        self.total_count = sum(
+            self.get_exportable_posts(user, post_type).count()
+            for post_type in ('question', 'answer', 'comment')
+        )
+        self.done_count = 0
+        try:
+            with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+                with zip_file.open('data.json', 'w', force_zip64=True) as data_file:
+                    upfiles = self.write_json_data(user, data_file)
+                self.backup_upfiles_and_avatar(upfiles, user, zip_file)
+            os.replace(temp_path, zip_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            cache.delete(self.progress_key)
+
+    def report_progress(self):
+        """stores percent of the exported posts in the cache"""
+        self.done_count += 1
+        if self.done_count % self.chunk_size == 0 or self.done_count == self.total_count:
+            percent = 100 * self.done_count // max(self.total_count, 1)
+            cache.set(self.progress_key, percent, const.USER_DATA_EXPORT_PROGRESS_TIMEOUT)
+
+    @classmethod
+    def get_user_profile_data(cls, user):
+        """Returns dictionary with the profile data"""
         lang_data = dict()
         for profile in user.localized_askbot_profiles.all():
             lang = profile.language_code
@@ -47,32 +94,37 @@ class Command(BaseCommand):
                             'profile_url': site_url(profile_url)}
             lang_data[lang] = profile_data
 
-        user_profile = {'localized_profiles': lang_data,
-                        'date_of_birth': str(user.date_of_birth),
-                        'username': user.username,
-                        'profile_url': site_url(user.get_absolute_url()),
-                        'email': user.email}
+        return {'localized_profiles': lang_data,
+                'date_of_birth': str(user.date_of_birth),
+                'username': user.username,
+                'profile_url': site_url(user.get_absolute_url()),
+                'email': user.email}
 
-        data = {'user_profile': user_profile}
+    def write_json_data(self, user, data_file):
+        """Writes the json document to the binary file object
+        record by record. Returns set of the upfiles mentioned
+        in the posts, which are found in the upfiles directory"""
+        out = io.TextIOWrapper(data_file, encoding='utf-8')
+        out.write('{\n"user_profile": ')
+        out.write(json.dumps(self.get_user_profile_data(user), indent=2))
 
-        question_data = self.get_question_data(user)
-        data['questions'] = list(question_data.values())
-
-        answer_data = self.get_post_data(user, 'answer')
-        data['answers'] = list(answer_data.values())
-
-        comment_data = self.get_post_data(user, 'comment')
-        data['comments'] = list(comment_data.values())
-
-        upfiles = self.get_upfiles(data)
-
-        temp_dir = tempfile.mkdtemp()
-        self.backup_upfiles_and_avatar(upfiles, user, temp_dir)
-
-        self.save_json_file(data, temp_dir)
-        self.zip_tempdir(temp_dir, file_name)
-
-        shutil.rmtree(temp_dir)
+        upfiles = set()
+        sources = (('questions', 'question'), ('answers', 'answer'), ('comments', 'comment'))
+        for key, post_type in sources:
+            out.write(',\n"%s": [' % key)
+            separator = '\n'
+            for datum in self.get_post_data(user, post_type):
+                out.write(separator)
+                out.write(json.dumps(datum, indent=2))
+                separator = ',\n'
+                upfiles |= self.extract_upfile_paths_from_text(datum['text'])
+                self.report_progress()
+            out.write('\n]')
+        out.write('\n}\n')
+        out.flush()
+        out.detach()
+
+        return set(upfile for upfile in upfiles if self.upfile_is_on_disk(upfile))
 
     @classmethod
     def get_params(cls, options):
@@ -92,33 +144,14 @@ class Command(BaseCommand):
         return uid, file_name
 
     @classmethod
-    def save_json_file(cls, data, temp_dir):
-        """Saves data in json form in the temporary directory"""
-        json_file_path = os.path.join(temp_dir, 'data.json')
-        file_obj = open(json_file_path, 'w')
-        file_obj.write(json.dumps(data, indent=2))
-        file_obj.close()
-
-    @classmethod
-    def zip_tempdir(cls, temp_dir, file_name):
-        """Zip contents of the temp directory into the desired
-        target file"""
-        if os.path.exists(file_name):
-            raise CommandError('File {} already exists'.format(file_name))
-        zip_path = os.path.abspath(file_name)
-
-        file_paths = list_directory_files(temp_dir)
-        zipzip(zip_path, *file_paths, ignore_subpath=temp_dir)
-
-    @classmethod
-    def backup_upfiles_and_avatar(cls, upfiles, user, temp_dir): # pylint: disable=unused-argument
-        """Copies the uploaded files and the avatar to the
-        temporary directory"""
-        updir = os.path.join(temp_dir, 'upfiles')
-        os.makedirs(updir)
-        for upfile in upfiles:
+    def backup_upfiles_and_avatar(cls, upfiles, user, zip_file): # pylint: disable=unused-argument
+        """Copies the uploaded files and the avatar
+        into the upfiles directory of the archive"""
+        for upfile in sorted(upfiles):
             path = cls.get_upfile_path(upfile)
-            shutil.copy(path, updir)
+            arcname = 'upfiles/' + os.path.basename(path)
+            with open(path, 'rb') as source, zip_file.open(arcname, 'w', force_zip64=True) as target:
+                shutil.copyfileobj(source, target)
 
         #todo: backup avatar
 
@@ -152,55 +185,27 @@ class Command(BaseCommand):
         return os.path.join(media_root, file_name)
 
     @classmethod
-    def get_upfiles(cls, data):
-        """Returns set of upfiles of all user posts, and only those
-        that can be found in the upfiles directory"""
-        texts = list()
-        sources = ('questions', 'answers', 'comments')
-        for source in sources:
-            source_texts = [datum['text'] for datum in data[source]]
-            texts.extend(source_texts)
-
-        upfiles = set()
-        for text in texts:
-            upfiles |= cls.extract_upfile_paths_from_text(text) #pylint: disable=no-member
-
-        confirmed = [upfile for upfile in upfiles if cls.upfile_is_on_disk(upfile)] #pylint: disable=no-member
-        return confirmed
-
-    @classmethod
-    def get_post_data(cls, user, post_type):
-        """Returns a dictionary valued with with question data,
-        keyed by question objects."""
+    def get_exportable_posts(cls, user, post_type):
+        """Returns queryset of the user's posts of the type,
+        threadless questions and parentless comments are pruned"""
         posts = user.posts.filter(post_type=post_type)
-
-        # prune threadless posts and parentless
-        have_threads = [post for post in posts if post.thread_id]
         if post_type == 'question':
-            exportable = have_threads
+            posts = posts.filter(thread__isnull=False)
         elif post_type == 'comment':
-            exportable = [post for post in posts if post.parent_id]
-        elif post_type == 'answer':
-            exportable = posts
-
-        # collect data per post:
-        data = dict()
-        for post in exportable:
+            posts = posts.filter(parent__isnull=False)
+        return posts
+
+    def get_post_data(self, user, post_type):
+        """Yields dictionaries with post data,
+        questions in addition have the title and the tags"""
+        posts = self.get_exportable_posts(user, post_type)
+        posts = posts.select_related('thread', 'parent').order_by('id')
+        for post in posts.iterator(chunk_size=self.chunk_size):
             datum = {'text': post.text,
                      'added_at': str(post.added_at),
                      'last_edited_at': str(post.last_edited_at),
                      'url': site_url(post.get_absolute_url())}
-            data[post] = datum
-
-        return data
-
-    @classmethod
-    def get_question_data(cls, user):
-        """Returns the same as the `get_post_data` method,
-        but in addition fills in question title and the tags"""
-        post_data = cls.get_post_data(user, 'question')
-        for question, datum in list(post_data.items()):
-            datum['title'] = question.thread.title
-            datum['tags'] = question.thread.tagnames
-
-        return post_data
+            if post_type == 'question':
+                datum['title'] = post.thread.title
+                datum['tags'] = post.thread.tagnames
+            yield datum
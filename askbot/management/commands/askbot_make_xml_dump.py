@@ -0,0 +1,185 @@
+"""Writes a synthetic dump in the format of the "dumpdata" command,
+readable by ``askbot_add_xml_content``, for the repeatable
+benchmarks of the import. The content is random, but the same
+for the same arguments. Does not touch the database.
+"""
+import datetime
+import random
+import string
+from xml.sax.saxutils import XMLGenerator
+from django.core.management.base import BaseCommand
+
+
+def random_words(count):
+    return ' '.join(
+        ''.join(random.choice(string.ascii_lowercase) for _ in range(random.randint(3, 9)))
+        for _ in range(count)
+    )
+
+
+class DumpWriter(object):
+    """streams objects to the xml file"""
+
+    def __init__(self, output):
+        self.xml = XMLGenerator(output, encoding='utf-8')
+        self.xml.startDocument()
+        self.xml.startElement('django-objects', {'version': '1.0'})
+
+    def write_object(self, model, pk, fields=None, relations=None):
+        """`fields` - dict of values, `relations` - dict of
+        (related model, related id) tuples"""
+        self.xml.ignorableWhitespace('\n')
+        self.xml.startElement('object', {'model': model, 'pk': str(pk)})
+        for name, value in (fields or {}).items():
+            self.xml.startElement('field', {'name': name})
+            self.xml.characters(str(value))
+            self.xml.endElement('field')
+        for name, (to_model, related_id) in (relations or {}).items():
+            self.xml.startElement('field', {'name': name, 'rel': 'ManyToOneRel', 'to': to_model})
+            if related_id is None:
+                self.xml.startElement('None', {})
+                self.xml.endElement('None')
+            else:
+                self.xml.characters(str(related_id))
+            self.xml.endElement('field')
+        self.xml.endElement('object')
+
+    def close(self):
+        self.xml.ignorableWhitespace('\n')
+        self.xml.endElement('django-objects')
+        self.xml.endDocument()
+
+
+class Command(BaseCommand): # pylint: disable=missing-docstring
+    help = 'Writes a synthetic xml dump for benchmarks of askbot_add_xml_content'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', type=str, help='path of the dump file')
+        parser.add_argument('--users', type=int, default=1000,
+                            help='number of users')
+        parser.add_argument('--tags', type=int, default=200,
+                            help='number of tags')
+        parser.add_argument('--threads', type=int, default=5000,
+                            help='number of questions')
+        parser.add_argument('--answers', type=int, default=3,
+                            help='maximum number of answers per question')
+        parser.add_argument('--comments', type=int, default=2,
+                            help='maximum number of comments per post')
+        parser.add_argument('--votes', type=int, default=3,
+                            help='maximum number of votes per post')
+
+    def handle(self, *args, **options):
+        random.seed(0)
+        users = options['users']
+        started_at = datetime.datetime(2015, 1, 1)
+
+        def random_user():
+            return random.randint(1, users)
+
+        def random_date():
+            return (started_at + datetime.timedelta(minutes=random.randint(0, 10**6))).isoformat()
+
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            dump = DumpWriter(output)
+
+            for user_id in range(1, users + 1):
+                dump.write_object('auth.user', user_id, {
+                    'username': 'user%d' % user_id,
+                    'email': 'user%d@example.com' % user_id,
+                    'password': '!',
+                    'is_active': True,
+                    'date_joined': random_date(),
+                    'last_login': random_date(),
+                })
+
+            tag_names = list()
+            for tag_id in range(1, options['tags'] + 1):
+                tag_names.append('tag%d' % tag_id)
+                dump.write_object(
+                    'askbot.tag', tag_id,
+                    {'name': tag_names[-1], 'language_code': 'en', 'used_count': 0},
+                    {'created_by': ('auth.user', random_user())}
+                )
+
+            post_id = 0
+            self.vote_id = 0
+            posts = list()
+            for thread_id in range(1, options['threads'] + 1):
+                added_at = random_date()
+                tagnames = ' '.join(random.sample(tag_names, min(3, len(tag_names))))
+                title = random_words(8)
+                dump.write_object(
+                    'askbot.thread', thread_id,
+                    {
+                        'title': title,
+                        'tagnames': tagnames,
+                        'view_count': random.randint(0, 1000),
+                        'last_activity_at': added_at,
+                        'added_at': added_at,
+                        'language_code': 'en',
+                    },
+                    {'last_activity_by': ('auth.user', random_user())}
+                )
+
+                post_id += 1
+                question_id = post_id
+                #(id, post type, parent id)
+                thread_posts = [(question_id, 'question', None)]
+                for _ in range(random.randint(0, options['answers'])):
+                    post_id += 1
+                    thread_posts.append((post_id, 'answer', question_id))
+                for parent_id, _, _ in list(thread_posts):
+                    for _ in range(random.randint(0, options['comments'])):
+                        post_id += 1
+                        thread_posts.append((post_id, 'comment', parent_id))
+
+                for pid, post_type, parent_id in thread_posts:
+                    text = random_words(random.randint(20, 200))
+                    author_id = random_user()
+                    dump.write_object(
+                        'askbot.post', pid,
+                        {
+                            'post_type': post_type,
+                            'text': text,
+                            'html': '<p>%s</p>' % text,
+                            'added_at': added_at,
+                            'language_code': 'en',
+                        },
+                        {
+                            'author': ('auth.user', author_id),
+                            'thread': ('askbot.thread', thread_id),
+                            'parent': ('askbot.post', parent_id),
+                        }
+                    )
+                    posts.append((pid, author_id, text, title, tagnames))
+
+                #revisions and votes are written in chunks,
+                #to keep the memory use bounded
+                if len(posts) >= 1000 or thread_id == options['threads']:
+                    self.write_post_data(dump, posts, options['votes'], random_user, random_date)
+                    posts = list()
+
+            dump.close()
+
+    def write_post_data(self, dump, posts, max_votes, random_user, random_date):
+        for pid, author_id, text, title, tagnames in posts:
+            dump.write_object(
+                'askbot.postrevision', pid,
+                {
+                    'revision': 1,
+                    'revised_at': random_date(),
+                    'text': text,
+                    'title': title,
+                    'tagnames': tagnames,
+                    'approved': True,
+                },
+                {'post': ('askbot.post', pid), 'author': ('auth.user', author_id)}
+            )
+        for pid, _, _, _, _ in posts:
+            for _ in range(random.randint(0, max_votes)):
+                self.vote_id += 1
+                dump.write_object(
+                    'askbot.vote', self.vote_id,
+                    {'vote': random.choice((1, 1, 1, -1)), 'voted_at': random_date()},
+                    {'user': ('auth.user', random_user()), 'voted_post': ('askbot.post', pid)}
+                )
@@ -0,0 +1,20 @@
+"""Prints the hit ratio of the full page cache
+for the anonymous visitors, see askbot.page_cache"""
+from django.core.management.base import BaseCommand
+from askbot import page_cache
+
+class Command(BaseCommand):
+    """The management command class"""
+    help = 'Prints the hit ratio of the page cache for the anonymous visitors'
+
+    def add_arguments(self, parser):
+        """Defines command line arguments"""
+        parser.add_argument('--reset', action='store_true', dest='reset',
+                            default=False, help='Reset the counters')
+
+    def handle(self, *args, **kwargs):
+        stats = page_cache.get_stats()
+        self.stdout.write('Hits: {hits}, misses: {misses}, '
+                          'hit ratio: {hit_ratio:.1%}'.format(**stats))
+        if kwargs['reset']:
+            page_cache.reset_stats()
@@ -1,12 +1,24 @@
 """Replaces django-avatar 'rebuild_avatars'
-and saves cached active avatar urls for each user"""
-from askbot.models import User, UserProfile
+and saves cached active avatar urls for each user.
+The urls are calculated by the celery tasks,
+each for a batch of users, so that with the
+celery workers running the batches are processed in parallel"""
+from askbot.models import User
+from askbot.tasks import init_avatar_urls
+from askbot.utils.celery_utils import defer_celery_task
 from askbot.utils.console import ProgressBar
 from avatar.conf import settings as avatar_settings
 from avatar.models import Avatar
 from django.core.management import BaseCommand
 
 class Command(BaseCommand):
+
+    def add_arguments(self, parser):
+        """Defines command line arguments"""
+        parser.add_argument('--batch-size', action='store', type=int,
+                            dest='batch_size', default=500,
+                            help='Number of users per celery task')
+
     def handle(self, *args, **kwargs):
 
         avatars = Avatar.objects.all()
@@ -16,11 +28,9 @@ class Command(BaseCommand):
             for size in avatar_settings.AVATAR_AUTO_GENERATE_SIZES:
                 avatar.create_thumbnail(size)
 
-        users = User.objects.all()
-        count = users.count()
+        batch_size = max(kwargs['batch_size'], 1)
+        user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+        batches = [user_ids[idx:idx + batch_size] for idx in range(0, len(user_ids), batch_size)]
         message = 'Rebuilding cached avatar urls'
-        for user in ProgressBar(users.iterator(), count, message):
-            user.init_avatar_urls()
-            UserProfile.objects.filter(auth_user_ptr=user).update(avatar_urls=user.avatar_urls)
-            profile = UserProfile.objects.get(pk=user.pk)
-            profile.update_cache()
+        for batch in ProgressBar(iter(batches), len(batches), message):
+            defer_celery_task(init_avatar_urls, args=(batch,))
@@ -0,0 +1,21 @@
+"""askbot_rebuild_user_stats management command
+recomputes the profile statistics of all users
+
+python manage.py askbot_rebuild_user_stats
+"""
+from django.core.management import BaseCommand
+from askbot import models
+from askbot.utils.console import ProgressBar
+
+class Command(BaseCommand):
+    """Command class for "askbot_rebuild_user_stats"
+    """
+    help = 'Recomputes profile statistics of all users'
+
+    def handle(self, *arguments, **options):
+        users = models.User.objects.all().order_by('id')
+        count = users.count()
+        message = 'Rebuilding user statistics'
+        for user in ProgressBar(users.iterator(), count, message):
+            stats, created = models.UserStats.objects.get_or_create(user=user)
+            stats.rebuild()
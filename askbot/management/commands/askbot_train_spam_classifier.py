@@ -0,0 +1,48 @@
+"""Trains the local spam classifier on the JSON file
+{"spam": [...], "ham": [...]} - the output of the
+askbot_get_spam_training_set command, and saves
+the model to the file used by the
+askbot.spam_checker.bayes_spam_checker.is_spam
+"""
+import json
+import os
+from django.conf import settings as django_settings
+from django.core.management.base import BaseCommand, CommandError
+from askbot.spam_checker import bayes_spam_checker
+
+class Command(BaseCommand):
+    """The management command class"""
+    help = 'Trains the local spam classifier'
+
+    def add_arguments(self, parser):
+        """Defines command line arguments"""
+        parser.add_argument('--input', dest='input_file_name',
+                            nargs='?', default='./spam-ham.json',
+                            help='Path to the training set file')
+
+        parser.add_argument('--output', dest='output_file_name',
+                            nargs='?', default=None,
+                            help='Path to the model file, ASKBOT_SPAM_CHECKER_MODEL_FILE by default')
+
+    def handle(self, *args, **kwargs):
+        output_file_name = kwargs['output_file_name'] \
+            or django_settings.ASKBOT_SPAM_CHECKER_MODEL_FILE
+        if not output_file_name:
+            raise CommandError('Please specify --output or ASKBOT_SPAM_CHECKER_MODEL_FILE')
+
+        input_file_name = kwargs['input_file_name']
+        if not os.path.exists(input_file_name):
+            raise CommandError(f'File {input_file_name} does not exist')
+
+        with open(input_file_name, encoding='utf-8') as input_file:
+            training_set = json.load(input_file)
+
+        spam = training_set.get('spam', [])
+        ham = training_set.get('ham', [])
+        if not (spam and ham):
+            raise CommandError('Training set must have both spam and ham posts')
+
+        model = bayes_spam_checker.train(spam, ham)
+        bayes_spam_checker.save_model(model, output_file_name)
+        self.stdout.write(f'Trained on {len(spam)} spam and {len(ham)} ham posts, '
+                          f'model saved to {output_file_name}')
@@ -1,18 +1,135 @@
 from collections import defaultdict
 import os
+import shutil
+import sqlite3
 import sys
-from tempfile import mkstemp
-from bs4 import BeautifulSoup
+import time
+from tempfile import mkdtemp, mkstemp
+from xml.etree import ElementTree as et
 from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings as django_settings
 from django.core import serializers
-from django.utils.encoding import smart_str
 from django.utils.translation import activate as activate_language
 from askbot.models import Message
 from askbot.models import User
 from askbot.models import ImportedObjectInfo
 from askbot.models import ImportRun
 
+DJANGO_XML_HEADER = '<?xml version="1.0" encoding="utf-8"?>\n<django-objects version="1.0">\n'
+DJANGO_XML_FOOTER = '</django-objects>\n'
+
+
+def iter_dump_objects(filename):
+    """yields top level <object> elements of the django
+    xml dump, parsing it incrementally. Elements are
+    discarded after use, so the memory use is bounded"""
+    depth = 0
+    root = None
+    for event, elem in et.iterparse(filename, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+
+        depth -= 1
+        #m2m fields contain nested objects
+        if depth == 1 and elem.tag == 'object':
+            yield elem
+            root.clear()
+
+
+class ImportProgress(object):
+    """A wrapper for an iterator, that prints the number
+    of processed items and the throughput along the way"""
+    report_interval = 5 #seconds
+
+    def __init__(self, iterable, length=None, message=''):
+        self.iterable = iter(iterable)
+        self.length = length
+        self.message = message
+        self.counter = 0
+        self.started_at = time.time()
+        self.reported_at = self.started_at
+
+    def __iter__(self):
+        return self
+
+    def get_report(self):
+        elapsed = max(time.time() - self.started_at, 0.001)
+        if self.length:
+            done = '%d of %d' % (self.counter, self.length)
+        else:
+            done = '%d' % self.counter
+        return '%s: %s in %.1fs (%.1f/s)' % (
+            self.message, done, elapsed, self.counter / elapsed
+        )
+
+    def __next__(self):
+        try:
+            result = next(self.iterable)
+        except StopIteration:
+            print(self.get_report())
+            raise
+
+        self.counter += 1
+        now = time.time()
+        if now - self.reported_at >= self.report_interval:
+            self.reported_at = now
+            print(self.get_report())
+            sys.stdout.flush()
+        return result
+
+
+class ImportedIdMap(object):
+    """Maps ids of the objects in the dump to the ids
+    of the imported objects, per model.
+
+    The map is kept in an sqlite file in the working directory
+    of the import, so that neither the memory of the process
+    nor the site database grows with it. New entries are
+    written in batches."""
+
+    def __init__(self, path, batch_size=1000):
+        self.batch_size = batch_size
+        self.pending = dict()
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS id_map ('
+            'model TEXT NOT NULL, old_id INTEGER NOT NULL, new_id INTEGER NOT NULL, '
+            'PRIMARY KEY (model, old_id)) WITHOUT ROWID'
+        )
+
+    def add(self, model_name, old_id, new_id):
+        self.pending[(model_name, int(old_id))] = new_id
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def get(self, model_name, old_id):
+        """returns new id or None"""
+        key = (model_name, int(old_id))
+        if key in self.pending:
+            return self.pending[key]
+        row = self.connection.execute(
+            'SELECT new_id FROM id_map WHERE model=? AND old_id=?', key
+        ).fetchone()
+        return row[0] if row else None
+
+    def flush(self):
+        if not self.pending:
+            return
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO id_map VALUES (?, ?, ?)',
+                [key + (new_id,) for key, new_id in self.pending.items()]
+            )
+        self.pending = dict()
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+
 class BaseImportXMLCommand(BaseCommand):
     help = 'Base command for adding XML data from other forums to Askbot'
 
@@ -25,6 +142,21 @@ class BaseImportXMLCommand(BaseCommand):
             default='none',
             help='Format for the redirect files (apache|nginx|none)'
         )
+        parser.add_argument('--batch-size',
+            action='store',
+            type=int,
+            dest='batch_size',
+            default=500,
+            help='Number of objects written to the database at once'
+        )
+        parser.add_argument('--work-dir',
+            action='store',
+            type=str,
+            dest='work_dir',
+            default=None,
+            help='Directory for the temporary files of the import, '
+                 'needs about as much free space as the size of the dump'
+        )
 
     def handle(self, *args, **kwargs):
 
@@ -33,12 +165,16 @@ class BaseImportXMLCommand(BaseCommand):
         #init the redirects file format table
         self.redirect_format = self.get_redirect_format(kwargs['redirect_format'])
 
-        self.setup_run()
-        self.read_xml_file(kwargs['xml_file'])
+        self.batch_size = max(kwargs['batch_size'], 1)
+        self.setup_run(work_dir=kwargs['work_dir'])
+        try:
+            self.read_xml_file(kwargs['xml_file'])
 
-        self.remember_message_ids()
-        self.handle_import()
-        self.delete_new_messages()
+            self.remember_message_ids()
+            self.handle_import()
+            self.delete_new_messages()
+        finally:
+            self.finish_run()
 
     def handle_import(self):
         """this method should contain the actual work of importing data
@@ -61,34 +197,79 @@ class BaseImportXMLCommand(BaseCommand):
         format_table = defaultdict(lambda: '%s %s\n', format_table)
         return format_table[format_setting]
 
-    def setup_run(self):
+    def setup_run(self, work_dir=None):
         """remembers the run information,
-        for the logging purposes
+        for the logging purposes, and creates
+        the working directory with the id map
         """
         command = ' '.join(sys.argv)
         run = ImportRun.objects.create(command=command)
         self.run = run
+        self.batch_size = getattr(self, 'batch_size', 500)
+        self.work_dir = mkdtemp(prefix='askbot_import_', dir=work_dir)
+        self.id_map = ImportedIdMap(
+                            os.path.join(self.work_dir, 'id_map.sqlite3'),
+                            batch_size=self.batch_size
+                        )
+        self.pending_logs = list()
+        self.model_files = dict()
+        self.model_counts = defaultdict(int)
+
+    def finish_run(self):
+        """saves the remaining logs and deletes the working directory"""
+        self.flush_logs()
+        self.id_map.close()
+        shutil.rmtree(self.work_dir, ignore_errors=True)
 
     def read_xml_file(self, filename):
-        """reads xml data int BeautifulSoup instance"""
+        """splits the xml dump into files per model in the working
+        directory, reading it incrementally, so that the memory use
+        does not depend on the size of the dump"""
         if not os.path.isfile(filename):
-            raise CommandError(f'File {filename} does not exist') % filename
-        xml = open(filename, 'r', encoding='utf-8').read()
-        self.soup = BeautifulSoup(xml, ['lxml', 'xml'])
+            raise CommandError(f'File {filename} does not exist')
+
+        model_files = dict()
+        objects = iter_dump_objects(filename)
+        for elem in ImportProgress(objects, message='Reading ' + filename):
+            model_name = elem.get('model')
+            if model_name not in model_files:
+                path = os.path.join(self.work_dir, model_name + '.xml')
+                model_files[model_name] = open(path, 'w', encoding='utf-8')
+                model_files[model_name].write(DJANGO_XML_HEADER)
+                self.model_files[model_name] = path
+            model_files[model_name].write(et.tostring(elem, encoding='unicode'))
+            self.model_counts[model_name] += 1
+
+        for model_file in model_files.values():
+            model_file.write(DJANGO_XML_FOOTER)
+            model_file.close()
 
     def remember_message_ids(self):
-        """remembers messages ids of existing messages - we use these
+        """remembers the last id of existing messages - we use it
         to delete any messages added automatically during the import"""
-        self.message_ids = list(Message.objects.values_list('id', flat=True))
+        last_message = Message.objects.order_by('-id').first()
+        self.last_message_id = last_message.id if last_message else 0
 
     def log_action_with_old_id(self, from_object_id, to_object, extra_info=None):
+        self.log_old_id(str(to_object._meta), from_object_id, to_object.id, extra_info)
+
+    def log_old_id(self, model_name, old_id, new_id, extra_info=None):
+        """records the new id of the object in the id map
+        and saves the log record in the next batch"""
+        self.id_map.add(model_name, old_id, new_id)
         info = ImportedObjectInfo()
-        info.old_id = from_object_id
-        info.new_id = to_object.id
-        info.model = str(to_object._meta)
+        info.old_id = old_id
+        info.new_id = new_id
+        info.model = model_name
         info.run = self.run
         info.extra_info = extra_info or {}
-        info.save()
+        self.pending_logs.append(info)
+        if len(self.pending_logs) >= self.batch_size:
+            self.flush_logs()
+
+    def flush_logs(self):
+        ImportedObjectInfo.objects.bulk_create(self.pending_logs)
+        self.pending_logs = list()
 
     def log_action(self, from_object, to_object, extra_info=None):
         self.log_action_with_old_id(from_object.id, to_object, extra_info=extra_info)
@@ -97,15 +278,7 @@ class BaseImportXMLCommand(BaseCommand):
         """Returts id of imported object by old id"""
         if old_id is None:
             return None
-        try:
-            log = ImportedObjectInfo.objects.get(
-                                        model=str(model_class._meta),
-                                        old_id=old_id,
-                                        run=self.run
-                                    )
-            return log.new_id
-        except ImportedObjectInfo.DoesNotExist:
-            return None
+        return self.id_map.get(str(model_class._meta), old_id)
 
     def get_imported_object_by_old_id(self, model_class, old_id):
         """Returns new imported object by id of corresponding old object"""
@@ -116,14 +289,34 @@ class BaseImportXMLCommand(BaseCommand):
 
     def get_objects_for_model(self, model_name):
         """returns iterator of objects from the django
-        xml dump by name"""
-        object_soup = self.soup.find_all('object', {'model': model_name})
-        for datum in object_soup:
-            yield self.get_deserialized_object(datum)
+        xml dump by name, the objects are deserialized one by one"""
+        path = self.model_files.get(model_name)
+        if path is None:
+            return
+
+        with open(path, 'r', encoding='utf-8') as xml_file:
+            objects = serializers.deserialize('xml', xml_file)
+            count = self.model_counts[model_name]
+            for deserialized in ImportProgress(objects, count, 'Importing ' + model_name):
+                obj = deserialized.object
+                obj._m2m_data = deserialized.m2m_data
+                yield obj
+
+    def get_object_batches_for_model(self, model_name):
+        """returns iterator of lists of objects from the
+        xml dump, at most `batch_size` objects each"""
+        batch = list()
+        for obj in self.get_objects_for_model(model_name):
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = list()
+        if batch:
+            yield batch
 
     def delete_new_messages(self):
         """deletes any messages that were added by askbot during the import process"""
-        Message.objects.exclude(id__in=self.message_ids).delete()
+        Message.objects.filter(id__gt=self.last_message_id).delete()
 
     def open_unique_file(self, name_hint):
         """return a file using name_hint as the hint
@@ -160,23 +353,10 @@ class BaseImportXMLCommand(BaseCommand):
             else:
                 return new_name
 
-    def get_deserialized_object(self, xml_soup):
-        """returns deserialized django object for xml soup with one item"""
-        item_xml = smart_str(xml_soup)
-        #below call assumes a single item within
-        obj = serializers.deserialize('xml', item_xml).next().object
-        obj._source_xml = item_xml
-        return obj
-
     def get_m2m_ids_for_field(self, obj, field_name):
-        xml = obj._source_xml
-        soup = BeautifulSoup(xml, ['lxml', 'xml'])
-        ids = []
-        for field in soup.findAll('field', attrs={'name': field_name}):
-            objs = field.findAll('object')
-            for obj_item in objs:
-                ids.append(obj_item.attrs['pk'])
-        return ids
+        """returns old ids of objects related to the
+        deserialized object by the m2m field"""
+        return list(obj._m2m_data.get(field_name, []))
 
     def copy_string_parameter(self, from_obj, to_obj, from_param_name, to_param_name=None):
         """copy value of string parameter from old to new object"""
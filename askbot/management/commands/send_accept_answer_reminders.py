@@ -1,5 +1,6 @@
 
 import datetime
+from collections import defaultdict
 from django.core.management import BaseCommand
 from django.conf import settings as django_settings
 from django.template.loader import get_template
@@ -42,31 +43,44 @@ class Command(BaseCommand):
                                     ).filter(
                                         thread__accepted_answer__isnull=True #answer_accepted = False
                                     ).order_by('-added_at')
-        #for all users, excluding blocked
-        #for each user, select a tag filtered subset
-        #format the email reminder and send it
-        for user in models.User.objects.exclude(askbot_profile__status__in = ('t', 'c')):
-            user_questions = questions.filter(author=user)
+        questions = list(questions)
 
-            final_question_list = user_questions.get_questions_needing_reminder(
+        #group the questions by the authors, excluding blocked
+        #and suspended, select questions needing a reminder
+        #for a batch of authors at once,
+        #format the email reminders and send them
+        questions_by_user = defaultdict(list)
+        for question in questions:
+            questions_by_user[question.author_id].append(question)
+
+        user_ids = sorted(questions_by_user)
+        batch_size = const.REMINDER_USER_BATCH_SIZE
+        for start in range(0, len(user_ids), batch_size):
+            users = models.User.objects.filter(
+                                id__in=user_ids[start:start + batch_size]
+                            ).exclude(
+                                askbot_profile__status__in = ('t', 'c')
+                            ).order_by('id')
+            users = list(users)
+            reminders = models.Activity.objects.select_reminders(
+                dict((user.id, questions_by_user[user.id]) for user in users),
                 activity_type=const.TYPE_ACTIVITY_ACCEPT_ANSWER_REMINDER_SENT,
-                user=user,
                 recurrence_delay=schedule.recurrence_delay
             )
-            #todo: rewrite using query set filter
-            #may be a lot more efficient
-
-            question_count = len(final_question_list)
-            if question_count == 0:
-                continue
+            for user in users:
+                if user.id in reminders:
+                    self.send_email(user, reminders[user.id])
 
-            email = AcceptAnswersReminder({
-                        'questions': final_question_list,
-                        'recipient_user': user
-                    })
+    @staticmethod
+    def send_email(user, questions):
+        """Sends the formatted email"""
+        email = AcceptAnswersReminder({
+                    'questions': questions,
+                    'recipient_user': user
+                })
 
-            if DEBUG_THIS_COMMAND:
-                print("User: %s<br>\nSubject:%s<br>\nText: %s<br>\n" % \
-                    (user.email, email.render_subject(), email.render_body()))
-            else:
-                email.send([user.email],)
+        if DEBUG_THIS_COMMAND:
+            print("User: %s<br>\nSubject:%s<br>\nText: %s<br>\n" % \
+                (user.email, email.render_subject(), email.render_body()))
+        else:
+            email.send([user.email],)
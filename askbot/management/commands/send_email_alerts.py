@@ -15,6 +15,7 @@ from django.utils.translation import gettext as _
 from django.utils.translation import activate as activate_language
 
 from askbot import const
+from askbot import spam_checker
 from askbot.deps.django_authopenid.util import email_is_blacklisted
 from askbot.conf import settings as askbot_settings
 from askbot.models import User, Post, PostRevision, Thread
@@ -94,10 +95,10 @@ class Command(BaseCommand):
     def handle(self, **options):
         if askbot_settings.ENABLE_EMAIL_ALERTS:
             activate_language(django_settings.LANGUAGE_CODE)
+            check_blacklist = askbot_settings.BLACKLISTED_EMAIL_PATTERNS_MODE == 'strict'
             for user in User.objects.exclude(askbot_profile__status__in=('b', 't')).iterator():
                 try:
-                    if email_is_blacklisted(user.email) \
-                        and askbot_settings.BLACKLISTED_EMAIL_PATTERNS_MODE == 'strict':
+                    if check_blacklist and email_is_blacklisted(user.email):
                         continue
                     self.send_email_alerts(user)
                 except Exception:
@@ -189,7 +190,8 @@ class Command(BaseCommand):
             thread__closed=True
         ).order_by('-thread__last_activity_at')
 
-        if askbot_settings.CONTENT_MODERATION_MODE == 'premoderation':
+        if askbot_settings.CONTENT_MODERATION_MODE == 'premoderation' \
+            or spam_checker.is_async():
             base_qs = base_qs.filter(approved = True)
         #todo: for some reason filter on did not work as expected ~Q(viewed__who=user) |
         #      Q(viewed__who=user,viewed__when__lt=F('thread__last_activity_at'))
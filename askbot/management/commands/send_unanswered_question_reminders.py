@@ -1,13 +1,21 @@
-"""Command that sends reminders about unanswered questions"""
+"""Command that sends reminders about unanswered questions.
 
+Users are processed in batches. For each batch, the subscriptions,
+tag selections, group memberships and earlier reminders are read
+with one query each. Then the questions of every user of the batch
+are selected in one pass over the candidate questions.
+"""
+from collections import defaultdict
 from django.db.models import Q
 from django.conf import settings as django_settings
 from django.core.management import BaseCommand
+from django.utils import timezone
 from django.utils import translation
 from askbot import models
 from askbot import const
 from askbot.conf import settings as askbot_settings
 from askbot.mail.messages import UnansweredQuestionsReminder
+from askbot.models.tag import tags_match_some_wildcard
 from askbot.utils.classes import ReminderSchedule
 
 DEBUG_THIS_COMMAND = False
@@ -33,23 +41,71 @@ class Command(BaseCommand):
         if schedule.start_cutoff_date == schedule.end_cutoff_date:
             return
 
-        questions = self.get_questions(schedule)
-        if questions.count() == 0:
+        questions = list(self.get_questions(schedule))
+        if len(questions) == 0:
             return
 
+        question_tags = self.get_question_tags(questions)
+        question_groups = self.get_question_groups(questions)
+
         # for each eligible user send a somewhat personalized email if
         # they agreed to receiving those emails
-        for user in self.get_users():
-            user.add_missing_askbot_subscriptions()
-            email_setting = user.notification_subscriptions.filter(feed_type='q_noans')[0]
-            if not email_setting.should_send_now():
-                continue
-            filtered_questions = self.get_filtered_question_list(questions, user, schedule)
-            if not filtered_questions:
-                continue
+        for users in self.get_user_batches():
+            self.send_reminders(users, questions, question_tags,
+                                question_groups, schedule)
+
+
+    def send_reminders(self, users, questions, question_tags,
+                       question_groups, schedule):
+        """sends reminders to a batch of users"""
+        user_ids = [user.id for user in users]
+        models.EmailFeedSetting.objects.add_missing_subscriptions(user_ids)
+        email_settings = models.EmailFeedSetting.objects.filter(
+                                                subscriber_id__in=user_ids,
+                                                feed_type='q_noans'
+                                            )
+        email_settings = dict(
+            (setting.subscriber_id, setting) for setting in email_settings \
+                                            if setting.should_send_now()
+        )
+        users = [user for user in users if user.id in email_settings]
+        if not users:
+            return
 
-            self.send_email(user, filtered_questions)
-            email_setting.mark_reported_now()
+        tag_filters = self.get_tag_filters(users, question_tags)
+        if askbot_settings.GROUPS_ENABLED:
+            user_groups = self.get_user_groups(users)
+
+        questions_by_user = dict()
+        for user in users:
+            tag_filter = tag_filters[user.id]
+            user_questions = list()
+            for question in questions:
+                if question.author_id == user.id:
+                    continue
+                if not tag_filter(question_tags[question.id]):
+                    continue
+                if askbot_settings.GROUPS_ENABLED and \
+                    user_groups[user.id].isdisjoint(question_groups[question.id]):
+                    continue
+                user_questions.append(question)
+            if user_questions:
+                questions_by_user[user.id] = user_questions
+
+        reminders = models.Activity.objects.select_reminders(
+            questions_by_user,
+            activity_type=const.TYPE_ACTIVITY_UNANSWERED_REMINDER_SENT,
+            recurrence_delay=schedule.recurrence_delay
+        )
+
+        reported_setting_ids = list()
+        for user in users:
+            if user.id in reminders:
+                self.send_email(user, reminders[user.id])
+                reported_setting_ids.append(email_settings[user.id].id)
+        models.EmailFeedSetting.objects.filter(
+                                    id__in=reported_setting_ids
+                                ).update(reported_at=timezone.now())
 
 
     @staticmethod
@@ -65,21 +121,105 @@ class Command(BaseCommand):
 
 
     @staticmethod
-    def get_filtered_question_list(questions, user, schedule):
-        """Returns a list of questions tag filtered for the user
-        that fall within acceptable reminder time window."""
-        user_questions = questions.exclude(author=user)
-        user_questions = user.get_tag_filtered_questions(user_questions)
+    def get_question_tags(questions):
+        """returns dictionary question id -> list of
+        (tag id, tag name) of the tags in the current language"""
+        thread_questions = defaultdict(list)
+        for question in questions:
+            thread_questions[question.thread_id].append(question.id)
 
-        if askbot_settings.GROUPS_ENABLED:
-            user_groups = user.get_groups()
-            user_questions = user_questions.filter(groups__in=user_groups)
+        question_tags = dict((question.id, list()) for question in questions)
+        thread_tags = models.Thread.tags.through.objects.filter(
+                                thread_id__in=list(thread_questions),
+                                tag__language_code=translation.get_language()
+                            ).values_list('thread_id', 'tag_id', 'tag__name')
+        for thread_id, tag_id, tag_name in thread_tags:
+            for question_id in thread_questions[thread_id]:
+                question_tags[question_id].append((tag_id, tag_name))
+        return question_tags
+
+
+    @staticmethod
+    def get_question_groups(questions):
+        """returns dictionary question id -> set of group ids"""
+        question_groups = defaultdict(set)
+        post_groups = models.PostToGroup.objects.filter(
+                                post_id__in=[question.id for question in questions]
+                            ).values_list('post_id', 'group_id')
+        for post_id, group_id in post_groups:
+            question_groups[post_id].add(group_id)
+        return question_groups
 
-        return user_questions.get_questions_needing_reminder(
-            user=user,
-            activity_type=const.TYPE_ACTIVITY_UNANSWERED_REMINDER_SENT,
-            recurrence_delay=schedule.recurrence_delay
-        )
+
+    @staticmethod
+    def get_user_groups(users):
+        """returns dictionary user id -> set of group ids,
+        same as ``user.get_groups()``"""
+        user_groups = defaultdict(set)
+        memberships = models.GroupMembership.objects.filter(
+                                user_id__in=[user.id for user in users]
+                            ).values_list('user_id', 'group_id')
+        for user_id, group_id in memberships:
+            user_groups[user_id].add(group_id)
+        return user_groups
+
+
+    @staticmethod
+    def get_tag_filters(users, question_tags):
+        """returns dictionary user id -> function, which tells
+        whether the question with the given list of tags passes
+        the email tag filter of the user,
+        same as ``user.get_tag_filtered_questions()``"""
+        if askbot_settings.SUBSCRIBED_TAG_SELECTOR_ENABLED:
+            interesting_reason = 'subscribed'
+        else:
+            interesting_reason = 'good'
+
+        tag_ids = set()
+        for tags in question_tags.values():
+            tag_ids.update(tag_id for tag_id, _ in tags)
+        marked_tags = defaultdict(set)
+        marks = models.MarkedTag.objects.filter(
+                                user_id__in=[user.id for user in users],
+                                reason__in=('bad', interesting_reason),
+                                tag_id__in=tag_ids
+                            ).values_list('user_id', 'reason', 'tag_id')
+        for user_id, reason, tag_id in marks:
+            marked_tags[(user_id, reason)].add(tag_id)
+
+        def make_matcher(tag_ids, wildcards):
+            """returns function, true if any of the tags
+            is selected by id or matches a wildcard"""
+            def matches(tags):
+                for tag_id, tag_name in tags:
+                    if tag_id in tag_ids:
+                        return True
+                    if wildcards and tags_match_some_wildcard([tag_name], wildcards):
+                        return True
+                return False
+            return matches
+
+        tag_filters = dict()
+        for user in users:
+            strategy = user.email_tag_filter_strategy
+            if strategy == const.EXCLUDE_IGNORED:
+                matches = make_matcher(
+                    marked_tags[(user.id, 'bad')],
+                    user.ignored_tags.strip().split()
+                )
+                tag_filters[user.id] = lambda tags, matches=matches: not matches(tags)
+            elif strategy == const.INCLUDE_INTERESTING:
+                if interesting_reason == 'subscribed':
+                    wildcards = user.subscribed_tags.strip().split()
+                else:
+                    wildcards = user.interesting_tags.strip().split()
+                tag_filters[user.id] = make_matcher(
+                    marked_tags[(user.id, interesting_reason)],
+                    wildcards
+                )
+            else:
+                tag_filters[user.id] = lambda tags: True
+        return tag_filters
 
 
     @staticmethod
@@ -105,6 +245,18 @@ class Command(BaseCommand):
         return questions.order_by('added_at')
 
 
+    def get_user_batches(self):
+        """yields lists of eligible users, ordered by id"""
+        users = self.get_users().select_related('askbot_profile').order_by('id')
+        last_id = 0
+        while True:
+            batch = list(users.filter(id__gt=last_id)[:const.REMINDER_USER_BATCH_SIZE])
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1].id
+
+
     @staticmethod
     def get_users():
         """Returns query set of users that are eligible to receive
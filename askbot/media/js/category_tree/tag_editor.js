@@ -315,6 +315,7 @@ TagEditor.prototype.decorate = function (element) {
         },
         minChars: 1,
         useCache: true,
+        matchSubset: false,
         matchInside: true,
         maxCacheLength: 100,
         delay: 10
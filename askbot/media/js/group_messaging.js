@@ -342,12 +342,21 @@ ThreadList.prototype.getOpenThreadHandler = function (threadId) {
 
 ThreadList.prototype.deleteThread = function (threadId) {
     var ctr = this._messageCenter;
-    ctr.deleteThread(threadId, this._senderId);
+    ctr.deleteThread(threadId, this._senderId, this._page);
 };
 
 ThreadList.prototype.restoreThread = function (threadId) {
     var ctr = this._messageCenter;
-    ctr.restoreThread(threadId, this._senderId);
+    ctr.restoreThread(threadId, this._senderId, this._page);
+};
+
+ThreadList.prototype.getPageHandler = function (page) {
+    var messageCenter = this._messageCenter;
+    var senderId = this._senderId;
+    return function () {
+        messageCenter.loadThreadsForSender(senderId, page);
+        return false;
+    };
 };
 
 
@@ -378,6 +387,13 @@ ThreadList.prototype.decorate = function (element) {
     this._threads = threads;
     this._emptyMemo = element.find('.js-no-threads');
     this._senderId = element.data('senderId');
+    this._page = element.data('page');
+
+    var pageLinks = element.find('.js-page-link');
+    $.each(pageLinks, function (idx, pageLink) {
+        pageLink = $(pageLink);
+        setupButtonEventHandlers(pageLink, me.getPageHandler(pageLink.data('page')));
+    });
 };
 
 
@@ -624,12 +640,12 @@ MessageCenter.prototype.setUnreadInboxCount = function (count) {
     this._unreadInboxCount.html(count);
 };
 
-MessageCenter.prototype.hitThreadList = function (url, senderId, requestMethod) {
+MessageCenter.prototype.hitThreadList = function (url, senderId, requestMethod, page) {
     if (this._loadingStatus === true) {
         return;
     }
     var me = this;
-    var data = { sender_id: senderId };
+    var data = { sender_id: senderId, page: page || 1 };
     $.ajax({
         type: requestMethod,
         dataType: 'json',
@@ -654,19 +670,19 @@ MessageCenter.prototype.hitThreadList = function (url, senderId, requestMethod)
     this.setLoadingStatus(true);
 };
 
-MessageCenter.prototype.deleteThread = function (threadId, senderId) {
+MessageCenter.prototype.deleteThread = function (threadId, senderId, page) {
     var url = this._urls.getThreads + threadId + '/delete/';
-    this.hitThreadList(url, senderId, 'POST');
+    this.hitThreadList(url, senderId, 'POST', page);
 };
 
-MessageCenter.prototype.restoreThread = function (threadId, senderId) {
+MessageCenter.prototype.restoreThread = function (threadId, senderId, page) {
     var url = this._urls.getThreads + threadId + '/restore/';
-    this.hitThreadList(url, senderId, 'POST');
+    this.hitThreadList(url, senderId, 'POST', page);
 };
 
-MessageCenter.prototype.loadThreadsForSender = function (senderId) {
+MessageCenter.prototype.loadThreadsForSender = function (senderId, page) {
     var url = this._urls.getThreads;
-    this.hitThreadList(url, senderId, 'GET');
+    this.hitThreadList(url, senderId, 'GET', page);
 };
 
 MessageCenter.prototype.decorate = function (element) {
@@ -24,6 +24,7 @@
       url: askbot.urls.get_tag_list,
       minChars: 1,
       useCache: true,
+      matchSubset: false,
       matchInside: true,
       maxCacheLength: 100,
       delay: 10
@@ -102,6 +102,7 @@ FullTextSearch.prototype.hydrateTagSearchInput = function () {
     url: askbot.urls.get_tag_list,
     minChars: 1,
     useCache: true,
+    matchSubset: false,
     matchInside: true,
     maxCacheLength: 100,
     maxItemsToShow: 20,
@@ -30,6 +30,12 @@
                 if (data.file_name) {
                     updateUi(data.file_name);
                     clearInterval(interval);
+                } else if (data.progress !== null && data.progress !== undefined) {
+                    var exporting = $('#exporting');
+                    if (!exporting.data('label')) {
+                        exporting.data('label', exporting.text());
+                    }
+                    exporting.text(exporting.data('label') + ' ' + data.progress + '%');
                 }
             }
         });
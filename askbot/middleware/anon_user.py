@@ -7,10 +7,20 @@ message manager is defined here, and :meth:`__deepcopy__()` method
 added to the :class:`AnonymousUser` so that user could be pickled.
 
 Secondly, it sends greeting message to anonymous users.
+
+Neither the messages nor the greeting need a session:
+the messages are kept in a signed cookie and the greeting
+is shown once per browser, remembered by a cookie,
+so the anonymous visitors, including the crawlers,
+do not create session records.
 """
 from django.conf import settings as django_settings
-from askbot.user_messages import create_message, get_and_delete_messages
+from askbot.user_messages import create_message, get_and_delete_messages, save_messages
 from askbot.conf import settings as askbot_settings
+from askbot.utils.functions import not_a_robot_request
+
+GREETING_COOKIE_NAME = 'askbot_greeting_shown'
+GREETING_COOKIE_MAX_AGE = 365*24*60*60
 
 class AnonymousMessageManager(object):
     """message manager for the anonymous user"""
@@ -23,7 +33,7 @@ class AnonymousMessageManager(object):
 
     def get_and_delete(self):
         """returns messages sent to the anonymous user
-        via session, and removes messages from the session"""
+        via cookie, and removes messages from the cookie"""
         messages = get_and_delete_messages(self.request)
         return messages
 
@@ -71,22 +81,31 @@ class ConnectToSessionMessagesMiddleware(object):
             #plug on deepcopy which may be called by django db "driver"
             connect_messages_to_anon_user(request)
 
-            #2) set the first greeting one time per session only
-            if 'greeting_set' not in request.session and \
+            #2) set the first greeting one time per browser only
+            if GREETING_COOKIE_NAME not in request.COOKIES and \
                     'askbot_visitor' not in request.COOKIES and \
-			        askbot_settings.ENABLE_GREETING_FOR_ANON_USER:
-                request.session['greeting_set'] = True
+                    askbot_settings.ENABLE_GREETING_FOR_ANON_USER and \
+                    not_a_robot_request(request):
+                request.askbot_greeting_set = True
                 msg = askbot_settings.GREETING_FOR_ANONYMOUS_USER
                 request.user.message_set.create(message=msg)
 
     def process_response(self, request, response):
-        """Adds the ``'askbot_visitor'``key to cookie if user ever
+        """Saves messages which were not shown in the cookie,
+        marks that the greeting was shown and
+        adds the ``'askbot_visitor'``key to cookie if user ever
         authenticates so that the anonymous user message won't
         be shown after the user logs out"""
+        #messages may be sent outside of askbot urls, e.g. on logout
+        save_messages(request, response)
         if not request.path.startswith('/' + django_settings.ASKBOT_URL):
             #todo: a hack, for real we need to remove this middleware
             #and switch to the new-style session messages
             return response
+        if getattr(request, 'askbot_greeting_set', False):
+            response.set_cookie(GREETING_COOKIE_NAME, 1,
+                                max_age=GREETING_COOKIE_MAX_AGE,
+                                samesite='Lax')
         if hasattr(request, 'user') and \
                 request.user.is_authenticated and \
                 'askbot_visitor' not in request.COOKIES :
@@ -41,12 +41,28 @@ More details about how the caching works:
 * This middleware also sets ETag, Last-Modified, Expires and Cache-Control
   headers on the response object.
 
-"""
+The ``AnonymousPageCacheMiddleware`` is the full page cache for
+the anonymous visitors, invalidated by the thread events,
+see :mod:`askbot.page_cache`.
 
+"""
+import re
+import time
 from django.conf import settings
-from django.core.cache import caches, DEFAULT_CACHE_ALIAS
+from django.core.cache import cache, caches, DEFAULT_CACHE_ALIAS
+from django.http import HttpResponse
+from django.middleware.csrf import (CSRF_TOKEN_LENGTH, _unmask_cipher_token,
+    get_token)
 from django.utils.cache import (get_cache_key, get_max_age, has_vary_header,
     learn_cache_key, patch_response_headers)
+from askbot import const
+from askbot import page_cache
+from askbot import signals
+from askbot.user_messages import has_messages
+
+CSRF_TOKEN_RE = re.compile(rb'(?<![a-zA-Z0-9])[a-zA-Z0-9]{%d}(?![a-zA-Z0-9])' % CSRF_TOKEN_LENGTH)
+CSRF_TOKEN_PLACEHOLDER = b'askbot-page-cache-csrf-token'
+UNCACHEABLE_CONTROLS = ('private', 'no-cache', 'no-store')
 
 
 class UpdateCacheMiddleware(object):
@@ -227,3 +243,141 @@ class CacheMiddleware(UpdateCacheMiddleware, FetchFromCacheMiddleware):
         response = self.get_response(request) # i think this simply chains all middleware
         response = self.process_response(request, response)
         return response
+
+
+def hide_csrf_tokens(content, csrf_secret):
+    """replaces the csrf tokens made from the secret
+    of the visitor with the placeholder"""
+    def replace(match):
+        token = match.group(0)
+        if _unmask_cipher_token(token.decode('ascii')) == csrf_secret:
+            return CSRF_TOKEN_PLACEHOLDER
+        return token
+    return CSRF_TOKEN_RE.sub(replace, content)
+
+
+def record_question_visit(request, question_id):
+    """sends the question_visited signal for the page served
+    from the cache, as if the question view was called"""
+    from askbot.models import Post
+    question = Post.objects.filter(id=question_id).select_related('thread').first()
+    if question:
+        signals.question_visited.send(None, request=request, question=question)
+
+
+class AnonymousPageCacheMiddleware(object):
+    """Serves the pages of the anonymous visitors from the cache.
+
+    The pages are shared by all visitors without a session
+    and without the messages; csrf tokens of the page are
+    replaced with the tokens of the visitor.
+
+    Must be placed after the ``CancelActionMiddleware``,
+    so that the cached pages are served after the access checks,
+    and before the ``SpacelessMiddleware``.
+    """
+    def __init__(self, get_response=None):
+        if get_response is None:
+            get_response = lambda x:x
+        self.get_response = get_response
+        self.timeout = settings.ASKBOT_PAGE_CACHE_TIMEOUT
+        self.stale_timeout = settings.ASKBOT_PAGE_CACHE_STALE_TIMEOUT
+
+    def __call__(self, request):
+        response = self.process_request(request)
+        if response is None:
+            response = self.get_response(request)
+            response = self.process_response(request, response)
+        return response
+
+    def is_cacheable_request(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return False
+        if not request.path.startswith('/' + settings.ASKBOT_URL):
+            return False
+        if settings.SESSION_COOKIE_NAME in request.COOKIES:
+            return False
+        return request.user.is_anonymous and not has_messages(request)
+
+    def is_cacheable_response(self, request, response):
+        if response.streaming or response.status_code != 200:
+            return False
+        #cookies set by the views and the messages are meant for one visitor,
+        #the csrf cookie is set again with the cached page
+        cookies = set(response.cookies) - set([settings.CSRF_COOKIE_NAME])
+        if cookies or has_messages(request):
+            return False
+        cache_control = response.get('Cache-Control', '')
+        if any(value in cache_control for value in UNCACHEABLE_CONTROLS):
+            return False
+        return get_max_age(response) != 0
+
+    def process_request(self, request):
+        """Returns the cached page, if it is fresh,
+        or if the page is being rendered by another request"""
+        request.page_cache_key = None
+        if not self.is_cacheable_request(request):
+            return None
+
+        key = page_cache.get_page_cache_key(request)
+        entry = cache.get(key)
+        if entry:
+            versions = page_cache.get_versions(list(entry['versions']))
+            is_fresh = entry['fresh_until'] > time.time() \
+                        and versions == entry['versions']
+            if is_fresh:
+                return self.get_cached_response(request, entry, 'hit')
+
+            lock_key = page_cache.get_rebuild_lock_cache_key(key)
+            if not cache.add(lock_key, 1, const.PAGE_CACHE_REBUILD_TIMEOUT):
+                return self.get_cached_response(request, entry, 'stale')
+
+        page_cache.count_request(hit=False)
+        request.page_cache_key = key
+        #versions are read before the rendering, so that
+        #the changes made meanwhile make the page stale
+        key = page_cache.ALL_THREADS_VERSION_CACHE_KEY
+        request.page_cache_versions = page_cache.get_versions([key])
+        return None
+
+    def process_response(self, request, response):
+        """Stores the page in the cache, if it is the same for
+        all anonymous visitors"""
+        key = request.page_cache_key
+        if key is None:
+            return response
+
+        if self.is_cacheable_response(request, response):
+            content = response.content
+            csrf_secret = request.META.get('CSRF_COOKIE')
+            if csrf_secret:
+                content = hide_csrf_tokens(content, csrf_secret)
+            headers = [(name, value) for name, value in response.items()
+                       if name.lower() != 'content-length']
+            entry = {
+                'content': content,
+                'headers': headers,
+                'versions': request.page_cache_versions,
+                'fresh_until': time.time() + self.timeout,
+                'question_id': getattr(request, 'page_cache_question_id', None)
+            }
+            cache.set(key, entry, self.timeout + self.stale_timeout)
+
+        cache.delete(page_cache.get_rebuild_lock_cache_key(key))
+        response['X-Askbot-Page-Cache'] = 'miss'
+        return response
+
+    def get_cached_response(self, request, entry, status):
+        page_cache.count_request(hit=True)
+        content = entry['content']
+        if CSRF_TOKEN_PLACEHOLDER in content:
+            content = content.replace(CSRF_TOKEN_PLACEHOLDER,
+                                      get_token(request).encode('ascii'))
+        response = HttpResponse(content)
+        for name, value in entry['headers']:
+            response[name] = value
+        response['X-Askbot-Page-Cache'] = status
+
+        if entry['question_id']:
+            record_question_visit(request, entry['question_id'])
+        return response
@@ -2,28 +2,52 @@
 Middleware that strips whitespace between html tags
 copied from David Cramer's blog
 http://www.davidcramer.net/code/369/spaceless-html-in-django.html
+
+The pages rendered from the askbot templates are skipped,
+their whitespace is reduced once, when the templates are compiled
+by the :class:`~askbot.templatetags.spaceless.SpacelessExtension`.
 """
 import re
 
 from django.utils.deprecation import MiddlewareMixin
-from django.utils.functional import keep_lazy
-from django.utils.encoding import force_str
 
-@keep_lazy(str)
-def reduce_spaces_between_tags(value):
-    """Returns the given HTML with all spaces between tags removed.
-    ,but one. One space is left so that consecutive links and other things
-    do not appear glued together
-    slight mod of django.utils.html import strip_spaces_between_tags
-    """
-    return re.sub(r'>\s+<', '> <', force_str(value))
+SPACE_BETWEEN_TAGS_RE = re.compile(rb'>\s+<')
+TRAILING_SPACE_RE = re.compile(rb'>\s*$')
+
+def reduce_spaces_in_stream(chunks):
+    """Replaces whitespace between tags with one space
+    in the iterable of byte strings. One space is left so that
+    consecutive links do not appear glued together. The closing
+    bracket of the tag with the whitespace after it at the end
+    of the chunk is held back until the next chunk"""
+    tail = b''
+    for chunk in chunks:
+        chunk = SPACE_BETWEEN_TAGS_RE.sub(b'> <', tail + chunk)
+        match = TRAILING_SPACE_RE.search(chunk)
+        if match:
+            tail = chunk[match.start():]
+            chunk = chunk[:match.start()]
+        else:
+            tail = b''
+        if chunk:
+            yield chunk
+    if tail:
+        yield tail
 
 class SpacelessMiddleware(MiddlewareMixin):
     def process_response(self, request, response):
         """strips whitespace from all documents
-        whose content type is text/html
+        whose content type is text/html and which
+        were not rendered from the askbot templates
         """
-        if 'Content-Type' in response and 'text/html' in response['Content-Type']:
-            response.content = reduce_spaces_between_tags(response.content)
+        if 'text/html' not in response.get('Content-Type', ''):
+            return response
+        if getattr(request, 'askbot_spaceless', False):
+            return response
+
+        if response.streaming:
+            response.streaming_content = reduce_spaces_in_stream(response.streaming_content)
+        else:
+            response.content = SPACE_BETWEEN_TAGS_RE.sub(b'> <', response.content)
             response['Content-Length'] = str(len(response.content))
         return response
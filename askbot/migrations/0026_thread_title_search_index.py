@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from django.db import migrations
+
+def create_title_search_index(apps, schema_editor):
+    """indexes the thread title search vector used by the
+    search-as-you-type title matching"""
+    conn = schema_editor.connection
+    if not hasattr(conn, 'vendor') or conn.vendor != 'postgresql':
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS askbot_title_search_idx '
+            'ON askbot_thread USING gin(title_search_vector)'
+        )
+
+def drop_title_search_index(apps, schema_editor):
+    conn = schema_editor.connection
+    if not hasattr(conn, 'vendor') or conn.vendor != 'postgresql':
+        return
+    with conn.cursor() as cursor:
+        cursor.execute('DROP INDEX IF EXISTS askbot_title_search_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('askbot', '0025_userprofile_email_is_confidential_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_title_search_index, drop_title_search_index)
+    ]
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import jsonfield.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('askbot', '0026_thread_title_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='askbot_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('up_votes', models.PositiveIntegerField(default=0)),
+                ('down_votes', models.PositiveIntegerField(default=0)),
+                ('question_count', models.PositiveIntegerField(default=0)),
+                ('answer_count', models.PositiveIntegerField(default=0)),
+                ('tag_usage', jsonfield.fields.JSONField(default={})),
+                ('posts_are_stale', models.BooleanField(default=True)),
+                ('tags_are_stale', models.BooleanField(default=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+import jsonfield.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('askbot', '0028_userstats_upvote_reputation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userstats',
+            name='tag_usage',
+            field=jsonfield.fields.JSONField(default=dict),
+        ),
+    ]
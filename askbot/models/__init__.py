@@ -14,7 +14,7 @@ import urllib.request, urllib.parse, urllib.error
 from functools import partial
 from django.urls import reverse, NoReverseMatch
 from django.core.paginator import Paginator
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.db.models import signals as django_signals
 from django.utils import translation
 from django.utils.translation import gettext as _
@@ -25,7 +25,8 @@ from django.utils.text import format_lazy
 from django.utils import timezone
 from django.apps import apps
 from django.db import models
-from django.db.models import Count, Q
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
 from django.conf import settings as django_settings
 from django.contrib.contenttypes.models import ContentType
 from django.core.cache import cache
@@ -50,6 +51,7 @@ from askbot.models.tag import format_personal_group_name
 from askbot.models.user import EmailFeedSetting, ActivityAuditStatus, Activity
 from askbot.models.user import GroupMembership
 from askbot.models.user import Group
+from askbot.models.user import get_user_groups_cache_key
 from askbot.models.user import BulkTagSubscription
 from askbot.models.post import Post, PostRevision
 from askbot.models.post import PostFlagReason, AnonymousAnswer
@@ -57,10 +59,13 @@ from askbot.models.post import PostToGroup
 from askbot.models.post import DraftAnswer
 from askbot.models.user_profile import (
                                 add_profile_properties,
+                                get_profile,
+                                get_loaded_profile,
                                 UserProfile,
                                 LocalizedUserProfile,
                                 get_localized_profile_cache_key
                             )
+from askbot.models.user_stats import UserStats
 from askbot.models.reply_by_email import ReplyAddress
 from askbot.models.badges import award_badges_signal, get_badge
 from askbot.models.repute import Award, Repute, Vote, BadgeData
@@ -231,16 +236,33 @@ def user_get_avatar_type(self):
     return 'g'
 
 
+def get_avatar_urls_version():
+    """returns token of the settings used to calculate
+    the avatar urls, stored with the urls in the
+    UserProfile.avatar_urls, so that the urls are
+    recalculated when the settings change"""
+    data = '|'.join([
+        askbot_settings.GRAVATAR_BASE_URL,
+        askbot_settings.GRAVATAR_TYPE,
+        str(askbot_settings.ENABLE_GRAVATAR),
+        str(askbot_settings.DEFAULT_AVATAR_URL),
+        askbot_settings.ASKBOT_DEFAULT_SKIN
+    ])
+    return hashlib.md5(data.encode('utf-8')).hexdigest()[:8]
+
+
 def user_get_avatar_url(self, size=48):
     """returns avatar url for a given size
-    JSONField .avatar_urls is used as "cache"
-    to avoid multiple db hits to fetch avatar urls
+    from JSONField .avatar_urls, where the urls are saved
+    when the avatar changes, see `init_avatar_urls`.
+    To load the urls with the users, use
+    `select_related('askbot_profile')`.
     """
     size = str(size)
-    url = self.avatar_urls.get(size)
-    if not url:
-        url = self.calculate_avatar_url(size)
-        self.avatar_urls[size] = url
+    avatar_urls = get_loaded_profile(self).avatar_urls
+    url = avatar_urls.get(size)
+    if not url or avatar_urls.get(const.AVATAR_URLS_VERSION_KEY) != get_avatar_urls_version():
+        url = self.init_avatar_urls(extra_sizes=(size,))[size]
     return url
 
 
@@ -318,13 +340,25 @@ def user_calculate_avatar_url(self, size=48):
     return self.get_gravatar_url(size)
 
 
-def user_clear_cached_data(self):
-    """Calls .clear_cached_data() on threads where
-    user contributed any content"""
-    posts = self.posts.all().only('thread_id')
-    for post in posts:
-        if hasattr(post, 'thread_id'):
-            post.thread.clear_cached_data()
+def user_get_contributed_thread_ids(self):
+    """returns list of ids of threads where user
+    authored or edited any posts"""
+    posts = Post.objects.filter(Q(author=self) | Q(last_edited_by=self))
+    posts = posts.exclude(thread_id=None)
+    return list(posts.values_list('thread_id', flat=True).order_by().distinct())
+
+
+def user_clear_cached_data(self, defer=True):
+    """Clears cached data of threads where
+    user contributed any content.
+    For the prolific users, if `defer` is True,
+    the work is done by a celery task"""
+    thread_ids = self.get_contributed_thread_ids()
+    if defer and len(thread_ids) > const.MAX_THREADS_TO_INVALIDATE_INLINE:
+        from askbot.tasks import clear_user_cached_data
+        defer_celery_task(clear_user_cached_data, args=(self.id,))
+        return
+    Thread.objects.clear_cached_data(thread_ids)
 
 
 def user_clear_avatar_urls(self):
@@ -333,14 +367,27 @@ def user_clear_avatar_urls(self):
     self.avatar_urls = {}
 
 
-def user_init_avatar_urls(self):
-    """Assigns missing avatar urls,
-    assumes that remaining avatars are correct"""
+def user_init_avatar_urls(self, extra_sizes=()):
+    """Calculates and saves missing avatar urls
+    for the AVATAR_AUTO_GENERATE_SIZES and the `extra_sizes`,
+    assumes that remaining avatars are correct,
+    unless the avatar settings have changed.
+    Returns dictionary of the avatar urls by size."""
     from avatar.conf import settings as avatar_settings
-    sizes = avatar_settings.AVATAR_AUTO_GENERATE_SIZES
-    for size in sizes:
-        if size not in self.avatar_urls:
-            self.avatar_urls[size] = self.calculate_avatar_url(size)
+    sizes = list(avatar_settings.AVATAR_AUTO_GENERATE_SIZES) + list(extra_sizes)
+
+    version = get_avatar_urls_version()
+    avatar_urls = get_loaded_profile(self).avatar_urls
+    avatar_urls = {str(key): url for key, url in avatar_urls.items()}
+    if avatar_urls.get(const.AVATAR_URLS_VERSION_KEY) != version:
+        avatar_urls = {const.AVATAR_URLS_VERSION_KEY: version}
+
+    missing_sizes = set(str(size) for size in sizes) - set(avatar_urls)
+    if missing_sizes:
+        for size in missing_sizes:
+            avatar_urls[size] = self.calculate_avatar_url(size)
+        self.avatar_urls = avatar_urls
+    return avatar_urls
 
 
 def user_get_top_answers_paginator(self, visitor=None):
@@ -1974,48 +2021,46 @@ def user_delete_question(
 def user_delete_all_content_authored_by_user(self,
                                              author,
                                              timestamp=None,
-                                             mark_as_spam=False):
-    """Deletes all questions, answers and comments made by the user"""
-    count = 0
+                                             mark_as_spam=False,
+                                             defer=True):
+    """Deletes all questions, answers and comments made by the user.
+    Returns number of the posts and True, if their deletion
+    is left to a celery task, which has not run yet.
+
+    Posts are deleted in batches, each batch - in one transaction
+    with set-based queries. Percent of the deleted posts is stored
+    in the cache. When there are many posts and `defer` is True,
+    the work is done by a celery task"""
+    posts = Post.objects.filter(author=author).filter(
+                    Q(post_type__in=('question', 'answer'), deleted=False) | \
+                    Q(post_type='comment')
+                )
+    post_ids = list(posts.order_by('id').values_list('id', flat=True))
+    count = len(post_ids)
+    if defer and count > const.MAX_POSTS_TO_DELETE_INLINE:
+        from askbot.tasks import delete_all_content_authored_by_user
+        task_kwargs = {'deleted_by_id': self.id,
+                       'author_id': author.id,
+                       'mark_as_spam': mark_as_spam}
+        defer_celery_task(delete_all_content_authored_by_user, kwargs=task_kwargs)
+        #eager celery has already done the work
+        is_deferred = not getattr(django_settings, 'CELERY_TASK_ALWAYS_EAGER', False)
+        return count, is_deferred
 
-    #delete answers
-    answers = Post.objects.get_answers().filter(author=author, deleted=False)
     timestamp = timestamp or timezone.now()
-    count += answers.update(deleted_at=timestamp, deleted_by=self, deleted=True)
-    post_ids = list(answers.values_list('pk', flat=True))
-
-    #delete questions
-    questions = Post.objects.get_questions().filter(author=author, deleted=False)
-    count += questions.count()
-    for question in questions:
-        self.delete_question(question=question, timestamp=timestamp)
-        post_ids.append(question.pk)
-
-    threads = Thread.objects.filter(last_activity_by=author)
-    for thread in threads:
-        thread.update_last_activity_info()
-
-    #delete threads
-    thread_ids = questions.values_list('thread_id', flat=True)
-    #load second time b/c threads above are not quite real
-    threads = Thread.objects.filter(id__in=thread_ids)
-    threads.update(deleted=True)
-    for thread in threads:
-        thread.reset_cached_data()
-
-    # delete comments
-    # todo: switch to marking comments as deleted
-    comments = Post.objects.get_comments().filter(author=author)
-    count += comments.count()
-    comments.delete()
-
-    if mark_as_spam:
-        Post.objects.filter(id__in=post_ids).update(
-            marked_as_spam=True,
-            marked_as_spam_by=self,
-            marked_as_spam_at=timestamp
-        )
-        signals.posts_marked_as_spam.send(post_ids=post_ids, sender=self.__class__)
+    progress_key = const.USER_CONTENT_DELETION_PROGRESS_CACHE_KEY % author.id
+    batch_size = const.USER_CONTENT_DELETION_BATCH_SIZE
+    try:
+        for start in range(0, count, batch_size):
+            with transaction.atomic():
+                delete_posts_in_bulk(post_ids[start:start + batch_size],
+                                     deleted_by=self,
+                                     timestamp=timestamp,
+                                     mark_as_spam=mark_as_spam)
+            percent = 100 * min(start + batch_size, count) // count
+            cache.set(progress_key, percent, const.USER_CONTENT_DELETION_PROGRESS_TIMEOUT)
+    finally:
+        cache.delete(progress_key)
 
     #delete all unused tags created by this user
     #tags = author.created_tags.all()
@@ -2025,7 +2070,119 @@ def user_delete_all_content_authored_by_user(self,
     #        tag_ids.append(tag.id)
     #Tag.objects.filter(id__in=tag_ids).delete()
 
-    return count
+    return count, False
+
+
+def delete_posts_in_bulk(post_ids, deleted_by, timestamp, mark_as_spam=False):
+    """Same as deleting posts one by one with `user.delete_post`,
+    but with a fixed number of queries for any number of posts:
+    questions and answers are marked as deleted, along with
+    the threads of the questions, comments are deleted.
+    Answer and comment counts, last activity of the threads
+    and use counts of the tags are recomputed in the database.
+    Permissions are not checked. Badges are considered only
+    for the posts of the `deleted_by` user.
+    """
+    posts = Post.objects.filter(id__in=post_ids)
+    post_data = list(posts.values_list('id', 'post_type', 'thread_id', 'parent_id'))
+    question_ids = list()
+    answer_ids = list()
+    comment_ids = list()
+    thread_ids = set()
+    deleted_thread_ids = set()
+    parent_ids = set()
+    for post_id, post_type, thread_id, parent_id in post_data:
+        if thread_id:
+            thread_ids.add(thread_id)
+        if post_type == 'question':
+            question_ids.append(post_id)
+            deleted_thread_ids.add(thread_id)
+        elif post_type == 'answer':
+            answer_ids.append(post_id)
+        elif post_type == 'comment':
+            comment_ids.append(post_id)
+            parent_ids.add(parent_id)
+
+    removed_ids = question_ids + answer_ids
+
+    #notifications about the removed posts and their comments are deleted,
+    #revisions must be read before the comments are gone
+    revisions = PostRevision.objects.filter(
+                        Q(post_id__in=removed_ids) | Q(post__parent_id__in=removed_ids)
+                    )
+    revision_ids = list(revisions.values_list('id', flat=True))
+
+    Post.objects.filter(id__in=comment_ids).delete()
+    Post.objects.recount_comments(parent_ids)
+
+    Post.objects.filter(id__in=removed_ids).update(deleted=True,
+                                                   deleted_by=deleted_by,
+                                                   deleted_at=timestamp)
+
+    #forget about the accepted answers, but keep the "endorsement"
+    #info on the answer posts, to allow restoring
+    Thread.objects.filter(accepted_answer_id__in=answer_ids).update(accepted_answer=None)
+    Thread.objects.filter(id__in=deleted_thread_ids).update(deleted=True)
+    Thread.objects.update_answer_counts_and_last_activity(thread_ids - deleted_thread_ids)
+
+    tag_ids = Thread.tags.through.objects.filter(
+                            thread_id__in=deleted_thread_ids
+                        ).values_list('tag_id', flat=True)
+    tags = Tag.objects.filter(id__in=list(tag_ids))
+    tags.update_use_counts_in_bulk()
+    tags.filter(used_count=0, deleted=False).update(deleted=True,
+                                                    deleted_by=deleted_by,
+                                                    deleted_at=timestamp)
+
+    #same records as made by `record_delete_post` for each post
+    question_ids_by_thread = dict(
+        Post.objects.filter(
+                    thread_id__in=thread_ids, post_type='question'
+                ).values_list('thread_id', 'id')
+    )
+    post_content_type = ContentType.objects.get_for_model(Post)
+    activity_types = {'question': const.TYPE_ACTIVITY_DELETE_QUESTION,
+                      'answer': const.TYPE_ACTIVITY_DELETE_ANSWER}
+    activities = list()
+    for post_id, post_type, thread_id, parent_id in post_data:
+        if post_type in activity_types:
+            activities.append(Activity(
+                        user=deleted_by,
+                        active_at=timestamp,
+                        content_type=post_content_type,
+                        object_id=post_id,
+                        activity_type=activity_types[post_type],
+                        question_id=question_ids_by_thread.get(thread_id)
+                    ))
+    Activity.objects.bulk_create(activities)
+
+    if revision_ids:
+        from askbot.tasks import delete_update_notifications_task
+        defer_celery_task(delete_update_notifications_task, args=(revision_ids, True))
+
+    if mark_as_spam and removed_ids:
+        Post.objects.filter(id__in=removed_ids).update(
+            marked_as_spam=True,
+            marked_as_spam_by=deleted_by,
+            marked_as_spam_at=timestamp
+        )
+        signals.posts_marked_as_spam.send(post_ids=removed_ids, sender=User)
+
+    Thread.objects.clear_cached_data(thread_ids)
+    signals.posts_removed_in_bulk.send(sender=Post,
+                                       post_ids=removed_ids,
+                                       thread_ids=list(thread_ids),
+                                       deleted_by=deleted_by)
+
+    #"delete_post" badges are given only for deleting own posts,
+    #so the posts of other users are not loaded
+    own_posts = Post.objects.filter(id__in=removed_ids, author=deleted_by)
+    for post in own_posts:
+        award_badges_signal.send(None,
+                                 event='delete_post',
+                                 actor=deleted_by,
+                                 context_object=post,
+                                 timestamp=timestamp)
 
 
 @auto_now_timestamp
@@ -2556,24 +2713,7 @@ def user_is_administrator(self):
 
 
 def user_add_missing_askbot_subscriptions(self):
-    from askbot import forms#need to avoid circular dependency
-    form = forms.EditUserEmailFeedsForm()
-    need_feed_types = form.get_db_model_subscription_type_names()
-    have_feed_types = EmailFeedSetting.objects.filter(
-                                            subscriber = self
-                                        ).values_list(
-                                            'feed_type', flat = True
-                                        )
-    missing_feed_types = set(need_feed_types) - set(have_feed_types)
-    for missing_feed_type in missing_feed_types:
-        attr_key = 'DEFAULT_NOTIFICATION_DELIVERY_SCHEDULE_%s' % missing_feed_type.upper()
-        freq = getattr(askbot_settings, attr_key)
-        feed_setting = EmailFeedSetting(
-                            subscriber = self,
-                            feed_type = missing_feed_type,
-                            frequency = freq
-                        )
-        feed_setting.save()
+    EmailFeedSetting.objects.add_missing_subscriptions([self.id])
 
 
 def user_is_moderator(self):
@@ -2584,7 +2724,7 @@ def user_is_post_moderator(self, post):
     """True, if user and post have common private groups,
     the "everyone" group does not count"""
     if askbot_settings.GROUPS_ENABLED:
-        group_ids = self.get_groups(private=True).values_list('id', flat=True)
+        group_ids = self.get_group_ids(private=True)
         post_groups = PostToGroup.objects.filter(post=post, group__id__in=group_ids)
         return post_groups.count() > 0
     return False
@@ -2925,9 +3065,28 @@ def get_profile_link(self, text=None):
 
     return mark_safe(profile_link)
 
+def user_get_group_membership_levels(self):
+    """returns dictionary group id -> membership level
+    of all groups to which user belongs,
+    cached until the memberships of the user change"""
+    cache_key = get_user_groups_cache_key(self.pk)
+    levels = cache.get(cache_key)
+    if levels is None:
+        memberships = GroupMembership.objects.filter(user=self)
+        levels = dict(memberships.values_list('group_id', 'level'))
+        cache.set(cache_key, levels, const.GROUPS_CACHE_TIMEOUT)
+    return levels
+
+def user_get_group_ids(self, private=False):
+    """returns set of ids of the groups to which user belongs,
+    if `private` is True - without the global group"""
+    group_ids = set(self.get_group_membership_levels())
+    if private:
+        group_ids.discard(Group.objects.get_global_group().pk)
+    return group_ids
+
 def user_get_groups(self, private=False):
     """returns a query set of groups to which user belongs"""
-    #todo: maybe cache this query
     return Group.objects.get_for_user(self, private=private)
 
 def user_join_default_groups(self):
@@ -2954,9 +3113,7 @@ def user_get_personal_group(self):
 
 def user_get_foreign_groups(self):
     """returns a query set of groups to which user does not belong"""
-    #todo: maybe cache this query
-    user_group_ids = self.get_groups().values_list('id', flat = True)
-    return Group.objects.exclude(id__in = user_group_ids)
+    return Group.objects.exclude(id__in = self.get_group_ids())
 
 def user_get_primary_group(self):
     """a temporary function - returns ether None or
@@ -3077,20 +3234,15 @@ def user_get_groups_membership_info(self, groups):
 
     ``groups`` is a group tag query set
     """
-    group_ids = groups.values_list('id', flat = True)
-    memberships = GroupMembership.objects.filter(
-                                user__id = self.id,
-                                group__id__in = group_ids
-                            )
+    levels = self.get_group_membership_levels()
 
     info = collections.defaultdict(
         lambda: {'acceptance_level': 'closed', 'membership_level': 'none'}
     )
-    for membership in memberships:
-        membership_level = membership.get_level_display()
-        info[membership.group_id]['membership_level'] = membership_level
-
     for group in groups:
+        if group.id in levels:
+            membership_level = GroupMembership.get_level_value_display(levels[group.id])
+            info[group.id]['membership_level'] = membership_level
         info[group.id]['acceptance_level'] = group.get_openness_level_for_user(self)
 
     return info
@@ -3218,6 +3370,7 @@ def _process_vote(user, post, timestamp=None, cancel=False, vote_type=None):
         vote = Vote.objects.get(user = user, voted_post=post)
     except Vote.DoesNotExist:
         vote = None
+    old_vote = None
     if cancel:
         if vote == None:
             return
@@ -3238,6 +3391,7 @@ def _process_vote(user, post, timestamp=None, cancel=False, vote_type=None):
                     voted_at = timestamp,
                 )
         elif vote.is_opposite(vote_type):
+            old_vote = vote.vote
             vote.vote = vote_type
         else:
             return
@@ -3254,16 +3408,15 @@ def _process_vote(user, post, timestamp=None, cancel=False, vote_type=None):
         else:
             auth.onDownVoted(vote, post, user, timestamp)
 
+    #the score of question posts is copied onto the thread by the auth functions
     post.thread.reset_cached_data()
 
-    if post.post_type == 'question':
-        #denormalize the question post score on the thread
-        post.thread.points = post.points
-        post.thread.save()
-
     if cancel:
         return None
 
+    if old_vote is not None:
+        signals.vote_reversed.send(sender=Vote, vote=vote, old_vote=old_vote)
+
     event = VOTES_TO_EVENTS.get((vote_type, post.post_type), None)
     if event:
         award_badges_signal.send(None,
@@ -3328,9 +3481,16 @@ def user_approve_post_revision(user, post_revision, timestamp = None):
     """approves the post revision and, if necessary,
     the parent post and threads"""
     user.assert_can_approve_post_revision()
+    publish_post_revision(post_revision, approved_by=user, timestamp=timestamp)
 
+
+def publish_post_revision(post_revision, approved_by=None, timestamp=None):
+    """publishes the revision and, if necessary,
+    the parent post and threads, without the permission check,
+    `approved_by` is None when the revision is published
+    automatically, e.g. after the spam check"""
     post_revision.approved = True
-    post_revision.approved_by = user
+    post_revision.approved_by = approved_by
     post_revision.approved_at = timestamp
 
     post = post_revision.post
@@ -3470,24 +3630,35 @@ def user_update_response_counts(user):
 
 
 def user_receive_reputation(self, num_points, language_code=None):
+    """changes reputation of the user with F-expression updates,
+    so that concurrent changes do not overwrite each other,
+    the user record does not need to be saved afterwards"""
     language_code = language_code or get_language()
     old_points = self.reputation
-    new_points = old_points + num_points
-    self.reputation = max(const.MIN_REPUTATION, new_points)
+    profiles = UserProfile.objects.filter(pk=self.pk)
+    profiles.update(
+        reputation=Greatest(F('reputation') + num_points, const.MIN_REPUTATION)
+    )
+    #sync the cached profile with the new value
+    profile = get_profile(self)
+    profile.reputation = profiles.values_list('reputation', flat=True)[0]
+    profile.update_cache()
 
     #record localized user reputation - this starts with 0
-    try:
-        profile = LocalizedUserProfile.objects.get(
-                                            auth_user=self,
-                                            language_code=language_code
-                                        )
-    except LocalizedUserProfile.DoesNotExist:
-        profile = LocalizedUserProfile(
+    updated = LocalizedUserProfile.objects.filter(
+                                        auth_user=self,
+                                        language_code=language_code
+                                    ).update(
+                                        reputation=Greatest(F('reputation') + num_points, 0)
+                                    )
+    if updated:
+        cache.delete(get_localized_profile_cache_key(self, language_code))
+    else:
+        LocalizedUserProfile.objects.create(
                                     auth_user=self,
-                                    language_code=language_code
+                                    language_code=language_code,
+                                    reputation=max(0, num_points)
                                 )
-    profile.reputation = max(0, profile.reputation + num_points)
-    profile.save()
 
     signals.reputation_received.send(None, user=self, reputation_before=old_points)
 
@@ -3613,9 +3784,7 @@ def user_is_group_member(self, group=None):
                 user=self, group__name=group
             ).count() == 1
     else:
-        return GroupMembership.objects.filter(
-                                user=self, group=group
-                            ).count() == 1
+        return group.pk in self.get_group_membership_levels()
 
 User.add_to_class(
     'add_missing_askbot_subscriptions',
@@ -3644,6 +3813,7 @@ User.add_to_class('can_upload_image', user_can_upload_image)
 User.add_to_class('calculate_avatar_url', user_calculate_avatar_url)
 User.add_to_class('clear_avatar_urls', user_clear_avatar_urls)
 User.add_to_class('clear_cached_data', user_clear_cached_data)
+User.add_to_class('get_contributed_thread_ids', user_get_contributed_thread_ids)
 User.add_to_class('init_avatar_urls', user_init_avatar_urls)
 User.add_to_class('get_default_avatar_url', user_get_default_avatar_url)
 User.add_to_class('get_gravatar_url', user_get_gravatar_url)
@@ -3651,6 +3821,8 @@ User.add_to_class('get_or_create_fake_user', user_get_or_create_fake_user)
 User.add_to_class('get_marked_tags', user_get_marked_tags)
 User.add_to_class('get_marked_tag_names', user_get_marked_tag_names)
 User.add_to_class('get_groups', user_get_groups)
+User.add_to_class('get_group_ids', user_get_group_ids)
+User.add_to_class('get_group_membership_levels', user_get_group_membership_levels)
 User.add_to_class('get_foreign_groups', user_get_foreign_groups)
 User.add_to_class('get_group_membership', user_get_group_membership)
 User.add_to_class('get_personal_group', user_get_personal_group)
@@ -3892,7 +4064,11 @@ def calculate_gravatar_hash(instance, **kwargs):
     if kwargs.get('raw', False):
         return
     clean_email = user.email.strip().lower().encode('utf-8')
-    user.gravatar = hashlib.md5(clean_email).hexdigest()
+    gravatar = hashlib.md5(clean_email).hexdigest()
+    if user.gravatar != gravatar:
+        user.gravatar = gravatar
+        #avatar urls are recalculated by the init_avatar_urls
+        user.clear_avatar_urls()
 
 
 def record_post_update_activity(
@@ -4039,15 +4215,40 @@ def record_user_visit(user, timestamp, **kwargs):
     profile.update_cache()
 
 
+def get_question_view_cache_key(request, question):
+    """returns cache key of the time when anonymous visitor
+    has seen the question, the visitor is identified
+    by the address and the user agent"""
+    visitor = '%s %s' % (request.META.get('REMOTE_ADDR', ''),
+                         request.META.get('HTTP_USER_AGENT', ''))
+    visitor_hash = hashlib.md5(visitor.encode('utf-8')).hexdigest()
+    return const.QUESTION_VIEW_CACHE_KEY % (question.id, visitor_hash)
+
+
+def get_question_view_time(request, question):
+    """returns time when the visitor has last seen the question, or None,
+    anonymous visitors are tracked in the cache without a session"""
+    if request.user.is_anonymous:
+        return cache.get(get_question_view_cache_key(request, question))
+    return request.session.get('question_view_times', {}).get(question.id, None)
+
+
+def set_question_view_time(request, question, timestamp):
+    """stores time when the visitor has seen the question"""
+    if request.user.is_anonymous:
+        cache_key = get_question_view_cache_key(request, question)
+        cache.set(cache_key, timestamp, const.QUESTION_VIEW_CACHE_TIMEOUT)
+    else:
+        view_times = request.session.get('question_view_times', {})
+        view_times[question.id] = timestamp
+        request.session['question_view_times'] = view_times
+
+
 def record_question_visit(request, question, **kwargs):
     if functions.not_a_robot_request(request):
-        #todo: split this out into a subroutine
         #todo: merge view counts per user and per session
         #1) view count per session
-        if 'question_view_times' not in request.session:
-            request.session['question_view_times'] = {}
-
-        last_seen = request.session['question_view_times'].get(question.id, None)
+        last_seen = get_question_view_time(request, question)
 
         if last_seen and timezone.is_naive(last_seen) \
             and getattr(django_settings, 'USE_TZ', False):
@@ -4061,7 +4262,7 @@ def record_question_visit(request, question, **kwargs):
             else:
                 update_view_count = True
 
-        request.session['question_view_times'][question.id] = timezone.now()
+        set_question_view_time(request, question, timezone.now())
         #2) run the slower jobs in a celery task
         from askbot import tasks
         defer_celery_task(
@@ -4200,6 +4401,98 @@ def record_favorite_question(instance, created, **kwargs):
                                         )
         activity.add_recipients(recipients)
 
+def count_vote_in_user_stats(instance, created, **kwargs):
+    """votes cast by the user are counted in the user stats"""
+    if created:
+        UserStats.objects.add_vote(instance.user_id, instance.vote)
+
+def count_reversed_vote_in_user_stats(vote, old_vote, **kwargs):
+    """reversed vote is moved to the other counter of the user stats"""
+    UserStats.objects.add_vote(vote.user_id, vote.vote)
+    UserStats.objects.add_vote(vote.user_id, old_vote, delta=-1)
+
+def uncount_vote_in_user_stats(instance, **kwargs):
+    UserStats.objects.add_vote(instance.user_id, instance.vote, delta=-1)
+
+def count_post_in_user_stats(instance, created, **kwargs):
+    if created:
+        UserStats.objects.add_post(instance)
+
+def mark_post_user_stats_stale(instance, **kwargs):
+    """on removal or restoration of a question post
+    stats of all thread participants become stale,
+    otherwise - of the post author"""
+    if instance.is_question():
+        UserStats.objects.mark_thread_stale(instance.thread_id)
+    else:
+        UserStats.objects.mark_stale([instance.author_id])
+
+def mark_bulk_removed_posts_user_stats_stale(post_ids, thread_ids, **kwargs):
+    """same as `mark_post_user_stats_stale` for the posts removed in bulk"""
+    removed_thread_ids = Thread.objects.filter(id__in=thread_ids, deleted=True).values('id')
+    author_ids = Post.objects.filter(
+                        Q(id__in=post_ids) | Q(thread_id__in=removed_thread_ids)
+                    ).values('author_id')
+    UserStats.objects.mark_stale(author_ids)
+
+def mark_thread_user_stats_stale(thread, **kwargs):
+    """retagging changes the tag usage of the thread participants"""
+    UserStats.objects.mark_thread_stale(thread.id)
+
+def mark_revision_author_stats_stale(revision, **kwargs):
+    UserStats.objects.mark_stale([revision.post.author_id])
+
+def reset_tag_index(instance, **kwargs):
+    """tag autocomplete index is rebuilt
+    when tags are added, changed or deleted"""
+    from askbot.models.tag_index import TagPrefixIndex
+    TagPrefixIndex.invalidate(instance.language_code)
+
+def reset_global_group(**kwargs):
+    """global group is reloaded by all processes
+    when any of the groups is changed or deleted,
+    because the global group may be renamed,
+    and after the database is migrated or flushed,
+    which does not send the delete signals"""
+    Group.objects.invalidate_global_group()
+
+def reset_user_groups(instance, **kwargs):
+    """cached group memberships of the user are
+    dropped when the membership is added, changed or deleted"""
+    cache.delete(get_user_groups_cache_key(instance.user_id))
+
+def reset_thread_sitemap_section(instance, **kwargs):
+    """sitemap section of the thread is rendered anew
+    when the thread or its question changes"""
+    from askbot import sitemap
+    sitemap.invalidate_section(instance.id)
+
+def reset_question_sitemap_section(instance, **kwargs):
+    if instance.is_question() and instance.thread_id:
+        from askbot import sitemap
+        sitemap.invalidate_section(instance.thread_id)
+
+def reset_bulk_removed_posts_sitemap_sections(thread_ids, **kwargs):
+    from askbot import sitemap
+    sitemap.invalidate_sections(thread_ids)
+
+def reset_thread_page_cache(instance, **kwargs):
+    """pages of the thread cached for the anonymous
+    visitors are rendered anew"""
+    from askbot import page_cache
+    page_cache.invalidate_threads([instance.id])
+
+def reset_post_page_cache(instance, **kwargs):
+    """same as `reset_thread_page_cache` for the posts"""
+    if instance.thread_id:
+        from askbot import page_cache
+        page_cache.invalidate_threads([instance.thread_id])
+
+def reset_cached_feeds(**kwargs):
+    """rss feeds are rendered anew after post activity"""
+    from askbot.feed import invalidate_feeds
+    invalidate_feeds()
+
 def record_user_full_updated(instance, **kwargs):
     activity = Activity(
                     user=instance,
@@ -4545,6 +4838,66 @@ django_signals.post_save.connect(
     sender=GroupMembership,
     dispatch_uid='moderate_group_joining_on_gm_save'
 )
+django_signals.post_save.connect(
+    count_vote_in_user_stats,
+    sender=Vote,
+    dispatch_uid='count_vote_in_user_stats_on_vote_save'
+)
+signals.vote_reversed.connect(
+    count_reversed_vote_in_user_stats,
+    sender=Vote,
+    dispatch_uid='count_reversed_vote_in_user_stats'
+)
+django_signals.post_save.connect(
+    count_post_in_user_stats,
+    sender=Post,
+    dispatch_uid='count_post_in_user_stats_on_post_save'
+)
+django_signals.post_save.connect(
+    reset_tag_index,
+    sender=Tag,
+    dispatch_uid='reset_tag_index_on_tag_save'
+)
+django_signals.post_save.connect(
+    reset_global_group,
+    sender=Group,
+    dispatch_uid='reset_global_group_on_group_save'
+)
+django_signals.post_save.connect(
+    reset_user_groups,
+    sender=GroupMembership,
+    dispatch_uid='reset_user_groups_on_gm_save'
+)
+django_signals.post_save.connect(
+    reset_thread_sitemap_section,
+    sender=Thread,
+    dispatch_uid='reset_sitemap_section_on_thread_save'
+)
+django_signals.post_save.connect(
+    reset_question_sitemap_section,
+    sender=Post,
+    dispatch_uid='reset_sitemap_section_on_post_save'
+)
+django_signals.post_save.connect(
+    reset_cached_feeds,
+    sender=Post,
+    dispatch_uid='reset_cached_feeds_on_post_save'
+)
+django_signals.post_save.connect(
+    reset_thread_page_cache,
+    sender=Thread,
+    dispatch_uid='reset_page_cache_on_thread_save'
+)
+django_signals.post_save.connect(
+    reset_post_page_cache,
+    sender=Post,
+    dispatch_uid='reset_page_cache_on_post_save'
+)
+django_signals.post_save.connect(
+    reset_cached_feeds,
+    sender=Thread,
+    dispatch_uid='reset_cached_feeds_on_thread_save'
+)
 django_signals.m2m_changed.connect(
     group_membership_changed,
     sender=User.groups.through, #pylint: disable=no-member
@@ -4557,6 +4910,61 @@ django_signals.post_delete.connect(
     dispatch_uid='record_cancel_vote_on_vote_delete'
 )
 
+django_signals.post_delete.connect(
+    uncount_vote_in_user_stats,
+    sender=Vote,
+    dispatch_uid='uncount_vote_in_user_stats_on_vote_delete'
+)
+django_signals.post_delete.connect(
+    mark_post_user_stats_stale,
+    sender=Post,
+    dispatch_uid='mark_user_stats_stale_on_post_delete'
+)
+django_signals.post_delete.connect(
+    reset_tag_index,
+    sender=Tag,
+    dispatch_uid='reset_tag_index_on_tag_delete'
+)
+django_signals.post_delete.connect(
+    reset_global_group,
+    sender=Group,
+    dispatch_uid='reset_global_group_on_group_delete'
+)
+django_signals.post_migrate.connect(
+    reset_global_group,
+    dispatch_uid='reset_global_group_on_post_migrate'
+)
+django_signals.post_delete.connect(
+    reset_user_groups,
+    sender=GroupMembership,
+    dispatch_uid='reset_user_groups_on_gm_delete'
+)
+django_signals.post_delete.connect(
+    reset_thread_sitemap_section,
+    sender=Thread,
+    dispatch_uid='reset_sitemap_section_on_thread_delete'
+)
+django_signals.post_delete.connect(
+    reset_question_sitemap_section,
+    sender=Post,
+    dispatch_uid='reset_sitemap_section_on_post_delete'
+)
+django_signals.post_delete.connect(
+    reset_cached_feeds,
+    sender=Post,
+    dispatch_uid='reset_cached_feeds_on_post_delete'
+)
+django_signals.post_delete.connect(
+    reset_thread_page_cache,
+    sender=Thread,
+    dispatch_uid='reset_page_cache_on_thread_delete'
+)
+django_signals.post_delete.connect(
+    reset_post_page_cache,
+    sender=Post,
+    dispatch_uid='reset_page_cache_on_post_delete'
+)
+
 django_signals.pre_delete.connect(
     delete_post_activities,
     sender=Post,
@@ -4569,6 +4977,31 @@ signals.after_post_removed.connect(
     sender=Post,
     dispatch_uid='record_delete_question_on_delete_post'
 )
+signals.after_post_removed.connect(
+    mark_post_user_stats_stale,
+    sender=Post,
+    dispatch_uid='mark_user_stats_stale_on_post_removed'
+)
+signals.posts_removed_in_bulk.connect(
+    mark_bulk_removed_posts_user_stats_stale,
+    sender=Post,
+    dispatch_uid='mark_user_stats_stale_on_posts_removed_in_bulk'
+)
+signals.posts_removed_in_bulk.connect(
+    reset_bulk_removed_posts_sitemap_sections,
+    sender=Post,
+    dispatch_uid='reset_sitemap_sections_on_posts_removed_in_bulk'
+)
+signals.posts_removed_in_bulk.connect(
+    reset_cached_feeds,
+    sender=Post,
+    dispatch_uid='reset_cached_feeds_on_posts_removed_in_bulk'
+)
+signals.after_post_restored.connect(
+    mark_post_user_stats_stale,
+    sender=Post,
+    dispatch_uid='mark_user_stats_stale_on_post_restored'
+)
 signals.flag_offensive.connect(
     record_flag_offensive,
     sender=Post,
@@ -4578,6 +5011,10 @@ signals.tags_updated.connect(
     record_update_tags,
     dispatch_uid='record_tag_update'
 )
+signals.tags_updated.connect(
+    mark_thread_user_stats_stale,
+    dispatch_uid='mark_user_stats_stale_on_tag_update'
+)
 signals.user_registered.connect(
     greet_new_user,
     dispatch_uid='greet_user_upon_registration'
@@ -4639,6 +5076,10 @@ signals.post_revision_published.connect(
     notify_author_of_published_revision,
     dispatch_uid='notify_authon_of_published_revision'
 )
+signals.post_revision_published.connect(
+    mark_revision_author_stats_stale,
+    dispatch_uid='mark_user_stats_stale_on_revision_published'
+)
 signals.site_visited.connect(
     record_user_visit,
     dispatch_uid='record_user_visit'
@@ -4710,6 +5151,7 @@ __all__ = [
 
         'User',
         'UserProfile',
+        'UserStats',
 
         'ReplyAddress',
 
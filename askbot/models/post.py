@@ -6,7 +6,8 @@ from urllib.parse import quote as django_urlquote
 from django.contrib.sitemaps import ping_google
 from django.conf import settings as django_settings
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from django.utils import html as html_utils
 from django.utils import timezone
 from django.utils.text import Truncator
@@ -22,6 +23,7 @@ from django.contrib.contenttypes.models import ContentType
 import askbot
 
 from askbot import signals
+from askbot import spam_checker
 from askbot.utils.loading import load_plugin, load_function
 from askbot.utils.slug import slugify
 from askbot import const
@@ -102,11 +104,11 @@ class PostQuerySet(models.query.QuerySet):
             return self
 
         if user is None or user.is_anonymous:
-            groups = [Group.objects.get_global_group()]
+            group_ids = [Group.objects.get_global_group().pk]
         else:
-            groups = user.get_groups()
+            group_ids = user.get_group_ids()
 
-        return self.filter(groups__in=groups).distinct()
+        return self.filter(groups__id__in=group_ids).distinct()
 
     def get_by_text_query(self, search_query):
         """returns a query set of questions,
@@ -161,22 +163,12 @@ class PostQuerySet(models.query.QuerySet):
         """
         # TODO: goes to thread
         from askbot.models import Activity  # avoid circular import
-        question_list = list()
-        for question in self:
-            try:
-                activity = Activity.objects.get(
-                    user=user, question=question, activity_type=activity_type)
-                now = timezone.now()
-                if now < activity.active_at + recurrence_delay:
-                    continue
-            except Activity.DoesNotExist:
-                activity = Activity(user=user, question=question,
-                                    activity_type=activity_type,
-                                    content_object=question)
-            activity.active_at = timezone.now()
-            activity.save()
-            question_list.append(question)
-        return question_list
+        reminders = Activity.objects.select_reminders(
+            {user.id: list(self)},
+            activity_type=activity_type,
+            recurrence_delay=recurrence_delay
+        )
+        return reminders.get(user.id, list())
 
     def get_author_list(self, **kwargs):
         # TODO: - this is duplication - answer manager also has this method
@@ -286,6 +278,19 @@ class PostManager(BaseQuerySetManager):
             thread.save()
         return answer
 
+    def recount_comments(self, post_ids):
+        """same as :meth:`Post.recount_comments`, but for many
+        posts at once, in one UPDATE query"""
+        comments = self.get_comments().filter(
+                                parent_id=models.OuterRef('pk'),
+                                deleted=False,
+                                approved=True
+                            ).order_by().values('parent_id')
+        comment_count = comments.annotate(count=models.Count('id')).values('count')
+        self.filter(id__in=post_ids).update(
+            comment_count=Coalesce(models.Subquery(comment_count), 0)
+        )
+
     def precache_comments(self, for_posts, visitor):
         """
         Fetches comments for given posts, and stores them in post._cached_comments
@@ -294,7 +299,7 @@ class PostManager(BaseQuerySetManager):
         """
         qs = Post.objects.get_comments()\
             .filter(parent__in=for_posts)\
-            .select_related('author')
+            .select_related('author', 'author__askbot_profile')
 
         if visitor.is_anonymous:
             comments = list(qs.order_by('added_at'))
@@ -309,7 +314,8 @@ class PostManager(BaseQuerySetManager):
             comments.sort(key=operator.attrgetter('added_at'))
 
         # filter out comments that user should not see
-        premoderation = askbot_settings.CONTENT_MODERATION_MODE == 'premoderation'
+        premoderation = askbot_settings.CONTENT_MODERATION_MODE == 'premoderation' \
+            or spam_checker.is_async()
         if premoderation and visitor.is_authenticated:
             comments = [comment for comment in comments if (comment.approved or comment.author_id == visitor.pk)]
             
@@ -1022,7 +1028,8 @@ class Post(models.Model):
         if getattr(self, '_is_approved', True) == False:
             return False
 
-        if askbot_settings.CONTENT_MODERATION_MODE == 'premoderation':
+        if askbot_settings.CONTENT_MODERATION_MODE == 'premoderation' \
+            or spam_checker.is_async():
             if self.approved:
                 return True
             if self.revisions.filter(revision=0).count() == 1:
@@ -1841,7 +1848,7 @@ class Post(models.Model):
         if user.is_anonymous:
             raise exception(message)
         else:
-            user_groups_ids = user.get_groups().values_list('id', flat=True)
+            user_groups_ids = user.get_group_ids()
             if post_groups.filter(id__in=user_groups_ids).count() == 0:
                 raise exception(message)
 
@@ -2158,8 +2165,15 @@ class PostRevisionManager(models.Manager):
         needs_premoderation = askbot_settings.CONTENT_MODERATION_MODE == 'premoderation' \
             and needs_moderation
 
+        # with the asynchronous spam checker new posts are held
+        # until the check passes, edits are checked after publication
+        needs_spam_check = is_content and not needs_moderation \
+            and spam_checker.is_async() \
+            and not author.is_administrator_or_moderator()
+        holds_post = needs_spam_check and not post.revisions.exists()
+
         # 0 revision is not shown to the users
-        if needs_premoderation:
+        if needs_premoderation or holds_post:
             kwargs.update({
                 'approved': False,
                 'approved_by': None,
@@ -2194,11 +2208,22 @@ class PostRevisionManager(models.Manager):
         # moderation queue
         if needs_moderation:
             revision.place_on_moderation_queue()
+        elif holds_post:
+            # hides the post from the display to the general public
+            post.set_is_approved(False)
+
+        if needs_spam_check:
+            # the check must see the post saved in full, also when
+            # celery is eager, so the task is not run by `defer_celery_task`
+            from askbot.tasks import check_post_revision_for_spam
+            transaction.on_commit(
+                lambda: check_post_revision_for_spam.apply_async(args=(revision.id,))
+            )
 
         # set current "rendered" revision for soft moderation,
         # for autoapproved revision and premoderated revision
         # of new post
-        if not needs_premoderation:
+        if not (needs_premoderation or holds_post):
             post.current_revision = revision
             post.save()
         elif post.revisions.count() == 1:
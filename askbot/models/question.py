@@ -6,8 +6,9 @@ import regex as re
 
 from copy import copy
 from django.conf import settings as django_settings
-from django.db import models
-from django.db.models import F, Q
+from django.db import connection, models
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.contrib.contenttypes.models import ContentType
 from django.core import cache  # import cache, not from cache import cache, to be able to monkey-patch cache.cache in test cases
@@ -32,6 +33,8 @@ from askbot.models.user import Activity, Group, PERSONAL_GROUP_NAME_PREFIX
 from askbot.models.fields import LanguageCodeField
 from askbot import signals
 from askbot import const
+from askbot import page_cache
+from askbot import spam_checker
 from askbot.utils.lists import LazyList
 from askbot.utils.loading import load_plugin
 from askbot.search import mysql
@@ -61,6 +64,20 @@ def clean_tagnames(tagnames):
             tagnames.pop()
 
 
+def get_title_search_words(search_query):
+    """returns list of lowercased words of the query,
+    punctuation and operator characters are dropped"""
+    return re.findall(r'\w+', search_query.lower())
+
+
+def get_thread_summary_cache_key(thread_id, lang):
+    return 'thread-question-summary-%d-%s' % (thread_id, lang)
+
+
+def get_thread_post_data_cache_key(thread_id, sort_method):
+    return f'thread-data-{thread_id}-{sort_method}'
+
+
 def default_title_renderer(thread):
     """renders thread title,
     can be overridden by setting
@@ -85,10 +102,10 @@ class ThreadQuerySet(models.query.QuerySet):
     def get_visible(self, user):
         """filters out threads not belonging to the user groups"""
         if user.is_authenticated:
-            groups = user.get_groups()
+            group_ids = user.get_group_ids()
         else:
-            groups = [Group.objects.get_global_group()]
-        return self.filter(groups__in=groups).distinct()
+            group_ids = [Group.objects.get_global_group().pk]
+        return self.filter(groups__id__in=group_ids).distinct()
 
     def get_for_title_query(self, search_query):
         """returns threads matching title query
@@ -120,6 +137,28 @@ class ThreadQuerySet(models.query.QuerySet):
 
             return self.filter(**filter_parameters)
 
+    def get_for_title_prefix_query(self, search_query):
+        """returns threads matching title query typed so far:
+        all words must be found in the title, the last one
+        possibly incomplete. On PostgreSQL uses the indexed
+        `title_search_vector`, elsewhere falls back
+        to the :meth:`get_for_title_query`
+        """
+        words = get_title_search_words(search_query)
+        if not words:
+            return self.none()
+
+        haystack_on = getattr(django_settings, 'ENABLE_HAYSTACK_SEARCH', False)
+        if haystack_on or connection.vendor != 'postgresql':
+            return self.get_for_title_query(' '.join(words))
+
+        from askbot.search import postgresql
+        threads = postgresql.run_title_prefix_search(self, words)
+        threads = threads.filter(deleted=False)
+        if askbot.is_multilingual():
+            threads = threads.filter(language_code=get_language())
+        return threads.order_by('-relevance')
+
 
 class ThreadManager(BaseQuerySetManager):
 
@@ -161,6 +200,55 @@ class ThreadManager(BaseQuerySetManager):
 
         return '"' + '", "'.join(tag_list) + str(last_topic)
 
+    def clear_cached_data(self, thread_ids):
+        """same as :meth:`Thread.clear_cached_data`, but for
+        many threads at once, without loading the threads.
+        Cache keys are deleted in batches"""
+        langs = translation_utils.get_language_codes()
+        sort_methods = [v[0] for v in const.ANSWER_SORT_METHODS]
+        thread_ids = list(thread_ids)
+        chunk_size = const.CACHE_INVALIDATION_BATCH_SIZE
+        for start in range(0, len(thread_ids), chunk_size):
+            keys = list()
+            for thread_id in thread_ids[start:start + chunk_size]:
+                keys.extend(get_thread_post_data_cache_key(thread_id, v) for v in sort_methods)
+                keys.extend(get_thread_summary_cache_key(thread_id, v) for v in langs)
+            cache.cache.delete_many(keys)
+        page_cache.invalidate_threads(thread_ids)
+
+    def update_answer_counts_and_last_activity(self, thread_ids):
+        """same as :meth:`Thread.update_answer_count` and
+        :meth:`Thread.update_last_activity_info`, but for many
+        threads at once, in one UPDATE query"""
+        from askbot.models import Post, PostRevision
+        answers = Post.objects.filter(
+                            thread_id=OuterRef('pk'),
+                            post_type='answer',
+                            deleted=False
+                        ).order_by().values('thread_id')
+        answer_count = answers.annotate(count=Count('id')).values('count')
+
+        #latest revision of the question and of the remaining answers
+        revisions = PostRevision.objects.filter(
+                            post__thread_id=OuterRef('pk'),
+                            revision__gt=0
+                        ).filter(
+                            Q(post__post_type='question') | \
+                            Q(post__post_type='answer', post__deleted=False)
+                        ).order_by('-id')
+
+        self.filter(id__in=thread_ids).update(
+            answer_count=Coalesce(Subquery(answer_count), 0),
+            last_activity_at=Coalesce(
+                Subquery(revisions.values('revised_at')[:1]),
+                F('last_activity_at')
+            ),
+            last_activity_by_id=Coalesce(
+                Subquery(revisions.values('author_id')[:1]),
+                F('last_activity_by_id')
+            )
+        )
+
     def create(self, *args, **kwargs):
         raise NotImplementedError
 
@@ -297,7 +385,8 @@ class ThreadManager(BaseQuerySetManager):
         # TODO: add a possibility to see deleted questions
         qs = self.filter(**primary_filter)
 
-        if askbot_settings.CONTENT_MODERATION_MODE == 'premoderation':
+        if askbot_settings.CONTENT_MODERATION_MODE == 'premoderation' \
+            or spam_checker.is_async():
             if request_user.is_authenticated:
                 qs = qs.filter(Q(approved=True) | Q(posts__author_id=request_user.pk))
             else:
@@ -766,7 +855,7 @@ class Thread(models.Model):
             # get post with groups shared with having at least
             # one of the user groups
             # of those posts return the latest revision
-            posts_filter['groups__in'] = user.get_groups()
+            posts_filter['groups__id__in'] = user.get_group_ids()
 
         posts = Post.objects.filter(**posts_filter)
         post_ids = list(posts.values_list('id', flat=True))
@@ -1031,11 +1120,10 @@ class Thread(models.Model):
         cache.cache.delete_many(keys)
 
     def get_summary_cache_key(self, lang=None):
-        lang = lang or get_language()
-        return 'thread-question-summary-%d-%s' % (self.id, lang)
+        return get_thread_summary_cache_key(self.id, lang or get_language())
 
     def get_post_data_cache_key(self, sort_method=None, groups=None): #pylint: disable=missing-docstring
-        key = f'thread-data-{self.id}-{sort_method}'
+        key = get_thread_post_data_cache_key(self.id, sort_method)
         if not groups:
             return key
         return key + '-' + '-'.join(sorted([group.id for group in groups]))
@@ -1056,6 +1144,7 @@ class Thread(models.Model):
     def clear_cached_data(self):
         self.invalidate_cached_post_data()
         self.invalidate_cached_summary_html()
+        page_cache.invalidate_threads([self.id])
 
     def get_public_posts(self):
         kwargs = {
@@ -1168,7 +1257,8 @@ class Thread(models.Model):
         if user.is_anonymous:
             return post_data
 
-        if not (askbot_settings.CONTENT_MODERATION_MODE == 'premoderation' and user.is_watched()):
+        premoderation = askbot_settings.CONTENT_MODERATION_MODE == 'premoderation'
+        if not (premoderation and user.is_watched() or spam_checker.is_async()):
             return post_data
 
         return self.get_personalized_post_data(post_data, user)
@@ -112,7 +112,8 @@ class AvatarsBlockData(object):
     def get_user_data_by_uids(cls, uids):
         """Returns data tuples for given user ids"""
         users = User.objects.filter(pk__in=uids)
-        users = users.only('id', 'username', 'askbot_profile__gravatar')
+        users = users.select_related('askbot_profile')
+        users = users.only('id', 'username', 'askbot_profile__avatar_urls')
         users_by_id = {user.id: user for user in users}
         data = []
         for uid in uids:
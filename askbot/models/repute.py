@@ -179,27 +179,13 @@ class ReputeManager(models.Manager):
         (ep. +200) by upvoted(also subtracted from upvoted canceled). This is
         because we need to prohibit gaming system by upvoting/cancel again and
         again.
+
+        The sum is maintained in the `UserStats` record of the user.
         """
         if user is None:
             return 0
-        else:
-            today = datetime.date.today()
-            tomorrow = today + datetime.timedelta(1)
-            rep_types = (1, -8)
-            sums = self.filter(models.Q(reputation_type__in=rep_types),
-                               user=user,
-                               reputed_at__range=(today, tomorrow))\
-                .aggregate(models.Sum('positive'), models.Sum('negative'))
-            if sums:
-                pos = sums['positive__sum']
-                neg = sums['negative__sum']
-                if pos is None:
-                    pos = 0
-                if neg is None:
-                    neg = 0
-                return pos + neg
-            else:
-                return 0
+        from askbot.models.user_stats import UserStats
+        return UserStats.objects.get_upvote_reputation(user)
 
 
 class Repute(models.Model):
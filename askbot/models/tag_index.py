@@ -0,0 +1,140 @@
+"""`TagPrefixIndex` - in-memory prefix index of the accepted tags,
+used by the tag autocomplete.
+
+The index snapshot is a list of (name, used_count) tuples, stored in the
+django cache per language under a version token. Each process keeps
+the last index it has built and reloads it only when the version token
+changes, so a lookup costs one cache read of the token.
+"""
+import heapq
+import uuid
+from bisect import bisect_left, bisect_right
+from django.core.cache import cache
+from askbot import const
+from askbot.models.tag import Tag
+
+#per-process registry of built indices: language code -> index
+_INDICES = dict()
+
+
+class TagPrefixIndex(object):
+    """Sorted index of tag names with ranked prefix completions"""
+    CACHE_KEY = 'askbot-tag-index'
+    VERSION_CACHE_KEY = 'askbot-tag-index-version'
+    #completions for prefixes up to this length are precomputed
+    TOP_PREFIX_LENGTH = 2
+
+    def __init__(self, rows, version=None):
+        """`rows` - iterable of (name, used_count) tuples"""
+        self.version = version
+        entries = sorted((name.lower(), name, count) for name, count in rows)
+        self.keys = [entry[0] for entry in entries]
+        self.names = [entry[1] for entry in entries]
+        self.counts = [entry[2] for entry in entries]
+
+        buckets = dict()
+        for idx, key in enumerate(self.keys):
+            for length in range(1, min(len(key), self.TOP_PREFIX_LENGTH) + 1):
+                buckets.setdefault(key[:length], list()).append(idx)
+
+        limit = const.TAG_AUTOCOMPLETE_MAX_ITEMS
+        self.top = dict()
+        for prefix, indices in buckets.items():
+            self.top[prefix] = self.rank(indices, limit)
+
+    def __len__(self):
+        return len(self.names)
+
+    def rank(self, indices, limit):
+        """returns names at `indices`, by `used_count` descending,
+        then by name, at most `limit` of them"""
+        best = heapq.nsmallest(
+            limit, indices,
+            key=lambda idx: (-self.counts[idx], self.keys[idx])
+        )
+        return [self.names[idx] for idx in best]
+
+    def get_prefix_range(self, prefix):
+        """returns (start, end) slice of the sorted index,
+        holding the names starting with `prefix`"""
+        prefix = prefix.lower()
+        start = bisect_left(self.keys, prefix)
+        end = bisect_right(self.keys, prefix + '\U0010ffff', start)
+        return start, end
+
+    def count(self, prefix):
+        """number of tags starting with the prefix"""
+        start, end = self.get_prefix_range(prefix)
+        return end - start
+
+    def complete(self, prefix, limit=const.TAG_AUTOCOMPLETE_MAX_ITEMS):
+        """returns up to `limit` names starting with `prefix`,
+        most used first"""
+        limit = min(limit, const.TAG_AUTOCOMPLETE_MAX_ITEMS)
+        key = prefix.lower()
+        if not key:
+            return list()
+        if len(key) <= self.TOP_PREFIX_LENGTH:
+            return self.top.get(key, list())[:limit]
+        start, end = self.get_prefix_range(key)
+        return self.rank(range(start, end), limit)
+
+    def get_all_names(self):
+        """all names, in the alphabetic order"""
+        return self.names
+
+    @classmethod
+    def get_version_cache_key(cls, language_code):
+        return '%s-%s' % (cls.VERSION_CACHE_KEY, language_code)
+
+    @classmethod
+    def get_cache_key(cls, language_code, version):
+        return '%s-%s-%s' % (cls.CACHE_KEY, language_code, version)
+
+    @classmethod
+    def get_fresh_rows(cls, language_code):
+        """Returns list of (name, used_count) from the database"""
+        tags = Tag.objects.filter(
+            deleted=False,
+            status=Tag.STATUS_ACCEPTED,
+            language_code=language_code
+        )
+        return list(tags.values_list('name', 'used_count').order_by())
+
+    @classmethod
+    def rebuild(cls, language_code):
+        """Builds the index from the database and stores
+        the snapshot in the cache under a new version"""
+        version = uuid.uuid4().hex
+        rows = cls.get_fresh_rows(language_code)
+        timeout = const.TAG_INDEX_CACHE_TIMEOUT
+        cache.set(cls.get_cache_key(language_code, version), rows, timeout)
+        cache.set(cls.get_version_cache_key(language_code), version, timeout)
+        return cls(rows, version=version)
+
+    @classmethod
+    def get_index(cls, language_code):
+        """Returns up to date index for the language"""
+        version = cache.get(cls.get_version_cache_key(language_code))
+        index = _INDICES.get(language_code)
+        if version is None:
+            index = cls.rebuild(language_code)
+        elif index is None or index.version != version:
+            rows = cache.get(cls.get_cache_key(language_code, version))
+            if rows is None:
+                index = cls.rebuild(language_code)
+            else:
+                index = cls(rows, version=version)
+
+        _INDICES[language_code] = index
+        return index
+
+    @classmethod
+    def get_version(cls, language_code):
+        """Returns version token of the current index snapshot"""
+        return cls.get_index(language_code).version
+
+    @classmethod
+    def invalidate(cls, language_code):
+        """Makes all processes rebuild the index on the next use"""
+        cache.delete(cls.get_version_cache_key(language_code))
@@ -1,6 +1,7 @@
 import datetime
 import logging
 import re
+import uuid
 from django.db import models
 from django.db.models import Q
 from django.db.utils import IntegrityError
@@ -9,6 +10,7 @@ from django.contrib.contenttypes import fields
 from django.contrib.auth.models import User
 from django.contrib.auth.models import Group as AuthGroup
 from django.core import exceptions
+from django.core.cache import cache
 from django.forms import EmailField, URLField
 from django.utils import translation, timezone
 from django.utils.translation import gettext as _
@@ -22,6 +24,14 @@ from collections import defaultdict
 
 PERSONAL_GROUP_NAME_PREFIX = '_personal_'
 
+#per-process registry of the global group:
+#group name -> (version token, group)
+_GLOBAL_GROUPS = dict()
+
+def get_user_groups_cache_key(user_id):
+    """returns cache key of the user's group membership levels"""
+    return const.USER_GROUPS_CACHE_KEY % user_id
+
 class InvitedModerator(object):
     """Mock user class to represent invited moderators"""
     def __init__(self, username, email):
@@ -270,6 +280,64 @@ class ActivityManager(BaseQuerySetManager):
 
         return self.filter(**kwargs)
 
+    def select_reminders(self, questions_by_user, activity_type=None,
+                         recurrence_delay=None):
+        """returns dictionary user id -> list of questions,
+        which need a reminder: the lists of ``questions_by_user``
+        without the questions, about which the user was reminded
+        within the ``recurrence_delay``.
+
+        Reminder activities of the selected questions are updated
+        or created - with a few queries for all the users.
+        """
+        question_ids = set()
+        for questions in questions_by_user.values():
+            question_ids.update(question.id for question in questions)
+        if not question_ids:
+            return dict()
+
+        reminded_at = dict()
+        activity_ids = defaultdict(list)
+        activities = self.filter(
+                            user_id__in=list(questions_by_user),
+                            question_id__in=question_ids,
+                            activity_type=activity_type
+                        ).values_list('id', 'user_id', 'question_id', 'active_at')
+        for activity_id, user_id, question_id, active_at in activities:
+            key = (user_id, question_id)
+            reminded_at[key] = max(active_at, reminded_at.get(key, active_at))
+            activity_ids[key].append(activity_id)
+
+        now = timezone.now()
+        selected = dict()
+        update_ids = list()
+        new_activities = list()
+        for user_id, questions in questions_by_user.items():
+            for question in questions:
+                key = (user_id, question.id)
+                if key in reminded_at:
+                    if now < reminded_at[key] + recurrence_delay:
+                        continue
+                    update_ids.extend(activity_ids[key])
+                else:
+                    new_activities.append(
+                        Activity(
+                            user_id=user_id,
+                            question=question,
+                            activity_type=activity_type,
+                            content_type=ContentType.objects.get_for_model(question),
+                            object_id=question.id,
+                            active_at=now
+                        )
+                    )
+                selected.setdefault(user_id, list()).append(question)
+
+        if update_ids:
+            self.filter(id__in=update_ids).update(active_at=now)
+        if new_activities:
+            self.bulk_create(new_activities)
+        return selected
+
 
 class ActivityAuditStatus(models.Model):
     """bridge "through" relation between activity and users"""
@@ -374,6 +442,32 @@ class EmailFeedSettingManager(models.Manager):
 
         return subscriber_set
 
+    def add_missing_subscriptions(self, user_ids):
+        """creates subscriptions missing for the users,
+        with the default delivery schedules"""
+        from askbot import forms #avoid circular import
+        form = forms.EditUserEmailFeedsForm()
+        need_feed_types = form.get_db_model_subscription_type_names()
+        have_feeds = set(
+                        self.filter(
+                            subscriber_id__in=user_ids
+                        ).values_list('subscriber_id', 'feed_type')
+                    )
+        new_feeds = list()
+        for feed_type in need_feed_types:
+            attr_key = 'DEFAULT_NOTIFICATION_DELIVERY_SCHEDULE_%s' % feed_type.upper()
+            frequency = getattr(askbot_settings, attr_key)
+            for user_id in user_ids:
+                if (user_id, feed_type) not in have_feeds:
+                    new_feeds.append(
+                        self.model(
+                            subscriber_id=user_id,
+                            feed_type=feed_type,
+                            frequency=frequency
+                        )
+                    )
+        self.bulk_create(new_feeds)
+
 
 class EmailFeedSetting(models.Model):
     # Definitions of delays before notification for each type of notification frequency
@@ -525,12 +619,7 @@ class GroupQuerySet(models.query.QuerySet):
         )
 
     def get_for_user(self, user=None, private=False):
-        gms = GroupMembership.objects.filter(user=user)
-        if private:
-            global_group = Group.objects.get_global_group()
-            gms = gms.exclude(group=global_group)
-        group_ids = gms.values_list('group_id', flat=True)
-        return Group.objects.filter(pk__in=group_ids)
+        return Group.objects.filter(pk__in=user.get_group_ids(private=private))
 
     def get_by_name(self, group_name = None):
         from askbot.models.tag import clean_group_name#todo - delete this
@@ -545,17 +634,37 @@ class GroupManager(BaseQuerySetManager):
 
     def get_global_group(self):
         """Returns the global group,
-        if necessary, creates one
+        if necessary, creates one.
+
+        Each process keeps the group it has loaded
+        and reloads it only when the version token
+        in the cache changes, see `invalidate_global_group`.
         """
         #todo: when groups are disconnected from tags,
         #find comment as shown below in the test cases and
         #revert the values
         #todo: change groups to django groups
         group_name = askbot_settings.GLOBAL_GROUP_NAME
+        version = cache.get(const.GLOBAL_GROUP_VERSION_CACHE_KEY)
+        registered = _GLOBAL_GROUPS.get(group_name)
+        if version and registered and registered[0] == version:
+            return registered[1]
+
+        if version is None:
+            version = uuid.uuid4().hex
+            cache.set(const.GLOBAL_GROUP_VERSION_CACHE_KEY,
+                      version, const.GROUPS_CACHE_TIMEOUT)
         try:
-            return self.get_queryset().get(name=group_name)
+            group = self.get_queryset().get(name=group_name)
         except Group.DoesNotExist:
-            return self.get_queryset().create(name=group_name)
+            group = self.get_queryset().create(name=group_name)
+        _GLOBAL_GROUPS[group_name] = (version, group)
+        return group
+
+    def invalidate_global_group(self):
+        """Makes all processes reload the global group on the next use"""
+        cache.delete(const.GLOBAL_GROUP_VERSION_CACHE_KEY)
+        _GLOBAL_GROUPS.clear()
 
     def create(self, **kwargs):
         name = kwargs['name']
@@ -0,0 +1,243 @@
+"""Merging of the user accounts.
+
+All rows that refer to the merged account are moved to the target
+account with set-based UPDATE queries, one relation at a time.
+Rows that would violate a unique constraint - or duplicate
+a record that is unique by its meaning, like a tag selection -
+are deleted first, the record of the target account is kept,
+with the greater value of the fields like the group membership level.
+
+Profile data, reputation and badge counters are merged separately,
+duplicate votes are canceled with the reputation they gave,
+the merged account is deleted at the end.
+"""
+from collections import Counter
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, F, Min, OuterRef, Subquery, UniqueConstraint, Value
+from django.db.models.functions import Greatest, Least
+from askbot import const
+
+#fields which are unique together with the user field by their
+#meaning, but do not have a constraint in the database
+LOGICALLY_UNIQUE_FIELDS = {
+    'askbot.MarkedTag': [('user', 'tag')],
+    'askbot.FavoriteQuestion': [('user', 'thread')],
+    'askbot.LocalizedUserProfile': [('auth_user', 'language_code')],
+    'followit.FollowRecord': [('user', 'content_type', 'object_id')],
+}
+
+#fields of the kept record of the target account, which take
+#the greatest value of the two records when they conflict
+GREATEST_VALUE_FIELDS = {
+    'askbot.GroupMembership': ['level'],
+}
+
+
+def get_user_relations():
+    """returns list of foreign keys to the `User`, including
+    the ones of the automatic many to many tables,
+    except the parent links of the profile models"""
+    relations = list()
+    for field in User._meta.get_fields(include_hidden=True):
+        if not (field.auto_created and not field.concrete):
+            continue
+        if not (field.one_to_many or field.one_to_one):
+            continue
+        if field.field.remote_field.parent_link:
+            continue
+        relations.append((field.related_model, field.field.name))
+    return relations
+
+
+def get_unique_field_sets(model, field_name):
+    """returns list of tuples of field names, which are
+    unique together and include the given field"""
+    field_sets = [tuple(fields) for fields in model._meta.unique_together]
+    for constraint in model._meta.constraints:
+        if isinstance(constraint, UniqueConstraint) and constraint.condition is None:
+            field_sets.append(tuple(constraint.fields))
+    field_sets.extend(LOGICALLY_UNIQUE_FIELDS.get(model._meta.label, []))
+    if model._meta.get_field(field_name).unique:
+        field_sets.append((field_name,))
+    return [field_set for field_set in field_sets if field_name in field_set]
+
+
+def get_conflicting_rows(model, field_name, from_user, to_user):
+    """returns query set of rows of the `from_user`,
+    which have counterparts of the `to_user`"""
+    rows = model._base_manager.filter(**{field_name: from_user})
+    conflicts = model._base_manager.none()
+    for field_set in get_unique_field_sets(model, field_name):
+        lookups = dict((name, OuterRef(name)) for name in field_set if name != field_name)
+        lookups[field_name] = to_user
+        twins = model._base_manager.filter(**lookups)
+        conflicts |= rows.filter(Exists(twins))
+    return conflicts
+
+
+def keep_greatest_values(model, field_name, from_user, to_user):
+    """updates the rows of the `to_user`, which have counterparts
+    of the `from_user`, with the greater of the two values of
+    the fields listed in the `GREATEST_VALUE_FIELDS`"""
+    field_names = GREATEST_VALUE_FIELDS.get(model._meta.label)
+    if not field_names:
+        return
+    for field_set in get_unique_field_sets(model, field_name):
+        lookups = dict((name, OuterRef(name)) for name in field_set if name != field_name)
+        lookups[field_name] = from_user
+        twins = model._base_manager.filter(**lookups)
+        values = dict(
+            (name, Greatest(F(name), Subquery(twins.values(name)[:1])))
+            for name in field_names
+        )
+        rows = model._base_manager.filter(**{field_name: to_user})
+        rows.filter(Exists(twins)).update(**values)
+
+
+def move_rows(model, field_name, from_user, to_user):
+    """deletes conflicting rows of `from_user`, and
+    reassigns the rest to the `to_user`,
+    returns the ids of the deleted rows"""
+    keep_greatest_values(model, field_name, from_user, to_user)
+    conflicts = get_conflicting_rows(model, field_name, from_user, to_user)
+    deleted_ids = list(conflicts.values_list('pk', flat=True))
+    if deleted_ids:
+        model._base_manager.filter(pk__in=deleted_ids).delete()
+    model._base_manager.filter(**{field_name: from_user}).update(**{field_name: to_user})
+    return deleted_ids
+
+
+def merge_localized_profiles(from_user, to_user):
+    """adds reputation of the `from_user` in each language
+    to the profile of the `to_user` in the same language"""
+    from askbot.models.user_profile import LocalizedUserProfile, get_localized_profile_cache_key
+    from_profiles = LocalizedUserProfile.objects.filter(auth_user=from_user)
+    twins = from_profiles.filter(language_code=OuterRef('language_code'))
+    LocalizedUserProfile.objects.filter(
+                        auth_user=to_user,
+                        language_code__in=from_profiles.values('language_code')
+                    ).update(
+                        reputation=F('reputation') + Subquery(twins.values('reputation')[:1])
+                    )
+    languages = from_profiles.values_list('language_code', flat=True).distinct()
+    cache.delete_many([get_localized_profile_cache_key(to_user, lang) for lang in languages])
+
+
+def merge_profiles(from_user, to_user):
+    """merges reputation, badge counters and dates"""
+    from askbot.models.user_profile import UserProfile, get_profile_cache_key
+    try:
+        from_profile = UserProfile.objects.get(pk=from_user.pk)
+    except UserProfile.DoesNotExist: # pylint: disable=no-member
+        return
+
+    UserProfile.objects.filter(pk=to_user.pk).update(
+        reputation=Greatest(
+            F('reputation') + from_profile.reputation - const.MIN_REPUTATION,
+            const.MIN_REPUTATION
+        ),
+        gold=F('gold') + from_profile.gold,
+        silver=F('silver') + from_profile.silver,
+        bronze=F('bronze') + from_profile.bronze,
+        last_seen=Greatest(F('last_seen'), from_profile.last_seen)
+    )
+    User.objects.filter(pk=to_user.pk).update(
+        date_joined=Least(F('date_joined'), Value(from_user.date_joined))
+    )
+    cache.delete(get_profile_cache_key(to_user))
+
+
+def merge_followers(from_user, to_user):
+    """followers of the `from_user` become followers of the `to_user`"""
+    try:
+        from followit.models import FollowRecord
+    except ImportError:
+        return
+    user_type = ContentType.objects.get_for_model(User)
+    records = FollowRecord.objects.filter(content_type=user_type)
+    twins = records.filter(object_id=to_user.pk, user_id=OuterRef('user_id'))
+    records.filter(object_id=from_user.pk).filter(Exists(twins)).delete()
+    records.filter(object_id=from_user.pk).update(object_id=to_user.pk)
+    #users do not follow themselves
+    records.filter(object_id=to_user.pk, user_id__in=(from_user.pk, to_user.pk)).delete()
+
+
+def remove_duplicate_awards(user):
+    """badges that can be awarded only once are kept
+    in one copy, badge counters are decremented for the rest"""
+    from askbot.models.badges import get_badge
+    from askbot.models.repute import Award, BadgeData
+    awards = Award.objects.filter(user=user).values('badge_id', 'badge__slug')
+    duplicates = awards.annotate(count=Count('id'), first_id=Min('id')).filter(count__gt=1)
+    removed_counts = Counter()
+    for duplicate in duplicates:
+        try:
+            badge = get_badge(duplicate['badge__slug'])
+        except KeyError:
+            continue
+        if badge.multiple:
+            continue
+        removed = duplicate['count'] - 1
+        Award.objects.filter(
+                    user=user, badge_id=duplicate['badge_id']
+                ).exclude(id=duplicate['first_id']).delete()
+        BadgeData.objects.filter(id=duplicate['badge_id']).update(
+                    awarded_count=Greatest(F('awarded_count') - removed, 0)
+                )
+        removed_counts[badge.level] += removed
+
+    if removed_counts:
+        from askbot.models.user_profile import UserProfile, get_profile_cache_key
+        UserProfile.objects.filter(pk=user.pk).update(
+            gold=F('gold') - removed_counts[const.GOLD_BADGE],
+            silver=F('silver') - removed_counts[const.SILVER_BADGE],
+            bronze=F('bronze') - removed_counts[const.BRONZE_BADGE]
+        )
+        cache.delete(get_profile_cache_key(user))
+
+
+def merge_users(from_user, to_user):
+    """Moves all data of the `from_user` to the `to_user`
+    and deletes the `from_user`, in one transaction.
+
+    Duplicate votes of the `from_user` are canceled first,
+    which reverses the reputation they gave and their
+    counts on the posts, then reputation and badge counters are
+    added up, the response counts and the stats of the `to_user`
+    are updated once at the end."""
+    if from_user.pk == to_user.pk:
+        raise ValueError('cannot merge user account into itself')
+
+    from askbot.models import UserStats, Vote
+    with transaction.atomic():
+        #votes of the `to_user` win over the duplicate votes
+        duplicate_votes = Vote.objects.filter(
+                        user=from_user,
+                        voted_post__votes__user=to_user
+                    ).select_related('user', 'voted_post__author')
+        for vote in duplicate_votes:
+            vote.cancel()
+
+        merge_profiles(from_user, to_user)
+        merge_localized_profiles(from_user, to_user)
+        merge_followers(from_user, to_user)
+
+        #stats are recomputed from the posts on the next read
+        UserStats.objects.filter(user=from_user).delete()
+
+        for model, field_name in get_user_relations():
+            move_rows(model, field_name, from_user, to_user)
+
+        remove_duplicate_awards(to_user)
+        UserStats.objects.mark_stale([to_user.pk])
+        from_user.delete()
+
+    from askbot.models.user import get_user_groups_cache_key
+    cache.delete(get_user_groups_cache_key(to_user.pk))
+    to_user = User.objects.get(pk=to_user.pk)
+    to_user.update_response_counts()
+    to_user.clear_cached_data()
+    return to_user
@@ -42,6 +42,16 @@ def get_profile(user):
     return profile
 
 
+def get_loaded_profile(user):
+    """returns profile loaded together with the user,
+    e.g. via `select_related('askbot_profile')`,
+    otherwise reads it with `get_profile`"""
+    profile = user._state.fields_cache.get('askbot_profile')
+    if profile is None:
+        profile = get_profile(user)
+    return profile
+
+
 def user_profile_property(field_name):
     """returns property that will access Askbot UserProfile
     of auth_user by field name"""
@@ -0,0 +1,219 @@
+"""`UserStats` - materialized statistics shown on the user profile.
+
+Vote counts are maintained incrementally with F-expression updates.
+Post counts are incremented when posts are created, and the post counts
+and tag usage are marked stale when posts are removed, restored or
+retagged. Stale parts are recomputed on the next read, so a profile
+page of an active user runs the expensive aggregates at most once per
+change rather than once per view.
+
+The record also keeps the reputation the user has gained from upvotes
+today, which enforces the daily cap on that gain without aggregating
+the reputation history on every vote.
+
+Post counts match the profile as seen by the public:
+non-anonymous questions, only the approved ones in the premoderation
+mode, and non-deleted answers in non-deleted threads.
+"""
+import datetime
+from django.conf import settings as django_settings
+from django.contrib.auth.models import User
+from django.db import models
+from django.db.models import Case, Count, F, Q, Value, When
+from jsonfield import JSONField
+from askbot import const
+from askbot.conf import settings as askbot_settings
+
+
+def get_public_question_count(user):
+    """count of questions shown on the profile to the public"""
+    questions = user.posts.filter(post_type='question', is_anonymous=False)
+    if askbot_settings.CONTENT_MODERATION_MODE == 'premoderation':
+        questions = questions.filter(approved=True)
+    return questions.count()
+
+
+def get_public_answer_count(user):
+    """count of answers shown on the profile to the public"""
+    return user.posts.filter(
+        post_type='answer',
+        deleted=False,
+        thread__deleted=False
+    ).count()
+
+
+def get_tag_usage(user, language_code):
+    """returns list of (tag name, usage count) of tags
+    most used by the user"""
+    from askbot.models.tag import Tag
+    tags = Tag.objects.filter(
+        threads__posts__author=user,
+        language_code=language_code
+    ).distinct().annotate(
+        user_tag_usage_count=Count('threads')
+    ).order_by('-user_tag_usage_count')[:const.USER_VIEW_DATA_SIZE]
+    return [(tag.name, tag.user_tag_usage_count) for tag in tags]
+
+
+class UserStatsManager(models.Manager):
+    """update methods of the manager change the stats
+    with single UPDATE queries, without loading the records"""
+
+    def get_for_user(self, user):
+        """returns stats of the user, creating the record
+        and computing the stale parts, if necessary"""
+        stats, created = self.get_or_create(user=user)
+        if created:
+            stats.recount_votes()
+        if stats.posts_are_stale:
+            stats.recount_posts()
+        return stats
+
+    def add_vote(self, user_id, vote, delta=1):
+        """adjusts the count of votes cast by the user"""
+        field = 'up_votes' if vote > 0 else 'down_votes'
+        stats = self.filter(user_id=user_id)
+        if delta < 0:
+            stats = stats.filter(**{field + '__gte': -delta})
+        stats.update(**{field: F(field) + delta})
+
+    def add_post(self, post):
+        """counts a newly created post"""
+        if post.is_question():
+            if post.is_anonymous:
+                return
+            if askbot_settings.CONTENT_MODERATION_MODE == 'premoderation' \
+                and not post.approved:
+                return
+            field = 'question_count'
+        elif post.is_answer():
+            field = 'answer_count'
+        else:
+            return
+        self.filter(user_id=post.author_id).update(
+            **{field: F(field) + 1, 'tags_are_stale': True}
+        )
+
+    def get_upvote_reputation(self, user):
+        """reputation gained by the user from upvotes today"""
+        gain = self.filter(
+            user_id=user.pk,
+            upvote_reputation_date=datetime.date.today()
+        ).values_list('upvote_reputation', flat=True).first()
+        return gain or 0
+
+    def add_upvote_reputation(self, user, points, limit=None):
+        """adds `points` to the reputation gained by the user
+        from upvotes today, unless the gain has already reached
+        the `limit`. The check and the change are one UPDATE query.
+        Returns True if the points were added."""
+        today = datetime.date.today()
+        stats = self.filter(user_id=user.pk)
+        if limit is not None:
+            stats = stats.filter(
+                ~Q(upvote_reputation_date=today) | Q(upvote_reputation__lt=limit)
+            )
+        #keep the order of assignments - MySQL evaluates them left to right
+        updated = stats.update(
+            upvote_reputation=Case(
+                When(
+                    upvote_reputation_date=today,
+                    then=F('upvote_reputation') + points
+                ),
+                default=Value(points),
+                output_field=models.IntegerField()
+            ),
+            upvote_reputation_date=today
+        )
+        if updated:
+            return True
+        if self.filter(user_id=user.pk).exists():
+            return False
+        self.get_for_user(user)
+        return self.add_upvote_reputation(user, points, limit=limit)
+
+    def mark_stale(self, user_ids):
+        """post counts and tag usage will be recomputed
+        on the next read"""
+        self.filter(user_id__in=user_ids).update(
+            posts_are_stale=True,
+            tags_are_stale=True
+        )
+
+    def mark_thread_stale(self, thread_id):
+        """marks stale stats of all authors of the thread posts"""
+        from askbot.models.post import Post
+        author_ids = Post.objects.filter(thread_id=thread_id).values('author_id')
+        self.mark_stale(author_ids)
+
+
+class UserStats(models.Model):
+    """Profile statistics of the user"""
+    user = models.OneToOneField(
+                        User,
+                        primary_key=True,
+                        related_name='askbot_stats',
+                        on_delete=models.CASCADE
+                    )
+    up_votes = models.PositiveIntegerField(default=0)
+    down_votes = models.PositiveIntegerField(default=0)
+    question_count = models.PositiveIntegerField(default=0)
+    answer_count = models.PositiveIntegerField(default=0)
+    #language code -> list of [tag name, usage count]
+    tag_usage = JSONField(default=dict)
+    posts_are_stale = models.BooleanField(default=True)
+    tags_are_stale = models.BooleanField(default=True)
+    #may be negative, when upvotes received earlier are canceled today
+    upvote_reputation = models.IntegerField(default=0)
+    upvote_reputation_date = models.DateField(null=True, blank=True)
+
+    objects = UserStatsManager()
+
+    class Meta:
+        app_label = 'askbot'
+
+    def recount_votes(self):
+        """recomputes the vote counts from the database"""
+        from askbot.models.repute import Vote
+        self.up_votes = Vote.objects.get_up_vote_count_from_user(self.user)
+        self.down_votes = Vote.objects.get_down_vote_count_from_user(self.user)
+        UserStats.objects.filter(pk=self.pk).update(
+            up_votes=self.up_votes,
+            down_votes=self.down_votes
+        )
+
+    def recount_posts(self):
+        """recomputes post counts from the database"""
+        self.question_count = get_public_question_count(self.user)
+        self.answer_count = get_public_answer_count(self.user)
+        self.posts_are_stale = False
+        UserStats.objects.filter(pk=self.pk).update(
+            question_count=self.question_count,
+            answer_count=self.answer_count,
+            posts_are_stale=False
+        )
+
+    def get_tag_usage(self, language_code):
+        """returns list of dictionaries with keys
+        `name` and `user_tag_usage_count` - tags most used
+        by the user in the language"""
+        if self.tags_are_stale:
+            self.tag_usage = dict()
+        usage = self.tag_usage.get(language_code)
+        if usage is None:
+            usage = get_tag_usage(self.user, language_code)
+            self.tag_usage[language_code] = usage
+            self.tags_are_stale = False
+            UserStats.objects.filter(pk=self.pk).update(
+                tag_usage=self.tag_usage,
+                tags_are_stale=False
+            )
+        return [{'name': name, 'user_tag_usage_count': count} for name, count in usage]
+
+    def rebuild(self):
+        """recomputes all the stats"""
+        self.recount_votes()
+        self.recount_posts()
+        self.tags_are_stale = True
+        language = self.user.primary_language or django_settings.LANGUAGE_CODE
+        self.get_tag_usage(language)
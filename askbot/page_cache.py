@@ -0,0 +1,105 @@
+"""Full page cache for the anonymous visitors.
+
+Pages are stored by the
+:class:`~askbot.middleware.cache.AnonymousPageCacheMiddleware`
+under the key made of the url, language and skin. Each stored page
+keeps the version tokens it was rendered with: question pages depend
+on the token of their thread, all other pages on the token shared
+by all threads. Thread events - new posts, edits, votes, accepted
+answers, closing and retagging - replace the tokens of the thread.
+A page with outdated tokens is rendered anew by one request,
+while the concurrent requests get the stale copy.
+
+The hits and misses are counted, the hit ratio is printed
+by the ``askbot_page_cache_stats`` management command.
+"""
+import hashlib
+import uuid
+from django.core.cache import cache
+from django.db import transaction
+from askbot import const
+from askbot.conf import settings as askbot_settings
+from askbot.utils.translation import get_language
+
+ALL_THREADS_VERSION_CACHE_KEY = 'askbot-page-cache-version'
+HITS_CACHE_KEY = 'askbot-page-cache-hits'
+MISSES_CACHE_KEY = 'askbot-page-cache-misses'
+
+
+def get_thread_version_cache_key(thread_id):
+    return 'askbot-page-cache-version-%d' % thread_id
+
+
+def get_page_cache_key(request):
+    """returns cache key of the page requested by the anonymous visitor"""
+    parts = (request.scheme, request.get_host(), request.get_full_path(),
+             get_language(), askbot_settings.ASKBOT_DEFAULT_SKIN)
+    digest = hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+    return 'askbot-page-%s' % digest
+
+
+def get_rebuild_lock_cache_key(page_cache_key):
+    return page_cache_key + '-lock'
+
+
+def get_versions(keys):
+    """returns dictionary version key -> version token,
+    missing tokens are created"""
+    versions = cache.get_many(keys)
+    new_versions = dict()
+    for key in keys:
+        if key not in versions:
+            new_versions[key] = uuid.uuid4().hex
+    if new_versions:
+        cache.set_many(new_versions, const.PAGE_CACHE_VERSION_TIMEOUT)
+        versions.update(new_versions)
+    return versions
+
+
+def set_question_page(request, question):
+    """marks the page as the view of the question: the cached page
+    depends on the thread of the question only and
+    the question visits are counted on the cache hits too"""
+    if getattr(request, 'page_cache_key', None) is None:
+        return
+    request.page_cache_question_id = question.id
+    key = get_thread_version_cache_key(question.thread_id)
+    request.page_cache_versions = get_versions([key])
+
+
+def invalidate_threads(thread_ids):
+    """pages of the threads and the pages
+    listing the threads will be rendered anew"""
+    keys = [get_thread_version_cache_key(thread_id) for thread_id in thread_ids]
+    keys.append(ALL_THREADS_VERSION_CACHE_KEY)
+    cache.delete_many(keys)
+    #pages rendered by the concurrent requests before the commit
+    #must not be taken for the new versions
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def count_request(hit):
+    """counts the page cache hit or miss"""
+    key = HITS_CACHE_KEY if hit else MISSES_CACHE_KEY
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass #counter was evicted from the cache
+
+
+def get_stats():
+    """returns dictionary with the counts of hits, misses and the hit ratio"""
+    counts = cache.get_many([HITS_CACHE_KEY, MISSES_CACHE_KEY])
+    hits = counts.get(HITS_CACHE_KEY, 0)
+    misses = counts.get(MISSES_CACHE_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0
+    }
+
+
+def reset_stats():
+    cache.delete_many([HITS_CACHE_KEY, MISSES_CACHE_KEY])
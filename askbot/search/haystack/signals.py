@@ -1,5 +1,6 @@
 from django.db.models import signals as django_signals
 
+from haystack.exceptions import NotHandled
 from haystack.signals import RealtimeSignalProcessor
 
 from askbot import signals as askbot_signals
@@ -24,11 +25,32 @@ class AskbotRealtimeSignalProcessor(RealtimeSignalProcessor):
 
         super(AskbotRealtimeSignalProcessor, self).handle_delete(sender, instance, **kwargs)
 
+    def handle_bulk_remove(self, sender, thread_ids, **kwargs):
+        """threads of the posts removed in bulk are updated
+        in the index with one call to the backend per connection,
+        deleted threads are removed from the index"""
+        from askbot.models import Thread
+        threads = list(Thread.objects.filter(id__in=thread_ids))
+        for using in self.connection_router.for_write():
+            try:
+                index = self.connections[using].get_unified_index().get_index(Thread)
+            except NotHandled:
+                continue
+            updated = list()
+            for thread in threads:
+                if thread.deleted:
+                    index.remove_object(thread, using=using)
+                elif index.should_update(thread):
+                    updated.append(thread)
+            if updated:
+                index.get_backend(using).update(index, updated)
+
     def setup(self):
         super(AskbotRealtimeSignalProcessor, self).setup()
 
         try:
             askbot_signals.after_post_removed.connect(self.handle_delete)
+            askbot_signals.posts_removed_in_bulk.connect(self.handle_bulk_remove)
         except ImportError:
             pass
 
@@ -37,11 +59,11 @@ class AskbotRealtimeSignalProcessor(RealtimeSignalProcessor):
         #askbot signals
         try:
             askbot_signals.after_post_removed.disconnect(self.handle_delete)
+            askbot_signals.posts_removed_in_bulk.disconnect(self.handle_bulk_remove)
         except ImportError:
             pass
 
 try:
-    from haystack.exceptions import NotHandled
     from celery_haystack.signals import CelerySignalProcessor
     from celery_haystack.utils import enqueue_task
 
@@ -52,6 +74,7 @@ try:
             django_signals.post_delete.connect(self.enqueue_delete)
             try:
                 askbot_signals.after_post_removed.connect(self.enqueue_delete)
+                askbot_signals.posts_removed_in_bulk.connect(self.enqueue_bulk_remove)
             except ImportError:
                 pass
 
@@ -62,9 +85,18 @@ try:
 
             try:
                 askbot_signals.after_post_removed.disconnect(self.enqueue_delete)
+                askbot_signals.posts_removed_in_bulk.disconnect(self.enqueue_bulk_remove)
             except ImportError:
                 pass
 
+        def enqueue_bulk_remove(self, sender, thread_ids, **kwargs):
+            """enqueues updates of the threads of the posts
+            removed in bulk, deleted threads are removed from the index"""
+            from askbot.models import Thread
+            for thread in Thread.objects.filter(id__in=thread_ids):
+                action = 'delete' if thread.deleted else 'update'
+                self.enqueue(action, thread, Thread)
+
         def enqueue(self, action, instance, sender, **kwargs):
             using_backends = self.connection_router.for_write(instance=instance)
 
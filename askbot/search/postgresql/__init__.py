@@ -107,3 +107,20 @@ run_user_search = run_thread_search #an alias
 def run_title_search(query_set, query):
     """runs search for title and tags"""
     return run_full_text_search(query_set, query, 'title_search_vector')
+
+def run_title_prefix_search(query_set, words):
+    """searches thread titles and tags matching all the words,
+    the last word is matched as a prefix, so that the search
+    can be run as the user types.
+    Words must contain only word characters"""
+    table_name = query_set.model._meta.db_table
+    vector = table_name + '.title_search_vector'
+    ts_query = ' & '.join(words[:-1] + [words[-1] + ':*'])
+    language_name = LANGUAGE_NAMES.get(get_language(), 'english')
+    params = (language_name, ts_query)
+    return query_set.extra(
+        select={'relevance': 'ts_rank(' + vector + ', to_tsquery(%s, %s))'},
+        select_params=params,
+        where=[vector + ' @@ to_tsquery(%s, %s)'],
+        params=params
+    )
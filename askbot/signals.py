@@ -20,6 +20,8 @@ GenericSignal = namedtuple(
 tags_updated = django.dispatch.Signal()
 
 after_post_removed = django.dispatch.Signal()
+#sent with lists of `post_ids` and `thread_ids` when posts are removed in bulk
+posts_removed_in_bulk = django.dispatch.Signal()
 
 after_post_restored = django.dispatch.Signal()
 
@@ -45,6 +47,9 @@ spam_rejected = django.dispatch.Signal()
 site_visited = django.dispatch.Signal()
 reputation_received = django.dispatch.Signal()
 posts_marked_as_spam = django.dispatch.Signal()
+#sent with the `vote` and its previous value `old_vote`
+#when the user reverses the vote
+vote_reversed = django.dispatch.Signal()
 
 
 def pop_signal_receivers(signal):
@@ -76,6 +81,7 @@ def pop_all_db_signal_receivers():
         # askbot signals
         tags_updated,
         after_post_removed,
+        posts_removed_in_bulk,
         after_post_restored,
         flag_offensive,
         remove_flag_offensive,
@@ -85,6 +91,7 @@ def pop_all_db_signal_receivers():
         post_updated,
         award_badges_signal,
         posts_marked_as_spam,
+        vote_reversed,
         # django signals
         pre_save,
         post_save,
@@ -1,22 +1,175 @@
+"""Sitemap of the questions, split into sections by thread id.
+
+Section number ``n`` holds questions of threads with ids from
+``n * SITEMAP_SECTION_SIZE`` to ``(n + 1) * SITEMAP_SECTION_SIZE - 1``,
+so questions never move between sections and a change in a thread
+affects only its own section. Rendered sections are stored in the
+cache under a version token per section. Thread and question changes
+replace the token, so only the sections with changes are rendered
+again - in practice mostly the newest one.
+"""
+import hashlib
+import uuid
+from xml.sax.saxutils import escape
 from django.contrib.sitemaps import Sitemap
+from django.contrib.sites.shortcuts import get_current_site
+from django.core.cache import cache
+from django.db.models import Max
+from django.http import Http404, HttpResponse
+from django.template import loader
+from django.urls import reverse
+from django.utils.http import http_date
+from askbot import const
 from askbot.models import Post
 
 
 class QuestionsSitemap(Sitemap):
     changefreq = 'daily'
     priority = 0.5
+    limit = const.SITEMAP_SECTION_SIZE
+
+    def __init__(self, section=None):
+        """`section` - number of the section, all questions if `None`"""
+        self.section = section
 
     def items(self):
         questions = Post.objects.get_questions()
         questions = questions.exclude(deleted=True)
         questions = questions.exclude(approved=False)
+        if self.section is not None:
+            first_id, last_id = get_section_thread_id_range(self.section)
+            questions = questions.filter(thread__id__range=(first_id, last_id))
         # this also references fields of another object, rather than just the
         # related object. Removing the field references, leaving only object
         # reference
-        return questions.select_related('thread')
+        return questions.select_related('thread').order_by('thread_id')
 
     def lastmod(self, obj):
         return obj.thread.last_activity_at
 
     def location(self, obj):
         return obj.get_absolute_url()
+
+
+def get_section_thread_id_range(section):
+    """returns (first, last) thread id of the section"""
+    size = const.SITEMAP_SECTION_SIZE
+    return section * size, (section + 1) * size - 1
+
+
+def get_section_number(thread_id):
+    return thread_id // const.SITEMAP_SECTION_SIZE
+
+
+def get_section_count():
+    """number of sections, the last one holds the newest thread"""
+    from askbot.models import Thread
+    max_id = Thread.objects.aggregate(max_id=Max('id'))['max_id']
+    if max_id is None:
+        return 0
+    return get_section_number(max_id) + 1
+
+
+def get_version_cache_key(section):
+    return 'askbot-sitemap-version-%d' % section
+
+
+def get_section_cache_key(section, version, base_url):
+    url_hash = hashlib.md5(base_url.encode('utf-8')).hexdigest()
+    return 'askbot-sitemap-%d-%s-%s' % (section, version, url_hash)
+
+
+def invalidate_section(thread_id):
+    """makes the section of the thread render anew on the next request"""
+    cache.delete(get_version_cache_key(get_section_number(thread_id)))
+
+
+def invalidate_sections(thread_ids):
+    """same as `invalidate_section` for many threads"""
+    sections = set(get_section_number(thread_id) for thread_id in thread_ids)
+    cache.delete_many([get_version_cache_key(section) for section in sections])
+
+
+def get_section_versions(sections):
+    """returns dictionary section -> version token,
+    missing tokens are created"""
+    keys = dict((get_version_cache_key(section), section) for section in sections)
+    cached = cache.get_many(list(keys))
+    versions = dict()
+    new_versions = dict()
+    for key, section in keys.items():
+        version = cached.get(key)
+        if version is None:
+            version = uuid.uuid4().hex
+            new_versions[key] = version
+        versions[section] = version
+    if new_versions:
+        cache.set_many(new_versions, const.SITEMAP_CACHE_TIMEOUT)
+    return versions
+
+
+def render_section(section, site, protocol):
+    """returns dictionary with the xml of the section
+    and the latest modification time of its questions"""
+    sitemap = QuestionsSitemap(section)
+    urls = sitemap.get_urls(page=1, site=site, protocol=protocol)
+    lastmod = max([url['lastmod'] for url in urls if url['lastmod']], default=None)
+    xml = loader.render_to_string('sitemap.xml', {'urlset': urls})
+    return {'xml': xml, 'lastmod': lastmod, 'count': len(urls)}
+
+
+def get_sections(sections, site, protocol):
+    """returns dictionary section -> rendered section,
+    sections missing in the cache are rendered and stored"""
+    base_url = '%s://%s' % (protocol, site.domain)
+    versions = get_section_versions(sections)
+    keys = dict(
+        (get_section_cache_key(section, versions[section], base_url), section)
+        for section in sections
+    )
+    cached = cache.get_many(list(keys))
+    result = dict()
+    for key, section in keys.items():
+        data = cached.get(key)
+        if data is None:
+            data = render_section(section, site, protocol)
+            cache.set(key, data, const.SITEMAP_CACHE_TIMEOUT)
+        result[section] = data
+    return result
+
+
+def make_response(content, lastmod):
+    response = HttpResponse(content, content_type='application/xml')
+    if lastmod:
+        response['Last-Modified'] = http_date(lastmod.timestamp())
+    return response
+
+
+def sitemap_index(request):
+    """index of the non-empty sitemap sections"""
+    site = get_current_site(request)
+    protocol = request.scheme
+    sections = get_sections(range(get_section_count()), site, protocol)
+
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    latest = None
+    for section, data in sorted(sections.items()):
+        if not data['count']:
+            continue
+        url = reverse('sitemap_section', kwargs={'section': section})
+        lines.append('<sitemap><loc>%s</loc>' % escape('%s://%s%s' % (protocol, site.domain, url)))
+        if data['lastmod']:
+            lines.append('<lastmod>%s</lastmod>' % data['lastmod'].isoformat())
+            latest = max(latest, data['lastmod']) if latest else data['lastmod']
+        lines.append('</sitemap>')
+    lines.append('</sitemapindex>')
+    return make_response('\n'.join(lines), latest)
+
+
+def sitemap_section(request, section):
+    section = int(section)
+    if section >= get_section_count():
+        raise Http404
+    data = get_sections([section], get_current_site(request), request.scheme)[section]
+    return make_response(data['xml'], data['lastmod'])
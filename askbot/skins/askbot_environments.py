@@ -7,7 +7,7 @@
 # faintest idea if that is a wise thing to do. For now we will simply mimic
 # this behaviour.
 
-from jinja2 import Environment
+from jinja2 import Environment, Template
 
 from django.utils import translation
 from django.core.exceptions import ImproperlyConfigured
@@ -18,6 +18,18 @@ from askbot.utils.translation import get_language
 # probably just copy/paste this file contents here
 import askbot.skins.template_backends
 
+class SpacelessTemplate(Template):
+    """Marks the request as rendered from the template,
+    whitespace of which is reduced when it is compiled,
+    so that the SpacelessMiddleware skips the response"""
+
+    def render(self, *args, **kwargs):
+        context = dict(*args, **kwargs)
+        request = context.get('request')
+        if request is not None:
+            request.askbot_spaceless = True
+        return super(SpacelessTemplate, self).render(context)
+
 class MultilingualEnvironment(Environment):
     def __init__(self, *args, **kwargs):
         lang_code = kwargs.pop('language_code', None) # atm I don't see this ever becoming None
@@ -42,6 +54,7 @@ class SkinEnvironment(MultilingualEnvironment):
 
     # we use this over the SKINS variable in the original code
     siblings = dict()
+    template_class = SpacelessTemplate
 
     def __init__(self, *args, **kwargs):
         """save the skin path and initialize the
@@ -6,15 +6,20 @@
 # faintest idea if that is a wise thing to do. For now we will simply mimic
 # this behaviour in factory()
 
+import hashlib
 from copy import deepcopy
 from django.conf import settings as django_settings
+from django.core.cache import cache
+from jinja2 import FileSystemBytecodeCache, MemcachedBytecodeCache
 
 import askbot
+from askbot import const
 from askbot.conf import settings as askbot_settings
 from askbot.skins import utils
 from askbot.skins.askbot_environments import SkinEnvironment
 from askbot.templatetags.textwrap import TextWrapExtension
 from askbot.templatetags.premail import PremailerExtension
+from askbot.templatetags.spaceless import SpacelessExtension
 from askbot.utils.functions import encode_jwt
 from askbot.utils.translation import HAS_ASKBOT_LOCALE_MIDDLEWARE
 from askbot.utils.translation import get_language
@@ -38,6 +43,7 @@ if 'jinja2.ext.i18n' not in DEFAULT_EXTENSIONS:
 
 DEFAULT_EXTENSIONS.append(TextWrapExtension)
 DEFAULT_EXTENSIONS.append(PremailerExtension)
+DEFAULT_EXTENSIONS.append(SpacelessExtension)
 
 try:
     DEFAULT_EXTENSIONS.remove('django_jinja.builtins.extensions.CsrfExtension')
@@ -58,6 +64,26 @@ def load_templatetags():
     Library._update_env(SkinEnvironment.siblings[sibling])
 
 
+def get_bytecode_cache(extensions):
+    """Returns cache of the compiled templates, shared by the
+    environments of all skins and languages and by the processes.
+    The bytecode does not depend on the language, the translations
+    are looked up when the templates are rendered.
+    Compiled templates are stored in the directory
+    ASKBOT_JINJA2_BYTECODE_CACHE_DIR, if set, or in the django cache."""
+    # templates compiled by another version of askbot or with
+    # other extensions must not be loaded
+    names = [getattr(ext, '__name__', ext) for ext in extensions]
+    digest = hashlib.md5(repr(names).encode('utf-8')).hexdigest()[:8]
+    prefix = f'askbot-jinja2-{askbot.get_version()}-{digest}-'
+
+    cache_dir = django_settings.ASKBOT_JINJA2_BYTECODE_CACHE_DIR
+    if cache_dir:
+        return FileSystemBytecodeCache(cache_dir, prefix + '%s.cache')
+    return MemcachedBytecodeCache(cache, prefix=prefix,
+                                  timeout=const.JINJA2_BYTECODE_CACHE_TIMEOUT)
+
+
 # Django calls this function, because we provide it (i.e. its path) in
 # settings.py as ["OPTIONS"]["environment"] parameter to Django's
 # jinja2.Jinja2 template backend.
@@ -74,6 +100,7 @@ def factory(**options):
                       'encode_jwt': encode_jwt}
 
     mother_of_all_loaders = options.pop('loader')
+    options.setdefault('bytecode_cache', get_bytecode_cache(options['extensions']))
 
     skins = utils.get_available_skins()
     if askbot.is_multilingual() or HAS_ASKBOT_LOCALE_MIDDLEWARE:
@@ -1,8 +1,21 @@
 from django.conf import settings as django_settings
+from askbot.conf import settings as askbot_settings
 from askbot.utils.loading import load_function
 
 is_spam = load_function(django_settings.ASKBOT_SPAM_CHECKER_FUNCTION)
 
+def is_async():
+    """True if the posts are checked for spam
+    by the celery task, after they are saved"""
+    return askbot_settings.SPAM_FILTER_ENABLED \
+        and django_settings.ASKBOT_SPAM_CHECKER_ASYNC
+
+def should_check_in_request():
+    """True if the views must check the posts for spam
+    before saving them"""
+    return askbot_settings.SPAM_FILTER_ENABLED \
+        and not django_settings.ASKBOT_SPAM_CHECKER_ASYNC
+
 def get_params_from_request(request):
     """Returns a dictionary of parameters to be passed to the spam checker"""
     username, email = None, None
@@ -14,4 +27,14 @@ def get_params_from_request(request):
         'email': email,
         'ip_addr': request.META.get('REMOTE_ADDR', None),
         'user_agent': request.META.get('HTTP_USER_AGENT', None),
-    }
\ No newline at end of file
+    }
+
+def get_params_from_revision(revision):
+    """Same as `get_params_from_request`, for the
+    post revision checked outside of the request"""
+    return {
+        'username': revision.author.username,
+        'email': revision.author.email,
+        'ip_addr': revision.ip_addr,
+        'user_agent': None,
+    }
@@ -0,0 +1,103 @@
+"""Local naive Bayes spam classifier, does not need the network.
+
+The model is trained by the management command
+``askbot_train_spam_classifier`` from the output of the
+``askbot_get_spam_training_set`` and is saved in a JSON file.
+To use the classifier, set::
+
+    ASKBOT_SPAM_CHECKER_FUNCTION = 'askbot.spam_checker.bayes_spam_checker.is_spam'
+    ASKBOT_SPAM_CHECKER_MODEL_FILE = '/path/to/the/model.json'
+"""
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter
+from django.conf import settings as django_settings
+
+TOKEN_RE = re.compile(r'[^\W_]{2,40}')
+SPAM_THRESHOLD = 0.5
+
+#loaded models by the file path, with the file modification time
+MODELS = dict()
+
+def tokenize(text):
+    """Returns set of lowercase words of the text"""
+    return set(TOKEN_RE.findall(text.lower()))
+
+
+def train(spam, ham):
+    """Returns the model trained on the lists
+    of spam and ham texts. Each token is counted
+    once per text."""
+    spam_counts = Counter()
+    for text in spam:
+        spam_counts.update(tokenize(text))
+    ham_counts = Counter()
+    for text in ham:
+        ham_counts.update(tokenize(text))
+    return {
+        'spam_texts': len(spam),
+        'ham_texts': len(ham),
+        'spam_tokens': dict(spam_counts),
+        'ham_tokens': dict(ham_counts),
+    }
+
+
+def save_model(model, file_name):
+    """Saves model in the JSON file"""
+    with open(file_name, 'w', encoding='utf-8') as model_file:
+        json.dump(model, model_file)
+
+
+def load_model(file_name):
+    """Loads model from the JSON file,
+    the model is reloaded when the file changes"""
+    mtime = os.path.getmtime(file_name)
+    if file_name in MODELS and MODELS[file_name][0] == mtime:
+        return MODELS[file_name][1]
+
+    with open(file_name, encoding='utf-8') as model_file:
+        model = json.load(model_file)
+    MODELS[file_name] = (mtime, model)
+    return model
+
+
+def get_spam_probability(text, model):
+    """Returns probability of the text being spam,
+    with the Laplace smoothing of the token counts"""
+    spam_texts = model['spam_texts']
+    ham_texts = model['ham_texts']
+    if not (spam_texts and ham_texts):
+        return 0
+
+    spam_tokens = model['spam_tokens']
+    ham_tokens = model['ham_tokens']
+    spam_score = math.log(spam_texts / (spam_texts + ham_texts))
+    ham_score = math.log(ham_texts / (spam_texts + ham_texts))
+    for token in tokenize(text):
+        spam_count = spam_tokens.get(token, 0)
+        ham_count = ham_tokens.get(token, 0)
+        if spam_count == 0 and ham_count == 0:
+            continue #unseen tokens do not change the odds
+        spam_score += math.log((spam_count + 1) / (spam_texts + 2))
+        ham_score += math.log((ham_count + 1) / (ham_texts + 2))
+
+    odds = ham_score - spam_score
+    if odds > 700: #math.exp overflows
+        return 0
+    return 1 / (1 + math.exp(odds))
+
+
+def is_spam(text, **kwargs): # pylint: disable=unused-argument
+    """Returns True if the text is spam, `kwargs` are ignored.
+    Returns False if the model cannot be loaded,
+    so that the users are not blocked from posting."""
+    file_name = django_settings.ASKBOT_SPAM_CHECKER_MODEL_FILE
+    try:
+        model = load_model(file_name)
+    except Exception as error: # pylint: disable=broad-except
+        logging.critical('Error while loading spam classifier model %s', str(error))
+        return False
+    return get_spam_probability(text, model) > SPAM_THRESHOLD
@@ -159,6 +159,10 @@ def test_middleware():
         'askbot.middleware.cancel.CancelActionMiddleware',
         #'django.middleware.transaction.TransactionMiddleware',
     ]
+    page_cache_middleware = 'askbot.middleware.cache.AnonymousPageCacheMiddleware'
+    if page_cache_middleware in django_settings.MIDDLEWARE:
+        #optional, cached pages must be served after the access checks
+        required_middleware.append(page_cache_middleware)
     #if 'debug_toolbar' in django_settings.INSTALLED_APPS:
     #    required_middleware.append(
     #        'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -25,6 +25,7 @@ import uuid
 
 from django.contrib.contenttypes.models import ContentType
 from django.core.management import call_command
+from django.utils import timezone
 from django.utils.translation import gettext as _
 from django.utils.translation import activate as activate_language
 
@@ -103,6 +104,29 @@ def submit_spam_posts_to_akismet(post_ids):
                             email=post.author.email)
 
 
+@shared_task(ignore_result=True)
+def check_post_revision_for_spam(revision_id):
+    """Checks the post revision with the spam checker.
+    Spam goes to the moderation queue, held new post
+    which passed the check is published"""
+    from askbot import spam_checker
+    from askbot.models import publish_post_revision
+    try:
+        revision = PostRevision.objects.select_related('post', 'author').get(pk=revision_id)
+    except PostRevision.DoesNotExist: # pylint: disable=no-member
+        return
+
+    post = revision.post
+    text = post.get_text_content(title=revision.title,
+                                 body_text=revision.text,
+                                 tags=revision.tagnames)
+    params = spam_checker.get_params_from_revision(revision)
+    if spam_checker.is_spam(text, **params):
+        revision.place_on_moderation_queue()
+    elif revision.revision == 0 and not post.approved:
+        publish_post_revision(revision, timestamp=timezone.now())
+
+
 @shared_task(ignore_result=True)
 def export_user_data(user_id):
     """Exports user data by ID"""
@@ -120,6 +144,37 @@ def export_user_data(user_id):
         return
 
 
+@shared_task(ignore_result=True)
+def clear_user_cached_data(user_id):
+    """Clears cached data of threads where user contributed"""
+    try:
+        user = User.objects.get(pk=user_id)
+    except User.DoesNotExist: # pylint: disable=no-member
+        return
+    user.clear_cached_data(defer=False)
+
+
+@shared_task(ignore_result=True)
+def init_avatar_urls(user_ids):
+    """Calculates and saves missing avatar urls of the users"""
+    for user in User.objects.filter(pk__in=user_ids).select_related('askbot_profile'):
+        user.init_avatar_urls()
+
+
+@shared_task(ignore_result=True)
+def delete_all_content_authored_by_user(deleted_by_id, author_id, mark_as_spam=False):
+    """Deletes content of the user, percent of the deleted
+    posts is stored in the cache while the task runs"""
+    try:
+        deleted_by = User.objects.get(pk=deleted_by_id)
+        author = User.objects.get(pk=author_id)
+    except User.DoesNotExist: # pylint: disable=no-member
+        return
+    deleted_by.delete_all_content_authored_by_user(author,
+                                                   mark_as_spam=mark_as_spam,
+                                                   defer=False)
+
+
 @shared_task(ignore_result=True)
 def delete_update_notifications_task(rev_ids, keep_activity):
     """parameter is list of revision ids"""
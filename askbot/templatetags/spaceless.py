@@ -0,0 +1,36 @@
+"""Jinja2 extension reducing the whitespace between html tags
+when the templates are compiled, so that the rendered pages
+do not need to pass the regex of the
+:class:`~askbot.middleware.spaceless.SpacelessMiddleware`
+"""
+import re
+from jinja2.ext import Extension
+from jinja2.lexer import Token
+
+SPACE_BETWEEN_TAGS_RE = re.compile(r'>\s+<')
+LEADING_SPACE_RE = re.compile(r'^\s+<')
+TRAILING_SPACE_RE = re.compile(r'>\s+$')
+
+class SpacelessExtension(Extension):
+    """Leaves one space between the html tags in the text
+    of the .html templates, the same as the middleware does.
+    The whitespace between the html tags and the block tags,
+    like ``{% if %}``, is reduced to one space on each side,
+    because the output of the block is not known at compile time.
+    Text output by the variables is not changed."""
+
+    def filter_stream(self, stream):
+        if not (stream.name or '').endswith('.html'):
+            yield from stream
+            return
+
+        tokens = list(stream)
+        for idx, token in enumerate(tokens):
+            if token.type == 'data':
+                value = SPACE_BETWEEN_TAGS_RE.sub('> <', token.value)
+                if idx > 0 and tokens[idx - 1].type == 'block_end':
+                    value = LEADING_SPACE_RE.sub(' <', value)
+                if idx + 1 < len(tokens) and tokens[idx + 1].type == 'block_begin':
+                    value = TRAILING_SPACE_RE.sub('> ', value)
+                token = Token(token.lineno, token.type, value)
+            yield token
@@ -145,6 +145,13 @@ class BadgeTests(AskbotTestCase):
         self.u1.delete_answer(answer)
         self.assert_have_badge('peer-pressure', recipient = self.u1)
 
+    def test_disciplined_badge_for_deleting_all_own_content(self):
+        question = self.post_question(user = self.u1)
+        question.points = settings.DISCIPLINED_BADGE_MIN_UPVOTES
+        question.save()
+        self.u1.delete_all_content_authored_by_user(self.u1)
+        self.assert_have_badge('disciplined', recipient = self.u1)
+
     def test_teacher_badge(self):
         self.assert_upvoted_answer_badge_works(
             badge_key = 'teacher',
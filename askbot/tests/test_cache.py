@@ -1,7 +1,11 @@
 from django.db import connection
+from django.middleware.csrf import _get_new_csrf_string, _mask_cipher_secret
+from django.test import override_settings
 from django.urls import reverse
 from django.conf import settings
-from askbot.tests.utils import AskbotTestCase
+from askbot import models, page_cache
+from askbot.middleware.cache import CSRF_TOKEN_PLACEHOLDER, hide_csrf_tokens
+from askbot.tests.utils import AskbotTestCase, with_settings
 
 
 class CacheTests(AskbotTestCase):
@@ -27,3 +31,101 @@ class CacheTests(AskbotTestCase):
         self.assertTrue(before_count > after_count,
                 ('Expected fewer queries after calling visit_question. ' +
                  'Before visit: %d. After visit: %d.') % (before_count, after_count))
+
+
+class UserClearCachedDataTests(AskbotTestCase):
+
+    def test_clear_cached_data_deletes_thread_keys(self):
+        from django.core import cache
+        user = self.create_user('author')
+        question = self.post_question(user=user)
+        thread = question.thread
+        summary_key = thread.get_summary_cache_key()
+        post_data_key = thread.get_post_data_cache_key('votes')
+        cache.cache.set(summary_key, 'summary')
+        cache.cache.set(post_data_key, 'data')
+
+        self.assertEqual(user.get_contributed_thread_ids(), [thread.id])
+        user.clear_cached_data()
+        self.assertEqual(cache.cache.get(summary_key), None)
+        self.assertEqual(cache.cache.get(post_data_key), None)
+
+
+PAGE_CACHE_MIDDLEWARE = list(settings.MIDDLEWARE)
+PAGE_CACHE_MIDDLEWARE.insert(
+    PAGE_CACHE_MIDDLEWARE.index('askbot.middleware.cancel.CancelActionMiddleware') + 1,
+    'askbot.middleware.cache.AnonymousPageCacheMiddleware'
+)
+
+@override_settings(
+    MIDDLEWARE=PAGE_CACHE_MIDDLEWARE,
+    CACHES={
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'anonymous-page-cache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+)
+class AnonymousPageCacheTests(AskbotTestCase):
+
+    def setUp(self):
+        self.user = self.create_user('user')
+        self.question = self.post_question(user=self.user)
+        self.url = self.question.get_absolute_url()
+
+    def get_question_page(self, remote_addr='127.0.0.1'):
+        return self.client.get(self.url,
+                               HTTP_ACCEPT_LANGUAGE='en',
+                               HTTP_USER_AGENT='Mozilla/5.0 (X11; Linux x86_64) Gecko/20100101 Firefox/100.0',
+                               REMOTE_ADDR=remote_addr)
+
+    @with_settings(ENABLE_GREETING_FOR_ANON_USER=False)
+    def test_page_is_served_from_cache(self):
+        response = self.get_question_page()
+        self.assertEqual(response['X-Askbot-Page-Cache'], 'miss')
+        response = self.get_question_page(remote_addr='127.0.0.2')
+        self.assertEqual(response['X-Askbot-Page-Cache'], 'hit')
+        self.assertContains(response, self.question.thread.title)
+        self.assertNotContains(response, CSRF_TOKEN_PLACEHOLDER.decode('ascii'))
+        #visits are counted on the cache hits too
+        thread = models.Thread.objects.get(id=self.question.thread_id)
+        self.assertEqual(thread.view_count, 2)
+        self.assertEqual(page_cache.get_stats()['hit_ratio'], 0.5)
+
+    @with_settings(ENABLE_GREETING_FOR_ANON_USER=False)
+    def test_thread_event_makes_page_stale(self):
+        self.get_question_page()
+        self.post_answer(user=self.user, question=self.question, body_text='new answer text')
+        response = self.get_question_page()
+        self.assertEqual(response['X-Askbot-Page-Cache'], 'miss')
+        self.assertContains(response, 'new answer text')
+        response = self.get_question_page()
+        self.assertEqual(response['X-Askbot-Page-Cache'], 'hit')
+
+    @with_settings(ENABLE_GREETING_FOR_ANON_USER=False)
+    def test_stale_page_is_served_while_rendered(self):
+        from django.core.cache import cache as django_cache
+        key = self.get_question_page().wsgi_request.page_cache_key
+        self.post_answer(user=self.user, question=self.question, body_text='new answer text')
+        #another request is rendering the page
+        django_cache.add(page_cache.get_rebuild_lock_cache_key(key), 1)
+        response = self.get_question_page()
+        self.assertEqual(response['X-Askbot-Page-Cache'], 'stale')
+        self.assertNotContains(response, 'new answer text')
+
+    @with_settings(ENABLE_GREETING_FOR_ANON_USER=False)
+    def test_authenticated_users_are_not_cached(self):
+        self.get_question_page()
+        self.client.login(user_id=self.user.id, method='force')
+        response = self.get_question_page()
+        self.assertFalse(response.has_header('X-Askbot-Page-Cache'))
+
+    def test_csrf_tokens_of_visitor_are_hidden(self):
+        secret = _get_new_csrf_string()
+        token = _mask_cipher_secret(secret)
+        other_token = _mask_cipher_secret(_get_new_csrf_string())
+        content = '<input value="%s"/><input value="%s"/>'
+        hidden = hide_csrf_tokens((content % (token, other_token)).encode(), secret)
+        placeholder = CSRF_TOKEN_PLACEHOLDER.decode()
+        self.assertEqual(hidden.decode(), content % (placeholder, other_token))
@@ -177,6 +177,45 @@ class DBApiTests(DBApiTestsBase):
         count = models.Tag.objects.filter(name='one-tag').count()
         self.assertEqual(count, 1)
 
+    def test_upvote_updates_post_thread_and_author(self):
+        rep_before = self.user.reputation
+        self.other_user.upvote(self.question)
+        question = models.Post.objects.get(id=self.question.id)
+        self.assertEqual(question.points, 1)
+        self.assertEqual(question.vote_up_count, 1)
+        self.assertEqual(question.thread.points, 1)
+        user = models.User.objects.get(id=self.user.id)
+        gain = askbot_settings.REP_GAIN_FOR_RECEIVING_UPVOTE
+        self.assertEqual(user.reputation, rep_before + gain)
+        self.assertEqual(
+            models.Repute.objects.get_reputation_by_upvoted_today(user),
+            gain
+        )
+
+        self.other_user.upvote(self.question, cancel=True)
+        question = models.Post.objects.get(id=self.question.id)
+        self.assertEqual(question.points, 0)
+        self.assertEqual(question.vote_up_count, 0)
+        self.assertEqual(question.thread.points, 0)
+        user = models.User.objects.get(id=self.user.id)
+        self.assertEqual(user.reputation, rep_before)
+        self.assertEqual(
+            models.Repute.objects.get_reputation_by_upvoted_today(user),
+            0
+        )
+
+    @with_settings(MAX_REP_GAIN_PER_USER_PER_DAY=1)
+    def test_upvote_reputation_gain_is_capped_daily(self):
+        rep_before = self.user.reputation
+        self.other_user.upvote(self.question)
+        third_user = self.create_user('third_user')
+        third_user.upvote(self.question)
+        user = models.User.objects.get(id=self.user.id)
+        gain = askbot_settings.REP_GAIN_FOR_RECEIVING_UPVOTE
+        self.assertEqual(user.reputation, rep_before + gain)
+        question = models.Post.objects.get(id=self.question.id)
+        self.assertEqual(question.points, 2)
+
     @with_settings(MAX_TAG_LENGTH=200, MAX_TAGS_PER_POST=50)
     def test_retag_tags_too_long_raises(self):
         tags = "aoaoesuouooeueooeuoaeuoeou aostoeuoaethoeastn oasoeoa nuhoasut oaeeots aoshootuheotuoehao asaoetoeatuoasu o  aoeuethut aoaoe uou uoetu uouuou ao aouosutoeh"
@@ -469,6 +508,35 @@ class GroupTests(AskbotTestCase):
         self.assertEqual(self.u1.is_group_member(group2), False)
         self.assertEqual(self.u1.is_group_member('othergroup'), False)
 
+    def test_global_group_is_cached(self):
+        group = models.Group.objects.get_global_group()
+        with self.assertNumQueries(0):
+            self.assertEqual(models.Group.objects.get_global_group(), group)
+
+        models.Group.objects.filter(pk=group.pk).update(can_post_answers=False)
+        models.Group.objects.create(name='somegroup')
+        group = models.Group.objects.get_global_group()
+        self.assertEqual(group.can_post_answers, False)
+
+    def test_group_ids_are_reset_on_membership_change(self):
+        group = models.Group.objects.create(
+                            name='somegroup', openness=models.Group.OPEN
+                        )
+        self.assertFalse(group.pk in self.u1.get_group_ids())
+        self.u1.join_group(group)
+        with self.assertNumQueries(1):
+            self.assertTrue(group.pk in self.u1.get_group_ids())
+            self.assertTrue(self.u1.is_group_member(group))
+
+        info = self.u1.get_groups_membership_info(models.Group.objects.filter(pk=group.pk))
+        self.assertEqual(info[group.pk]['membership_level'], 'full')
+
+        global_group = models.Group.objects.get_global_group()
+        self.assertFalse(global_group.pk in self.u1.get_group_ids(private=True))
+
+        self.u1.leave_group(group)
+        self.assertFalse(group.pk in self.u1.get_group_ids())
+
     def test_posts_added_to_global_group(self):
         q = self.post_question(user=self.u1)
         group_name = askbot_settings.GLOBAL_GROUP_NAME
@@ -110,7 +110,7 @@ class SubjectLineTests(TestCase):
         self.assertEqual(subj, 'hahah')
 
 from django.test import TransactionTestCase
-class EmailAlertTests(TransactionTestCase):
+class EmailAlertTests(utils.ClearCacheMixin, TransactionTestCase):
     """Base class for testing delayed Email notifications
     that are triggered by the send_email_alerts
     command
@@ -970,6 +970,84 @@ class UnansweredReminderTests(EmailReminderTestCase):
         self.do_post(timestamp)
         self.assert_have_emails(0)
 
+class UnansweredReminderSelectionTests(utils.AskbotTestCase):
+    """reminders are selected for all users at once,
+    the selection must match the per-user tag filters"""
+
+    def setUp(self):
+        askbot_settings.update('ENABLE_UNANSWERED_REMINDERS', True)
+        askbot_settings.update('MAX_UNANSWERED_REMINDERS', 5)
+        askbot_settings.update('UNANSWERED_REMINDER_FREQUENCY', 1)
+        askbot_settings.update('DAYS_BEFORE_SENDING_UNANSWERED_REMINDER', 2)
+
+        self.author = self.create_user('author')
+        timestamp = timezone.now() - datetime.timedelta(3)
+        for tags in ('apple', 'banana', 'apple cherry', 'cherry-pie', 'durian'):
+            self.post_question(
+                user=self.author,
+                title='question about ' + tags,
+                tags=tags,
+                timestamp=timestamp
+            )
+
+        user = self.create_user('ignores_apple')
+        user.mark_tags(tagnames=['apple'], reason='bad', action='add')
+
+        user = self.create_user('ignores_cherries')
+        user.mark_tags(wildcards=['cherry*'], reason='bad', action='add')
+
+        user = self.create_user('likes_banana_and_durian')
+        user.email_tag_filter_strategy = const.INCLUDE_INTERESTING
+        user.askbot_profile.save()
+        user.mark_tags(tagnames=['banana'], wildcards=['dur*'], reason='good', action='add')
+
+        user = self.create_user('reads_all')
+        user.email_tag_filter_strategy = const.INCLUDE_ALL
+        user.askbot_profile.save()
+
+        user = self.create_user('blocked', status='b')
+
+    def get_expected_reminders(self):
+        """reminders by the per-user question filters"""
+        questions = models.Post.objects.get_questions()
+        expected = dict()
+        users = models.User.objects.filter(askbot_profile__status__in=('a', 'w', 'd', 'm'))
+        for user in users:
+            user_questions = user.get_tag_filtered_questions(questions.exclude(author=user))
+            titles = set(question.thread.title for question in user_questions)
+            if titles:
+                expected[user.username] = titles
+        return expected
+
+    def get_sent_reminders(self):
+        activities = models.Activity.objects.filter(
+            activity_type=const.TYPE_ACTIVITY_UNANSWERED_REMINDER_SENT
+        )
+        sent = dict()
+        for activity in activities:
+            sent.setdefault(activity.user.username, set()).add(activity.question.thread.title)
+        return sent
+
+    def test_reminders_match_per_user_filters(self):
+        expected = self.get_expected_reminders()
+        self.assertEqual(
+            expected['likes_banana_and_durian'],
+            set(['question about banana', 'question about durian'])
+        )
+        django.core.mail.outbox = list()
+        management.call_command('send_unanswered_question_reminders')
+        self.assertEqual(self.get_sent_reminders(), expected)
+        outbox = django.core.mail.outbox
+        self.assertEqual(
+            sorted(message.to[0] for message in outbox),
+            sorted(models.User.objects.get(username=name).email for name in expected)
+        )
+
+        #reminders are not repeated before the recurrence delay
+        management.call_command('send_unanswered_question_reminders')
+        self.assertEqual(len(django.core.mail.outbox), len(expected))
+
+
 class EmailFeedSettingTests(utils.AskbotTestCase):
     def setUp(self):
         self.user = self.create_user('user')
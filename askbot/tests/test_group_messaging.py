@@ -0,0 +1,118 @@
+import json
+import time
+from unittest.mock import patch
+from django.contrib.auth.models import Group
+from django.test.client import RequestFactory
+from django.utils import timezone
+from askbot.deps.group_messaging import views
+from askbot.deps.group_messaging.models import InboxEntry
+from askbot.deps.group_messaging.models import LastVisitTime
+from askbot.deps.group_messaging.models import Message
+from askbot.deps.group_messaging.models import create_personal_group
+from askbot.deps.group_messaging.models import get_personal_group
+from askbot.tests.utils import AskbotTestCase
+
+
+class InboxEntryTests(AskbotTestCase):
+    """tests for the inbox entries maintained for the
+    group messaging threads"""
+
+    def setUp(self):
+        self.sender = self.create_user('sender')
+        self.recipient = self.create_user('recipient')
+
+    def get_personal_group(self, user):
+        try:
+            return get_personal_group(user)
+        except Group.DoesNotExist:
+            group = create_personal_group(user)
+            user.groups.add(group)
+            return group
+
+    def create_thread_for_user(self, sender, recipient):
+        return Message.objects.create_thread(
+            sender=sender,
+            recipients=[self.get_personal_group(recipient)],
+            text='test message text'
+        )
+
+    def visit_thread(self, thread, user):
+        last_visit_time, _ = LastVisitTime.objects.get_or_create(
+                                                user=user,
+                                                message=thread
+                                            )
+        last_visit_time.at = timezone.now()
+        last_visit_time.save()
+        time.sleep(1.5)
+
+    def test_inbox_entries_follow_the_thread(self):
+        root = self.create_thread_for_user(self.sender, self.recipient)
+        entries = InboxEntry.objects.get_inbox(self.recipient)
+        self.assertEqual([entry.thread for entry in entries], [root])
+        self.assertEqual(InboxEntry.objects.get_unread_count(self.recipient), 1)
+        self.assertEqual(InboxEntry.objects.get_inbox(self.sender).count(), 0)
+        self.assertEqual(InboxEntry.objects.get_sent(self.sender).count(), 1)
+
+        self.visit_thread(root, self.recipient)
+        self.assertEqual(InboxEntry.objects.get_unread_count(self.recipient), 0)
+
+        Message.objects.create_response(
+                                sender=self.recipient,
+                                text='some response',
+                                parent=root
+                            )
+        entry = InboxEntry.objects.get(user=self.sender, thread=root)
+        self.assertEqual(entry.responses_count, 1)
+        self.assertTrue(entry.is_received)
+        self.assertTrue(entry.is_unread)
+
+        root.archive(self.sender)
+        self.assertEqual(InboxEntry.objects.get_inbox(self.sender).count(), 0)
+        self.assertEqual(InboxEntry.objects.get_archived(self.sender).count(), 1)
+
+    def test_own_response_keeps_thread_read(self):
+        root = self.create_thread_for_user(self.sender, self.recipient)
+        self.visit_thread(root, self.recipient)
+        Message.objects.create_response(
+                                sender=self.recipient,
+                                text='some response',
+                                parent=root
+                            )
+        entry = InboxEntry.objects.get(user=self.recipient, thread=root)
+        self.assertFalse(entry.is_unread)
+        self.assertEqual(InboxEntry.objects.get_unread_count(self.recipient), 0)
+        entry = InboxEntry.objects.get(user=self.sender, thread=root)
+        self.assertTrue(entry.is_unread)
+
+    def test_rebuilt_inbox_entries_match_maintained_ones(self):
+        root = self.create_thread_for_user(self.sender, self.recipient)
+        response = Message.objects.create_response(
+                                sender=self.recipient,
+                                text='some response',
+                                parent=root
+                            )
+        Message.objects.create_response(
+                                sender=self.sender,
+                                text='some response2',
+                                parent=response
+                            )
+        self.create_thread_for_user(self.recipient, self.sender)
+        root.archive(self.recipient)
+        fields = ('thread_id', 'responses_count', 'status',
+                  'is_received', 'is_sent', 'is_unread')
+        for user in (self.sender, self.recipient):
+            entries = InboxEntry.objects.filter(user=user).order_by('thread_id')
+            expected = list(entries.values(*fields))
+            InboxEntry.objects.rebuild_for_user(user)
+            self.assertEqual(list(entries.values(*fields)), expected)
+
+    def test_threads_list_is_paginated(self):
+        threads = [self.create_thread_for_user(self.sender, self.recipient) for _ in range(3)]
+        request = RequestFactory().get('/', {'sender_id': -1, 'page': 2})
+        request.user = self.recipient
+        with patch.object(views, 'INBOX_THREADS_PER_PAGE', 2):
+            response = views.ThreadsList().get(request)
+        html = json.loads(response.content.decode('utf-8'))['html']
+        self.assertIn('data-thread-id="%d"' % threads[0].id, html)
+        self.assertNotIn('data-thread-id="%d"' % threads[2].id, html)
+        self.assertIn('class="js-page-link" data-page="1"', html)
@@ -1,10 +1,12 @@
 
+import datetime
 from datetime import date
 import json
 import os
 import sys
 import io
 import shutil
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock, mock_open
 import zipfile
@@ -13,6 +15,7 @@ from django.core import management, mail
 from django.conf import settings as django_settings
 from django.contrib import auth
 from django.contrib.auth.models import User
+from django.utils import timezone
 from askbot.utils.html import site_url
 from askbot.utils.url_utils import reload_urlconf
 from askbot.tests.utils import AskbotTestCase
@@ -20,6 +23,7 @@ from askbot.tests.utils import with_settings
 from askbot import (const, models)
 from askbot import models
 from askbot.models import LocalizedUserProfile, UserProfile
+from askbot.conf import settings as askbot_settings
 
 class ExportUserDataTests(AskbotTestCase):
 
@@ -120,6 +124,7 @@ class ExportUserDataTests(AskbotTestCase):
         paths = list()
         for idx in range(1, 4):
             path = self.put_upfile('file{}.txt'.format(idx))
+            self.addCleanup(os.remove, path)
             paths.append(path)
 
         # post question with an image
@@ -141,17 +146,13 @@ class ExportUserDataTests(AskbotTestCase):
         comment = user.post_comment(answer, comment_text)
 
         # run extract data command into a temp dir
-        askbot_dir = askbot.get_install_directory()
-        test_dir = os.path.join(askbot_dir, 'tests',
-                                'temp_export_user_data')
-
-        if os.path.isdir(test_dir):
-            shutil.rmtree(test_dir)
-        os.makedirs(test_dir)
+        test_dir = tempfile.mkdtemp(prefix='temp_export_user_data')
+        self.addCleanup(shutil.rmtree, test_dir, ignore_errors=True)
 
         backup_file = os.path.join(test_dir, 'backup.zip')
         management.call_command('askbot_export_user_data',
-                     user_id=user.pk, file_name=backup_file)
+                     user_id=user.pk, file_name=backup_file, chunk_size=1)
+        self.assertFalse(os.path.exists(backup_file + '.part'))
         # test: unzip the file
         zip_file = zipfile.ZipFile(backup_file, 'r')
         extract_dir = os.path.join(test_dir, 'extracted')
@@ -202,8 +203,6 @@ class ExportUserDataTests(AskbotTestCase):
             extracted_path = os.path.join(extract_dir, 'upfiles', name)
             self.assertTrue(os.path.isfile(extracted_path))
 
-        shutil.rmtree(test_dir)
-
 class ManagementCommandTests(AskbotTestCase):
     def test_askbot_add_user(self):
         username = 'test user'
@@ -253,6 +252,111 @@ class ManagementCommandTests(AskbotTestCase):
         self.assertEqual(user_two.gold, number_of_gold)
         self.assertEqual(user_two.reputation, reputation + const.MIN_REPUTATION)
 
+    def test_merge_users_with_duplicate_records(self):
+        """records of the target account win over the duplicates"""
+        author = self.create_user(username='author')
+        question = self.post_question(user=author)
+        user_one = self.create_user()
+        user_two = self.create_user(username='unique')
+        user_one.upvote(question)
+        user_two.upvote(question)
+        user_one.mark_tags(tagnames=['test'], reason='good', action='add')
+        user_two.mark_tags(tagnames=['test'], reason='good', action='add')
+        user_one.follow_question(question)
+        user_two.follow_question(question)
+        management.call_command('merge_users', str(user_one.id), str(user_two.id))
+
+        question = models.Post.objects.get(id=question.id)
+        self.assertEqual(question.points, 1)
+        self.assertEqual(question.vote_up_count, 1)
+        self.assertEqual(models.Vote.objects.filter(user=user_two).count(), 1)
+        self.assertEqual(models.MarkedTag.objects.filter(user=user_two).count(), 1)
+        self.assertEqual(question.thread.followed_by.filter(id=user_two.id).count(), 1)
+        subs = models.EmailFeedSetting.objects.filter(subscriber=user_two)
+        self.assertEqual(subs.count(), len(models.EmailFeedSetting.FEED_TYPES))
+
+    def test_merge_users_keeps_greater_group_membership_level(self):
+        group = models.Group.objects.create(name='merged')
+        user_one = self.create_user()
+        user_two = self.create_user(username='unique')
+        user_one.join_group(group, force=True)
+        user_two.join_group(group, force=True)
+        models.GroupMembership.objects.filter(user=user_two, group=group).update(
+                                        level=models.GroupMembership.PENDING)
+        management.call_command('merge_users', str(user_one.id), str(user_two.id))
+        membership = models.GroupMembership.objects.get(user=user_two, group=group)
+        self.assertEqual(membership.level, models.GroupMembership.FULL)
+
+    def test_merge_users_reverses_reputation_of_duplicate_votes(self):
+        """dropped duplicate votes take back the reputation they gave"""
+        author = self.create_user(username='author')
+        author.receive_reputation(100)
+        question = self.post_question(user=author)
+        answer = self.post_answer(user=author, question=question)
+        user_one = self.create_user()
+        user_two = self.create_user(username='unique')
+        for user in (user_one, user_two):
+            user.receive_reputation(100)
+            user.upvote(question)
+            user.downvote(answer)
+        author = models.User.objects.get(id=author.id)
+        author_reputation = author.reputation
+        voters_reputation = models.User.objects.get(id=user_one.id).reputation \
+                            + models.User.objects.get(id=user_two.id).reputation
+        management.call_command('merge_users', str(user_one.id), str(user_two.id))
+
+        author = models.User.objects.get(id=author.id)
+        self.assertEqual(
+            author.reputation,
+            author_reputation - askbot_settings.REP_GAIN_FOR_RECEIVING_UPVOTE
+                - askbot_settings.REP_LOSS_FOR_RECEIVING_DOWNVOTE
+        )
+        user_two = models.User.objects.get(id=user_two.id)
+        self.assertEqual(
+            user_two.reputation,
+            voters_reputation - const.MIN_REPUTATION
+                - askbot_settings.REP_LOSS_FOR_DOWNVOTING
+        )
+        answer = models.Post.objects.get(id=answer.id)
+        self.assertEqual(answer.points, -1)
+        self.assertEqual(answer.vote_down_count, 1)
+
+    def test_merge_selected_users_admin_action(self):
+        """accounts are merged into the one with the lowest id,
+        which keeps the earliest join date, after a confirmation"""
+        from django.contrib.admin import site
+        from django.template.response import TemplateResponse
+        from django.test import RequestFactory
+        from askbot.admin import merge_selected_users
+        now = timezone.now()
+        user_one = self.create_user(date_joined=now)
+        user_two = self.create_user(username='two',
+                                    date_joined=now - datetime.timedelta(days=10))
+        user_three = self.create_user(username='three',
+                                      date_joined=now - datetime.timedelta(days=5))
+        self.post_question(user=user_three)
+        ids = (user_one.id, user_two.id, user_three.id)
+        queryset = models.User.objects.filter(id__in=ids)
+
+        request = RequestFactory().post('/', {'action': 'merge_selected_users'})
+        request.user = self.create_user(username='admin', status='d')
+        with patch.object(site, 'each_context', return_value={}):
+            response = merge_selected_users(site._registry[User], request, queryset)
+        self.assertIsInstance(response, TemplateResponse)
+        self.assertEqual(response.context_data['to_user'], user_one)
+        self.assertEqual(response.context_data['from_users'], [user_two, user_three])
+        self.assertEqual(queryset.count(), 3)
+
+        modeladmin = MagicMock()
+        request = RequestFactory().post('/', {'action': 'merge_selected_users', 'post': 'yes'})
+        merge_selected_users(modeladmin, request, queryset)
+
+        self.assertEqual(list(models.User.objects.filter(id__in=ids)), [user_one])
+        user_one = models.User.objects.get(id=user_one.id)
+        self.assertEqual(user_one.date_joined, user_two.date_joined)
+        self.assertEqual(user_one.posts.get_questions().count(), 1)
+        modeladmin.message_user.assert_called_once()
+
     def test_create_tag_synonym(self):
 
         admin = self.create_user(username='test_admin', email='admin@admin.com', status='d')
@@ -376,3 +480,41 @@ class ManagementCommandTests(AskbotTestCase):
         #command sends alerts to three moderators at a time
         self.assertEqual(len(mail.outbox), 2)
         self.assertTrue('moderation' in mail.outbox[0].subject)
+
+    def test_askbot_rebuild_avatars(self):
+        users = [self.create_user('user%d' % idx) for idx in range(3)]
+        UserProfile.objects.update(avatar_urls={})
+        management.call_command('askbot_rebuild_avatars', batch_size=2, stdout=io.StringIO())
+        for user in users:
+            avatar_urls = UserProfile.objects.get(pk=user.pk).avatar_urls
+            self.assertEqual(avatar_urls['32'], user.calculate_avatar_url(32))
+
+
+class ImportXMLTests(AskbotTestCase):
+
+    def test_synthetic_dump_is_read_by_model(self):
+        from askbot.management.commands.base import BaseImportXMLCommand
+        work_dir = tempfile.mkdtemp(prefix='askbot_import_test')
+        self.addCleanup(shutil.rmtree, work_dir, ignore_errors=True)
+        dump_path = os.path.join(work_dir, 'synthetic_dump.xml')
+        management.call_command(
+            'askbot_make_xml_dump', dump_path,
+            users=5, tags=4, threads=3, answers=1, comments=0, votes=0
+        )
+        command = BaseImportXMLCommand()
+        command.setup_run(work_dir=work_dir)
+        try:
+            command.read_xml_file(dump_path)
+            self.assertEqual(command.model_counts['auth.user'], 5)
+            self.assertEqual(command.model_counts['askbot.thread'], 3)
+            users = list(command.get_objects_for_model('auth.user'))
+            self.assertEqual([user.username for user in users], ['user%d' % i for i in range(1, 6)])
+            posts = list(command.get_objects_for_model('askbot.post'))
+            self.assertTrue(all(post.thread_id in (1, 2, 3) for post in posts))
+            self.assertEqual(list(command.get_objects_for_model('askbot.award')), [])
+
+            command.log_old_id('askbot.post', 7, 70)
+            self.assertEqual(command.get_imported_object_id_by_old_id(models.Post, 7), 70)
+        finally:
+            command.finish_run()
+        self.assertEqual(models.ImportedObjectInfo.objects.filter(run=command.run).count(), 1)
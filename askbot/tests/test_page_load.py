@@ -6,7 +6,9 @@ from django.core import management
 from django.core.cache.backends.dummy import DummyCache
 from django.core import cache
 import json
+from unittest.mock import patch
 from django.utils.translation import activate as activate_language
+from django.utils import translation
 
 from bs4 import BeautifulSoup
 
@@ -191,6 +193,18 @@ class PageLoadTestCase(AskbotTestCase):
         response_data = json.loads(response.content)
         self.assertEqual(len(response_data), 1)
 
+    @with_settings(GROUPS_ENABLED=False)
+    def test_title_search_as_you_type(self):
+        user = self.create_user('zanzibar_user')
+        question = self.post_question(user=user, title='zanzibar travel guide')
+        self.post_answer(user=user, question=question)
+        query_data = {'query_text': 'zanzibar trav'}
+        response = self.client.get(reverse('api_get_questions'), query_data)
+        response_data = json.loads(response.content)
+        self.assertEqual(len(response_data), 1)
+        self.assertEqual(response_data[0]['answer_count'], 1)
+        self.assertEqual(response_data[0]['url'], question.get_absolute_url())
+
     def test_ask_page_disallowed_anonymous(self):
         self.proto_test_ask_page(False, 302)
 
@@ -587,6 +601,97 @@ class QuestionViewTests(AskbotTestCase):
         self.assertTrue(text in meta_descr.attrs['content'])
 
 
+class ModerationQueueTests(AskbotTestCase):
+    def test_queue_is_paginated(self):
+        moderator = self.create_user('moderator', status='m')
+        author = self.create_user('author')
+        flagger = self.create_user('flagger')
+        questions = [self.post_question(user=author) for _ in range(3)]
+        for question in questions:
+            flagger.flag_post(question, force=True)
+
+        self.client.login(method='force', user_id=moderator.id)
+        with patch('askbot.const.MODERATION_QUEUE_PAGE_SIZE', 2):
+            response = self.client.get(reverse('moderation_queue'))
+            self.assertEqual(len(response.context['queue']), 2)
+            cursor = response.context['next_cursor']
+            self.assertTrue(cursor)
+
+            response = self.client.get(
+                                reverse('moderation_queue'),
+                                {'before': cursor}
+                            )
+            queue = response.context['queue']
+            self.assertEqual(len(queue), 1)
+            self.assertEqual(queue[0]['question_id'], questions[0].id)
+            self.assertEqual(response.context['next_cursor'], None)
+
+    def test_rendered_content_is_cached_per_language(self):
+        from askbot.views.moderation import get_rendered_content
+        author = self.create_user('author')
+        question = self.post_question(user=author, body_text='word ' * 100)
+        with translation.override('en'):
+            english = get_rendered_content([question])[0]['snippet']
+        with translation.override('de'):
+            german = get_rendered_content([question])[0]['snippet']
+        self.assertIn('(more)', english)
+        self.assertNotIn('(more)', german)
+
+
+class SitemapTests(AskbotTestCase):
+    def test_sitemap_is_split_into_sections(self):
+        author = self.create_user('author')
+        question1 = self.post_question(user=author, title='first question')
+        question2 = self.post_question(user=author, title='second question')
+        with patch('askbot.const.SITEMAP_SECTION_SIZE', 1):
+            response = self.client.get(reverse('sitemap'))
+            self.assertEqual(response.status_code, 200)
+            content = response.content.decode('utf-8')
+            for question in (question1, question2):
+                url = reverse('sitemap_section', kwargs={'section': question.thread_id})
+                self.assertIn(url, content)
+
+            url = reverse('sitemap_section', kwargs={'section': question1.thread_id})
+            response = self.client.get(url)
+            content = response.content.decode('utf-8')
+            self.assertIn(question1.get_absolute_url(), content)
+            self.assertNotIn(question2.get_absolute_url(), content)
+            self.assertTrue(response.has_header('Last-Modified'))
+
+            #thread changes are reflected in the section
+            thread = question1.thread
+            thread.title = 'renamed question'
+            thread.save()
+            question1 = self.reload_object(question1)
+            response = self.client.get(url)
+            self.assertIn(question1.get_absolute_url(), response.content.decode('utf-8'))
+
+
+class FeedTests(AskbotTestCase):
+    @with_settings(RSS_ENABLED=True)
+    def test_feed_answers_conditional_requests(self):
+        author = self.create_user('author')
+        self.post_question(user=author, title='first question')
+        url = reverse('latest_questions_feed')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertTrue(etag)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        #tags select a different feed
+        response = self.client.get(url, {'tags': 'one'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        #new posts change the feed
+        self.post_question(user=author, title='second question')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('second question', response.content.decode('utf-8'))
+
+
 class QuestionPageRedirectTests(AskbotTestCase):
 
     def setUp(self):
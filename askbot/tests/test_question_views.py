@@ -1,8 +1,9 @@
+from django.conf import settings as django_settings
 from bs4 import BeautifulSoup
 from django.test import override_settings as override_django_settings
 from askbot.conf import settings as askbot_settings
 from askbot import const
-from askbot.tests.utils import AskbotTestCase
+from askbot.tests.utils import AskbotTestCase, with_settings
 from askbot import models
 from django.urls import reverse
 
@@ -222,3 +223,56 @@ class PrivateAnswerViewsTests(AskbotTestCase):
         self.client.logout()
         response = self.client.get(self.question.get_absolute_url())
         self.assertFalse(b'edited answer text' in response.content)
+
+
+#the default locmem cache culls the view times among the livesettings entries
+@override_django_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'anonymous-question-views',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+})
+class AnonymousQuestionViewTests(AskbotTestCase):
+
+    def setUp(self):
+        self.user = self.create_user('user')
+        self.question = self.post_question(user=self.user)
+        self.headers = {
+            'HTTP_ACCEPT_LANGUAGE': 'en',
+            'HTTP_USER_AGENT': 'Mozilla/5.0 (X11; Linux x86_64) Gecko/20100101 Firefox/100.0',
+        }
+
+    def count_messages(self, response):
+        return response.content.decode('utf-8').count('class="js-system-message"')
+
+    def test_question_view_does_not_create_session(self):
+        from django.contrib.sessions.models import Session
+        url = self.question.get_absolute_url()
+        response = self.client.get(url, **self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.client.get(url, **self.headers)
+        self.assertFalse(Session.objects.exists())
+        self.assertFalse(django_settings.SESSION_COOKIE_NAME in response.cookies)
+        thread = models.Thread.objects.get(id=self.question.thread_id)
+        self.assertEqual(thread.view_count, 1)
+
+    @with_settings(ENABLE_GREETING_FOR_ANON_USER=True)
+    def test_greeting_is_shown_once(self):
+        from askbot.middleware.anon_user import GREETING_COOKIE_NAME
+        url = self.question.get_absolute_url()
+        response = self.client.get(url, **self.headers)
+        self.assertTrue(GREETING_COOKIE_NAME in response.cookies)
+        self.assertEqual(self.count_messages(response), 1)
+        response = self.client.get(url, **self.headers)
+        self.assertEqual(self.count_messages(response), 0)
+
+    @with_settings(ENABLE_GREETING_FOR_ANON_USER=False)
+    def test_messages_are_kept_in_cookie(self):
+        from askbot.user_messages import MESSAGES_COOKIE_NAME
+        url = self.question.get_absolute_url()
+        response = self.client.get(url, {'cancel': 1, 'next': url}, **self.headers)
+        self.assertTrue(MESSAGES_COOKIE_NAME in response.cookies)
+        response = self.client.get(url, **self.headers)
+        self.assertEqual(self.count_messages(response), 1)
+        self.assertEqual(response.cookies[MESSAGES_COOKIE_NAME].value, '')
@@ -1,7 +1,10 @@
 import os
 import shutil
 import tempfile
-from django.test import TestCase
+from io import StringIO
+from django.core.management import call_command
+from django.template import engines
+from django.test import TestCase, override_settings
 from django.conf import settings as django_settings
 from django.core.files.uploadedfile import UploadedFile
 from askbot.conf import settings as askbot_settings
@@ -67,3 +70,37 @@ class SkinTests(TestCase):
         self.assertTrue(logo_url.startswith(django_settings.MEDIA_URL))
         response = self.client.get(logo_url, follow=True)
         self.assertTrue(response.status_code == 200)
+
+
+class BytecodeCacheTests(TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_bytecode_cache_depends_on_extensions(self):
+        from jinja2 import FileSystemBytecodeCache
+        from askbot.skins.jinja2_environment import get_bytecode_cache
+        with override_settings(ASKBOT_JINJA2_BYTECODE_CACHE_DIR=self.cache_dir):
+            cache = get_bytecode_cache(['jinja2.ext.i18n'])
+            other_cache = get_bytecode_cache(['jinja2.ext.i18n', 'jinja2.ext.do'])
+        self.assertTrue(isinstance(cache, FileSystemBytecodeCache))
+        self.assertNotEqual(cache.pattern, other_cache.pattern)
+
+    def test_compile_templates_command(self):
+        from jinja2 import FileSystemBytecodeCache
+        from askbot.skins.askbot_environments import SkinEnvironment
+        engines.all()
+        envs = list(SkinEnvironment.siblings.values())
+        backups = [env.bytecode_cache for env in envs]
+        try:
+            for env in envs:
+                env.bytecode_cache = FileSystemBytecodeCache(self.cache_dir)
+                env.cache.clear() #templates already loaded are not compiled again
+            call_command('askbot_compile_templates', stdout=StringIO())
+        finally:
+            for env, backup in zip(envs, backups):
+                env.bytecode_cache = backup
+        self.assertTrue(len(os.listdir(self.cache_dir)) > 100)
@@ -0,0 +1,55 @@
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase
+from jinja2 import DictLoader, Environment
+from askbot.middleware.spaceless import SpacelessMiddleware, reduce_spaces_in_stream
+from askbot.templatetags.spaceless import SpacelessExtension
+
+TEMPLATE = """<div>
+  <p>{{ text }}</p>
+  {% if True %}
+    <b>bold</b>
+  {% endif %}
+</div>  text  <i>x</i>"""
+
+class SpacelessExtensionTests(TestCase):
+
+    def setUp(self):
+        loader = DictLoader({'page.html': TEMPLATE, 'email.txt': TEMPLATE})
+        self.env = Environment(loader=loader, extensions=[SpacelessExtension])
+
+    def test_spaces_between_tags_are_reduced(self):
+        html = self.env.get_template('page.html').render(text='  a  ')
+        self.assertEqual(html, '<div> <p>  a  </p>  <b>bold</b>  </div>  text  <i>x</i>')
+
+    def test_text_templates_are_not_changed(self):
+        text = self.env.get_template('email.txt').render(text='a')
+        self.assertEqual(text, self.env.from_string(TEMPLATE).render(text='a'))
+
+
+class SpacelessMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+        self.middleware = SpacelessMiddleware(lambda request: None)
+
+    def test_stream_is_reduced_across_chunks(self):
+        chunks = [b'<div>\n', b'  \n', b'  <p>a</p>  ', b'b  <i>', b'</i>\n']
+        result = b''.join(reduce_spaces_in_stream(chunks))
+        self.assertEqual(result, b'<div> <p>a</p>  b  <i></i>\n')
+
+    def test_streaming_response(self):
+        response = StreamingHttpResponse(iter([b'<p>a</p>\n', b'\n<p>b</p>']))
+        response = self.middleware.process_response(self.request, response)
+        self.assertEqual(b''.join(response.streaming_content), b'<p>a</p> <p>b</p>')
+
+    def test_response_rendered_from_templates_is_skipped(self):
+        self.request.askbot_spaceless = True
+        response = HttpResponse('<p>a</p>\n<p>b</p>')
+        response = self.middleware.process_response(self.request, response)
+        self.assertEqual(response.content, b'<p>a</p>\n<p>b</p>')
+
+    def test_other_responses_are_reduced(self):
+        response = HttpResponse('<p>a</p>\n<p>b</p>')
+        response = self.middleware.process_response(self.request, response)
+        self.assertEqual(response.content, b'<p>a</p> <p>b</p>')
+        self.assertEqual(response['Content-Length'], '17')
@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+from unittest.mock import patch
+from django.core.management import call_command
+from django.test import override_settings
+from askbot import const
+from askbot.models import Activity
+from askbot.spam_checker import bayes_spam_checker
+from askbot.tests.utils import AskbotTestCase, with_settings
+
+SPAM = [
+    'buy cheap pills online, best price pills',
+    'cheap watches online, buy now best price',
+    'win money now, click the link for cheap loans',
+]
+HAM = [
+    'how do I configure the email alerts in askbot',
+    'the search does not find questions with tags',
+    'what is the best way to upgrade django in askbot',
+]
+
+class BayesSpamCheckerTests(AskbotTestCase):
+
+    def setUp(self):
+        fd, self.model_file_name = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        model = bayes_spam_checker.train(SPAM, HAM)
+        bayes_spam_checker.save_model(model, self.model_file_name)
+
+    def tearDown(self):
+        os.remove(self.model_file_name)
+
+    def test_classifies_texts(self):
+        with override_settings(ASKBOT_SPAM_CHECKER_MODEL_FILE=self.model_file_name):
+            self.assertTrue(bayes_spam_checker.is_spam('buy cheap pills now'))
+            self.assertFalse(bayes_spam_checker.is_spam('upgrade askbot email alerts'))
+
+    def test_missing_model_is_not_spam(self):
+        with override_settings(ASKBOT_SPAM_CHECKER_MODEL_FILE='/no/such/model.json'):
+            self.assertFalse(bayes_spam_checker.is_spam('buy cheap pills now'))
+
+    def test_train_command(self):
+        fd, input_file_name = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w') as input_file:
+            json.dump({'spam': SPAM, 'ham': HAM}, input_file)
+        call_command('askbot_train_spam_classifier',
+                     input_file_name=input_file_name,
+                     output_file_name=self.model_file_name,
+                     stdout=open(os.devnull, 'w'))
+        os.remove(input_file_name)
+        model = bayes_spam_checker.load_model(self.model_file_name)
+        self.assertEqual(model['spam_texts'], 3)
+        self.assertEqual(model['ham_tokens']['askbot'], 2)
+
+
+@override_settings(ASKBOT_SPAM_CHECKER_ASYNC=True)
+class AsyncSpamCheckTests(AskbotTestCase):
+
+    def setUp(self):
+        self.admin = self.create_user('admin') #first user is the administrator
+        self.user = self.create_user()
+        self.question = self.post_question(user=self.user)
+
+    def post_checked_answer(self, is_spam):
+        with patch('askbot.spam_checker.is_spam', return_value=is_spam) as checker:
+            with self.captureOnCommitCallbacks(execute=True):
+                answer = self.post_answer(user=self.user, question=self.question)
+        self.assertEqual(checker.call_count, 1)
+        answer.refresh_from_db()
+        self.question.thread.refresh_from_db()
+        return answer
+
+    @with_settings(SPAM_FILTER_ENABLED=True)
+    def test_ham_is_published(self):
+        answer = self.post_checked_answer(is_spam=False)
+        self.assertTrue(answer.approved)
+        self.assertEqual(answer.revisions.get().revision, 1)
+        self.assertEqual(self.question.thread.answer_count, 1)
+
+    @with_settings(SPAM_FILTER_ENABLED=True)
+    def test_spam_goes_to_moderation_queue(self):
+        answer = self.post_checked_answer(is_spam=True)
+        self.assertFalse(answer.approved)
+        self.assertEqual(self.question.thread.answer_count, 0)
+        revision = answer.revisions.get()
+        self.assertEqual(revision.revision, 0)
+        activity = Activity.objects.get(object_id=revision.id)
+        self.assertEqual(activity.activity_type, const.TYPE_ACTIVITY_MODERATED_NEW_POST)
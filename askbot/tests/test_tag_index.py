@@ -0,0 +1,60 @@
+import json
+from django.core.cache import cache
+from django.test.client import Client
+from django.urls import reverse
+from askbot.models.tag_index import TagPrefixIndex
+from askbot.tests.utils import AskbotTestCase
+
+
+class TagPrefixIndexTests(AskbotTestCase):
+
+    def setUp(self):
+        self.index = TagPrefixIndex([
+            ('python', 10), ('Pyramid', 30), ('perl', 5),
+            ('pytest', 10), ('java', 100)
+        ])
+
+    def test_complete_ranks_by_used_count(self):
+        self.assertEqual(self.index.complete('p'), ['Pyramid', 'pytest', 'python', 'perl'])
+        self.assertEqual(self.index.complete('py', 2), ['Pyramid', 'pytest'])
+        self.assertEqual(self.index.complete('PYT'), ['pytest', 'python'])
+        self.assertEqual(self.index.complete('x'), [])
+        self.assertEqual(self.index.complete(''), [])
+
+    def test_count(self):
+        self.assertEqual(self.index.count('py'), 3)
+        self.assertEqual(self.index.count('pyth'), 1)
+        self.assertEqual(self.index.count('q'), 0)
+
+
+class TagListViewTests(AskbotTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = self.create_user()
+        self.post_question(user=self.user, tags='python pytest perl')
+        self.client = Client()
+
+    def test_prefix_completions(self):
+        response = self.client.get(reverse('get_tag_list'), {'q': 'py', 'limit': 10})
+        self.assertEqual(response.status_code, 200)
+        names = response.content.decode('utf-8').split('\n')
+        self.assertEqual(set(names), {'python', 'pytest'})
+
+    def test_etag(self):
+        response = self.client.get(reverse('get_tag_list'))
+        etag = response['ETag']
+        response = self.client.get(reverse('get_tag_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.post_question(user=self.user, tags='java')
+        response = self.client.get(reverse('get_tag_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue('java' in response.content.decode('utf-8').split('\n'))
+
+    def test_wildcard_preview(self):
+        self.post_question(user=self.user, tags='python pyramid')
+        response = self.client.get(reverse('get_tags_by_wildcard'), {'wildcard': 'py*'})
+        data = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(data['tag_count'], 3)
+        self.assertEqual(data['tag_names'], ['python', 'pyramid', 'pytest'])
@@ -1,11 +1,15 @@
+from unittest.mock import patch
 from askbot.tests.utils import AskbotTestCase, with_settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from askbot import const
 from askbot import models
 from askbot.conf import settings
 from askbot import signals
 from askbot.models.tag import format_personal_group_name
 from askbot.models.user import get_invited_moderators
 from askbot.models.role import ADMIN_ROLES
+from askbot.models.user_profile import UserProfile
 
 INVITED_MODS = """one@example.com One User
 broken user without email
@@ -93,6 +97,47 @@ class UserModelTests(AskbotTestCase):
         user.delete()
         self.assertRaises(User.DoesNotExist, User.objects.get, username='user')
 
+    def test_user_stats_follow_votes_and_posts(self):
+        author = self.create_user('author')
+        voter = self.create_user('voter')
+        question = self.post_question(user=author)
+        stats = models.UserStats.objects.get_for_user(author)
+        self.assertEqual(stats.question_count, 1)
+        stats = models.UserStats.objects.get_for_user(voter)
+        self.assertEqual(stats.up_votes, 0)
+        voter.upvote(question)
+        stats = models.UserStats.objects.get_for_user(voter)
+        self.assertEqual(stats.up_votes, 1)
+        voter.upvote(question, cancel=True)
+        stats = models.UserStats.objects.get_for_user(voter)
+        self.assertEqual(stats.up_votes, 0)
+
+    def test_user_stats_follow_reversed_and_resaved_votes(self):
+        author = self.create_user('author')
+        voter = self.create_user('voter')
+        question = self.post_question(user=author)
+        voter.upvote(question)
+        voter.downvote(question)
+        stats = models.UserStats.objects.get_for_user(voter)
+        self.assertEqual((stats.up_votes, stats.down_votes), (0, 1))
+        models.Vote.objects.get(user=voter).save()
+        stats = models.UserStats.objects.get_for_user(voter)
+        self.assertEqual((stats.up_votes, stats.down_votes), (0, 1))
+
+    def test_user_stats_count_unapproved_questions_like_profile(self):
+        author = self.create_user('author')
+        question = self.post_question(user=author)
+        models.Post.objects.filter(id=question.id).update(approved=False)
+        models.UserStats.objects.mark_stale([author.id])
+        stats = models.UserStats.objects.get_for_user(author)
+        self.assertEqual(stats.question_count, 1)
+
+        @with_settings(CONTENT_MODERATION_MODE='premoderation')
+        def get_question_count():
+            return models.UserStats.objects.get_for_user(author).question_count
+
+        self.assertEqual(get_question_count(), 0)
+
     def test_rename_user(self):
         user = self.create_user('user')
         user.username = 'user2'
@@ -123,3 +168,126 @@ class UserModelTests(AskbotTestCase):
         roles = set(user.askbot_roles.all().values_list('role', flat=True))
         self.assertEqual(roles, ADMIN_ROLES)
         self.assertEqual(user.is_superuser, True)
+
+
+class DeleteAllContentTests(AskbotTestCase):
+    """tests for ``user.delete_all_content_authored_by_user``"""
+
+    def setUp(self):
+        self.moderator = self.create_user('moderator', status='d')
+        self.spammer = self.create_user('spammer')
+        self.other = self.create_user('other')
+        self.spam_question = self.post_question(user=self.spammer, tags='spamtag')
+        self.post_answer(user=self.other, question=self.spam_question)
+        self.question = self.post_question(user=self.other, tags='goodtag')
+        self.spam_answer = self.post_answer(user=self.spammer, question=self.question)
+        self.post_comment(user=self.spammer, parent_post=self.question)
+
+    def assert_content_deleted(self):
+        spam_thread = models.Thread.objects.get(id=self.spam_question.thread_id)
+        self.assertTrue(spam_thread.deleted)
+        spam_answer = models.Post.objects.get(id=self.spam_answer.id)
+        self.assertTrue(spam_answer.deleted)
+        self.assertEqual(spam_answer.deleted_by, self.moderator)
+        self.assertTrue(spam_answer.marked_as_spam)
+        self.assertEqual(models.Post.objects.get_comments().filter(author=self.spammer).count(), 0)
+
+        question = models.Post.objects.get(id=self.question.id)
+        self.assertFalse(question.deleted)
+        self.assertEqual(question.comment_count, 0)
+        self.assertEqual(question.thread.answer_count, 0)
+        self.assertEqual(question.thread.last_activity_by, self.other)
+
+        spam_tag = models.Tag.objects.get(name='spamtag')
+        self.assertEqual(spam_tag.used_count, 0)
+        self.assertTrue(spam_tag.deleted)
+        good_tag = models.Tag.objects.get(name='goodtag')
+        self.assertEqual(good_tag.used_count, 1)
+        self.assertFalse(good_tag.deleted)
+
+        activities = models.Activity.objects.filter(user=self.moderator)
+        activity_types = set(activities.values_list('activity_type', flat=True))
+        self.assertEqual(activity_types, set([const.TYPE_ACTIVITY_DELETE_QUESTION,
+                                              const.TYPE_ACTIVITY_DELETE_ANSWER]))
+
+    def test_delete_all_content(self):
+        self.assertEqual(self.question.thread.last_activity_by, self.spammer)
+        count, is_deferred = self.moderator.delete_all_content_authored_by_user(
+                                                    self.spammer, mark_as_spam=True)
+        self.assertEqual((count, is_deferred), (3, False))
+        self.assert_content_deleted()
+
+    def test_delete_all_content_in_batches(self):
+        with patch.object(const, 'USER_CONTENT_DELETION_BATCH_SIZE', 1):
+            count, is_deferred = self.moderator.delete_all_content_authored_by_user(
+                                                    self.spammer, mark_as_spam=True)
+        self.assertEqual((count, is_deferred), (3, False))
+        self.assert_content_deleted()
+        progress_key = const.USER_CONTENT_DELETION_PROGRESS_CACHE_KEY % self.spammer.id
+        self.assertEqual(cache.get(progress_key), None)
+
+    def test_delete_all_content_by_celery(self):
+        with patch.object(const, 'MAX_POSTS_TO_DELETE_INLINE', 1):
+            with self.settings(CELERY_TASK_ALWAYS_EAGER=False):
+                result = self.moderator.delete_all_content_authored_by_user(self.spammer)
+            self.assertEqual(result, (3, True))
+            self.assertFalse(models.Post.objects.get(id=self.spam_answer.id).deleted)
+
+            #eager celery deletes the posts right away
+            result = self.moderator.delete_all_content_authored_by_user(self.spammer)
+            self.assertEqual(result, (3, False))
+            self.assertTrue(models.Post.objects.get(id=self.spam_answer.id).deleted)
+
+
+class AvatarUrlsTests(AskbotTestCase):
+    """tests for the avatar urls saved in the UserProfile"""
+
+    def setUp(self):
+        self.user = self.create_user('user', email='user@example.com')
+
+    def get_saved_avatar_urls(self):
+        return UserProfile.objects.get(pk=self.user.pk).avatar_urls
+
+    def test_avatar_urls_are_saved(self):
+        avatar_urls = self.get_saved_avatar_urls()
+        self.assertEqual(set(avatar_urls), set(['version', '16', '32', '48', '128']))
+        self.assertEqual(avatar_urls['32'], self.user.calculate_avatar_url(32))
+
+    def test_avatar_url_is_not_calculated(self):
+        user = User.objects.select_related('askbot_profile').get(pk=self.user.pk)
+        user.get_avatar_url(48) # livesettings are read once
+        with patch.object(User, 'calculate_avatar_url') as calculate_avatar_url:
+            with self.assertNumQueries(0):
+                url = user.get_avatar_url(32)
+        calculate_avatar_url.assert_not_called()
+        self.assertEqual(url, self.get_saved_avatar_urls()['32'])
+
+    def test_missing_avatar_url_is_saved(self):
+        url = self.user.get_avatar_url(20)
+        self.assertEqual(self.get_saved_avatar_urls()['20'], url)
+
+    @with_settings(ENABLE_GRAVATAR=True)
+    def test_email_change_updates_avatar_urls(self):
+        self.user.avatar_type = 'g'
+        self.user.clear_avatar_urls()
+        self.user.save()
+        old_url = self.get_saved_avatar_urls()['32']
+        self.user.email = 'other@example.com'
+        self.user.save()
+        new_url = self.get_saved_avatar_urls()['32']
+        self.assertNotEqual(new_url, old_url)
+        self.assertIn(self.user.gravatar, new_url)
+
+    @with_settings(ENABLE_GRAVATAR=True, GRAVATAR_TYPE='identicon')
+    def test_avatar_settings_change_updates_avatar_urls(self):
+        self.user.avatar_type = 'g'
+        self.user.clear_avatar_urls()
+        self.user.save()
+        self.assertIn('d=identicon', self.get_saved_avatar_urls()['32'])
+
+        @with_settings(GRAVATAR_TYPE='retro')
+        def get_avatar_url():
+            return User.objects.get(pk=self.user.pk).get_avatar_url(32)
+
+        self.assertIn('d=retro', get_avatar_url())
+        self.assertIn('d=retro', self.get_saved_avatar_urls()['16'])
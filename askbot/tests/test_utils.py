@@ -1,5 +1,6 @@
 import os
 import markdown2
+from unittest.mock import patch
 from django.conf import settings as django_settings
 from django.test import TestCase
 from askbot.tests.utils import with_settings
@@ -158,3 +159,69 @@ class SanitizeHtml(TestCase):
         html = '<button onClick="javascript:alert(\'foobar\')">click me</button>'
         new_html = sanitize_html(html)
         self.assertEqual(new_html, 'click me')
+
+
+class SanitizeAndUrlizeHtmlTests(TestCase):
+    corpus = (
+        '<p>text <a href="http://example.com/" title="a &amp; b">link</a> text</p>\n',
+        '<p>see http://example.com/?a=1&amp;b=2, www.example.org and me@example.com.</p>\n',
+        '<p>(Something like http://foo.com/blah_(wikipedia))</p>',
+        '<pre><code>http://example.com</code></pre>\n<p><code>www.example.com</code></p>',
+        '<p>AT&amp;T &copy; &#169; &nbsp;https://example.com/a/very/long/path/to/be/trimmed.html</p>',
+        '<p onclick="x()" class="c"><img src="/upfiles/a.png" alt="x &amp; y"> <b>bold</b></p>',
+        '<script>alert("http://evil.com")</script><iframe src="x"></iframe><table><tr><td>x.org</td></tr></table>',
+        '<!-- comment --> \n<ul>\n<li>one.com</li>\n<li><em>two</em> three</li>\n</ul>\n',
+    )
+
+    def test_same_as_sanitize_and_urlize_html(self):
+        for html in self.corpus:
+            expected = html_utils.sanitize_html(
+                html_utils.urlize_html(html_utils.sanitize_html(html))
+            )
+            self.assertEqual(html_utils.sanitize_and_urlize_html(html), expected)
+
+    def test_whitespace_before_link_is_kept(self):
+        html = '<p><b>see</b> http://example.com</p>'
+        self.assertEqual(
+            html_utils.sanitize_and_urlize_html(html),
+            '<p><b>see</b> <a href="http://example.com">http://example.com</a></p>'
+        )
+
+    def test_escaped_markup_stays_escaped(self):
+        html = '<p>&lt;b&gt; http://example.com</p>'
+        self.assertEqual(
+            html_utils.sanitize_and_urlize_html(html),
+            '<p>&lt;b&gt; <a href="http://example.com">http://example.com</a></p>'
+        )
+
+    def test_no_links_when_links_are_not_allowed(self):
+        html = '<p>see http://example.com</p>'
+        tags = [tag for tag in django_settings.ASKBOT_ALLOWED_HTML_ELEMENTS if tag != 'a']
+        with self.settings(ASKBOT_ALLOWED_HTML_ELEMENTS=tags):
+            self.assertEqual(html_utils.sanitize_and_urlize_html(html), html)
+        self.assertEqual(
+            html_utils.sanitize_and_urlize_html(html),
+            '<p>see <a href="http://example.com">http://example.com</a></p>'
+        )
+
+
+class HtmlDiffTests(TestCase):
+    def test_html2list_keeps_all_text(self):
+        from askbot.utils.diff import html2list
+        html = '<p>hello  world</p>\n<pre>x = 1\n</pre><unclosed'
+        tokens = html2list(html)
+        self.assertEqual(''.join(tokens), html)
+        self.assertEqual(tokens[:3], ['<p>', 'hello ', ' '])
+
+    def test_text_diff(self):
+        from askbot.utils.diff import textDiff
+        diff = textDiff('<p>the quick brown fox</p>', '<p>the slow brown fox</p>')
+        self.assertEqual(diff, '<p>the <del>quick </del><ins>slow </ins>brown fox</p>')
+
+    def test_text_diff_of_long_texts_uses_prefix_and_suffix(self):
+        from askbot.utils import diff
+        old_text = '<p>one two three four</p>'
+        new_text = '<p>one five four</p>'
+        with patch.object(diff, 'DIFF_MAX_TOKENS', 5):
+            result = diff.textDiff(old_text, new_text)
+        self.assertEqual(result, '<p>one <del>two three </del><ins>five </ins>four</p>')
@@ -103,7 +103,18 @@ def create_user(username=None,
     return user
 
 
-class AskbotTestCase(TestCase):
+class ClearCacheMixin(object):
+    """clears the cache before each test, for the
+    test cases based on `TestCase` or `TransactionTestCase`"""
+
+    def _fixture_setup(self):
+        #cached rows must not outlive the rolled back
+        #or flushed test data
+        cache.clear()
+        super(ClearCacheMixin, self)._fixture_setup()
+
+
+class AskbotTestCase(ClearCacheMixin, TestCase):
     """adds some askbot-specific methods
     to django TestCase class
     """
@@ -5,13 +5,12 @@ import os.path
 from django.conf import settings
 from django.contrib import admin
 from django.urls import re_path, include
-from django.contrib.sitemaps import views as SitemapViews
 from django.views import static as StaticViews
 from django.views import i18n as I18nViews
 
 from askbot import views
 from askbot.feed import RssLastestQuestionsFeed, RssIndividualQuestionFeed
-from askbot.sitemap import QuestionsSitemap
+from askbot import sitemap
 from askbot.utils.url_utils import service_url
 import askbot.deps.django_authopenid.urls
 
@@ -26,9 +25,6 @@ feeds = {
     'rss': RssLastestQuestionsFeed,
     'question': RssIndividualQuestionFeed
 }
-sitemaps = {
-    'questions': QuestionsSitemap
-}
 
 MAIN_PAGE_BASE_URL = settings.ASKBOT_MAIN_PAGE_BASE_URL
 QUESTION_PAGE_BASE_URL = settings.ASKBOT_QUESTION_PAGE_BASE_URL
@@ -156,11 +152,11 @@ urlpatterns = [
         views.meta.badge_page,
         name='badge'
     ),
+    re_path(r'^sitemap.xml$', sitemap.sitemap_index, name='sitemap'),
     re_path(
-        r'^sitemap.xml$',
-        SitemapViews.sitemap,
-        {'sitemaps': sitemaps},
-        name='sitemap'
+        r'^sitemap-questions-(?P<section>\d+)\.xml$',
+        sitemap.sitemap_section,
+        name='sitemap_section'
     ),
     # feeds
     re_path(r'^feeds/rss/$', RssLastestQuestionsFeed(), name="latest_questions_feed"),
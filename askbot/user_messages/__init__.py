@@ -1,35 +1,88 @@
 """
-Lightweight session-based messaging system.
+Lightweight messaging system for the anonymous users.
+
+Messages are kept in a signed cookie, so that
+anonymous visitors do not need a session.
+The cookie is written by the
+:class:`~askbot.middleware.anon_user.ConnectToSessionMessagesMiddleware`.
 
 Time-stamp: <2009-03-10 19:22:29 carljm __init__.py>
 
 """
+import json
+from django.core import signing
+
 VERSION = (0, 1, 'pre')
 
-def create_message (request, message):
+MESSAGES_COOKIE_NAME = 'askbot_messages'
+MESSAGES_COOKIE_SALT = 'askbot.user_messages'
+
+def get_messages(request):
     """
-    Create a message in the current session.
+    Returns list of messages of the current request,
+    loaded from the cookie on the first use.
 
     """
-    assert hasattr(request, 'session'), "django-session-messages requires session middleware to be installed. Edit your MIDDLEWARE setting to insert 'django.contrib.sessions.middleware.SessionMiddleware'."
+    if not hasattr(request, '_askbot_messages'):
+        try:
+            value = request.get_signed_cookie(MESSAGES_COOKIE_NAME,
+                                              salt=MESSAGES_COOKIE_SALT)
+            messages = json.loads(value)
+        except (KeyError, signing.BadSignature, ValueError):
+            messages = []
+        request._askbot_messages = messages
+        request._askbot_messages_changed = False
+    return request._askbot_messages
 
-    try:
-        request.session['messages'].append(message)
-    except KeyError:
-        request.session['messages'] = [message]
+def create_message (request, message):
+    """
+    Create a message for the current visitor.
+
+    """
+    get_messages(request).append(str(message))
+    request._askbot_messages_changed = True
 
 def get_and_delete_messages (request, include_auth=False):
     """
-    Get and delete all messages for current session.
+    Get and delete all messages for current visitor.
 
     Optionally also fetches user messages from django.contrib.auth.
 
     """
-    assert hasattr(request, 'session'), "django-session-messages requires session middleware to be installed. Edit your MIDDLEWARE setting to insert 'django.contrib.sessions.middleware.SessionMiddleware'."
-
-    messages = request.session.pop('messages', [])
+    messages = list(get_messages(request))
+    if messages:
+        request._askbot_messages = []
+        request._askbot_messages_changed = True
 
     if include_auth and request.user.is_authenticated:
         messages.extend(request.user.get_and_delete_messages())
 
     return messages
+
+def has_messages(request):
+    """
+    True if the visitor has messages to be shown
+    or the messages were created or shown during the request,
+    i.e. the page is not the same for all visitors.
+
+    """
+    return bool(get_messages(request)) \
+        or getattr(request, '_askbot_messages_changed', False)
+
+def save_messages(request, response):
+    """
+    Stores the messages which were not shown yet
+    in the cookie of the response.
+
+    """
+    if not getattr(request, '_askbot_messages_changed', False):
+        return
+    messages = request._askbot_messages
+    if messages:
+        response.set_signed_cookie(MESSAGES_COOKIE_NAME,
+                                   json.dumps(messages),
+                                   salt=MESSAGES_COOKIE_SALT,
+                                   httponly=True,
+                                   samesite='Lax')
+    elif MESSAGES_COOKIE_NAME in request.COOKIES:
+        response.delete_cookie(MESSAGES_COOKIE_NAME, samesite='Lax')
@@ -1,12 +1,31 @@
 """HTML Diff: http://www.aaronsw.com/2002/diff
-Rough code, badly documented. Send me comments and patches."""
+Rough code, badly documented. Send me comments and patches.
+
+The html is split into tags and words (with the trailing whitespace)
+by a compiled regular expression. Token sequences are compared with
+the patience diff: tokens unique in both sequences are used as anchors
+and the regions between the anchors are compared recursively, small
+regions without unique tokens - with difflib. Common prefix and
+suffix are trimmed first at every level. Inputs longer than
+`DIFF_MAX_TOKENS` are compared only by the common prefix and suffix,
+the rest is shown as a single replacement.
+"""
 
 
 __author__ = 'Aaron Swartz <me@aaronsw.com>'
 __copyright__ = '(C) 2003 Aaron Swartz. GNU GPL 2.'
 __version__ = '0.22'
 
-import difflib, string
+import difflib
+import re
+from bisect import bisect_left
+
+#a tag (possibly unterminated), a word with one trailing space or a space
+TOKEN_RE = re.compile(r'<[^>]*>?|[^\s<]+\s?|\s')
+#inputs with more tokens in total are compared by prefix and suffix only
+DIFF_MAX_TOKENS = 50000
+#regions without unique tokens are compared with difflib up to this size
+SMALL_REGION_SIZE = 10000 #product of the region lengths
 
 def isTag(x): return x[0] == "<" and x[-1] == ">"
 
@@ -15,11 +34,18 @@ def textDiff(a, b,
             del_start='<del>', del_end='</del>'
         ):
     """Takes in strings a and b and returns a human-readable HTML diff."""
+    ins_start = ins_start or '<ins>'
+    ins_end = ins_end or '</ins>'
+    del_start = del_start or '<del>'
+    del_end = del_end or '</del>'
 
     out = []
     a, b = html2list(a), html2list(b)
-    s = difflib.SequenceMatcher(None, a, b)
-    for e in s.get_opcodes():
+    if len(a) + len(b) > DIFF_MAX_TOKENS:
+        opcodes = get_trimmed_opcodes(a, b)
+    else:
+        opcodes = get_opcodes(a, b)
+    for e in opcodes:
         if e[0] == "replace":
             # @@ need to do something more complicated here
             # call textDiff but not for html, but for some html... ugh
@@ -34,39 +60,143 @@ def textDiff(a, b,
         elif e[0] == "equal":
             out.append(''.join(b[e[3]:e[4]]))
         else:
-            raise "Um, something's broken. I didn't expect a '" + repr(e[0]) + "'."
+            raise ValueError("Um, something's broken. I didn't expect a '" + repr(e[0]) + "'.")
     return ''.join(out)
 
 def html2list(x, b=0):
-    mode = 'char'
-    cur = ''
-    out = []
-    for c in x:
-        if mode == 'tag':
-            if c == '>':
-                if b:
-                    cur += ']'
-                else:
-                    cur += c
-                out.append(cur)
-                cur = ''
-                mode = 'char'
-            else: cur += c
-        elif mode == 'char':
-            if c == '<':
-                out.append(cur)
-                if b:
-                    cur = '['
-                else:
-                    cur = c
-                mode = 'tag'
-            elif c in string.whitespace:
-                out.append(cur+c);
-                cur = ''
-            else:
-                cur += c
-    out.append(cur)
-    return [x for x in out if x != '']
+    """splits html into tags, words with a trailing
+    whitespace character and the remaining whitespace,
+    if `b` is true, angle brackets of tags are replaced
+    with the square ones"""
+    out = TOKEN_RE.findall(x)
+    if b:
+        out = ['[' + token[1:-1] + ']' if isTag(token) else token for token in out]
+    return out
+
+def get_common_affix_lengths(a, b, alo=0, ahi=None, blo=0, bhi=None):
+    """returns lengths of the common prefix and suffix
+    of a[alo:ahi] and b[blo:bhi], which do not overlap"""
+    ahi = len(a) if ahi is None else ahi
+    bhi = len(b) if bhi is None else bhi
+    limit = min(ahi - alo, bhi - blo)
+    prefix = 0
+    while prefix < limit and a[alo + prefix] == b[blo + prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and a[ahi - 1 - suffix] == b[bhi - 1 - suffix]:
+        suffix += 1
+    return prefix, suffix
+
+def get_trimmed_opcodes(a, b):
+    """cheap diff - common prefix and suffix
+    and a replacement between them"""
+    prefix, suffix = get_common_affix_lengths(a, b)
+    matches = [(i, i) for i in range(prefix)]
+    matches.extend((len(a) - k, len(b) - k) for k in range(suffix, 0, -1))
+    return matches_to_opcodes(matches, len(a), len(b))
+
+def get_unique_anchors(a, b, alo, ahi, blo, bhi):
+    """returns increasing list of (i, j) pairs of positions of tokens,
+    which occur once in a[alo:ahi] and once in b[blo:bhi],
+    the longest chain of such pairs, ordered in both sequences"""
+    a_positions = dict()
+    for i in range(alo, ahi):
+        token = a[i]
+        a_positions[token] = -1 if token in a_positions else i
+    b_positions = dict()
+    for j in range(blo, bhi):
+        token = b[j]
+        if token in a_positions:
+            b_positions[token] = -1 if token in b_positions else j
+
+    pairs = sorted(
+        (a_positions[token], j) for token, j in b_positions.items()
+        if j != -1 and a_positions[token] != -1
+    )
+    if not pairs:
+        return pairs
+
+    #longest increasing subsequence of b positions (patience sorting)
+    tails = list() #b positions at the ends of the piles
+    tail_indices = list()
+    previous = [None] * len(pairs)
+    for idx, (_, j) in enumerate(pairs):
+        pile = bisect_left(tails, j)
+        if pile > 0:
+            previous[idx] = tail_indices[pile - 1]
+        if pile == len(tails):
+            tails.append(j)
+            tail_indices.append(idx)
+        else:
+            tails[pile] = j
+            tail_indices[pile] = idx
+
+    chain = list()
+    idx = tail_indices[-1]
+    while idx is not None:
+        chain.append(pairs[idx])
+        idx = previous[idx]
+    chain.reverse()
+    return chain
+
+def get_matches(a, b):
+    """returns sorted list of (i, j) pairs of positions
+    of the matching tokens"""
+    matches = list()
+    regions = [(0, len(a), 0, len(b))]
+    while regions:
+        alo, ahi, blo, bhi = regions.pop()
+        prefix, suffix = get_common_affix_lengths(a, b, alo, ahi, blo, bhi)
+        matches.extend((alo + k, blo + k) for k in range(prefix))
+        matches.extend((ahi - k, bhi - k) for k in range(1, suffix + 1))
+        alo += prefix
+        blo += prefix
+        ahi -= suffix
+        bhi -= suffix
+        if alo == ahi or blo == bhi:
+            continue
+
+        anchors = get_unique_anchors(a, b, alo, ahi, blo, bhi)
+        if anchors:
+            matches.extend(anchors)
+            starts = [(alo, blo)] + [(i + 1, j + 1) for i, j in anchors]
+            ends = [(i, j) for i, j in anchors] + [(ahi, bhi)]
+            for (i1, j1), (i2, j2) in zip(starts, ends):
+                if i1 < i2 and j1 < j2:
+                    regions.append((i1, i2, j1, j2))
+        elif (ahi - alo) * (bhi - blo) <= SMALL_REGION_SIZE:
+            matcher = difflib.SequenceMatcher(None, a[alo:ahi], b[blo:bhi], autojunk=False)
+            for i, j, size in matcher.get_matching_blocks():
+                matches.extend((alo + i + k, blo + j + k) for k in range(size))
+
+    matches.sort()
+    return matches
+
+def matches_to_opcodes(matches, a_length, b_length):
+    """converts sorted matching positions to the opcodes
+    in the format of the `difflib.SequenceMatcher.get_opcodes()`"""
+    opcodes = list()
+    i = j = 0
+    for mi, mj in matches + [(a_length, b_length)]:
+        if i < mi and j < mj:
+            opcodes.append(('replace', i, mi, j, mj))
+        elif i < mi:
+            opcodes.append(('delete', i, mi, j, j))
+        elif j < mj:
+            opcodes.append(('insert', i, i, j, mj))
+        if mi == a_length and mj == b_length:
+            break
+        if opcodes and opcodes[-1][0] == 'equal' and opcodes[-1][2] == mi:
+            tag, i1, i2, j1, j2 = opcodes[-1]
+            opcodes[-1] = (tag, i1, mi + 1, j1, mj + 1)
+        else:
+            opcodes.append(('equal', mi, mi + 1, mj, mj + 1))
+        i, j = mi + 1, mj + 1
+    return opcodes
+
+def get_opcodes(a, b):
+    """opcodes of the patience diff of the token lists"""
+    return matches_to_opcodes(get_matches(a, b), len(a), len(b))
 
 if __name__ == '__main__':
     import sys
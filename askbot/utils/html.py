@@ -1,10 +1,12 @@
 """Utilities for working with HTML."""
 import functools
 import re
+import threading
 from urllib.parse import urlparse
 import html.entities
 
 import bleach
+from bleach import html5lib_shim
 from bs4 import BeautifulSoup
 
 from django.conf import settings as django_settings
@@ -28,6 +30,136 @@ def sanitize_html(html_string):
                         strip=True)
 
 
+HTML_WHITESPACE = ' \t\n\r\f'
+
+
+class UrlizeFilter(html5lib_shim.Filter):
+    """Filter of the sanitizer token stream, which
+    turns link-like text into links, except the text inside
+    links, images, <pre> and <code> tags - same as ``urlize_html``.
+
+    Entities in the text and in the attribute values are resolved
+    and the attributes are sorted by name, like in the html
+    re-parsed by the ``urlize_html``.
+    """
+    skip_tags = frozenset(('a', 'img', 'pre', 'code'))
+    #urlize turns into links only words with these characters
+    link_chars_re = re.compile(r'[.@:]')
+    #links as formatted by ``django.utils.html.urlize``
+    urlized_link_re = re.compile(r'<a href="([^"]*)">([^<]*)</a>')
+
+    def __init__(self, source, trim_url_limit=40, make_links=True):
+        super().__init__(source)
+        self.trim_url_limit = trim_url_limit
+        #links are not made, when the <a> tags are not allowed
+        self.make_links = make_links
+
+    def __iter__(self):
+        skip_depth = 0
+        text = []
+        at_start = True
+        for token in super().__iter__():
+            token_type = token['type']
+            # adjacent text tokens are parts of one text node
+            if token_type in ('Characters', 'SpaceCharacters'):
+                text.append(token['data'])
+                continue
+            if token_type == 'Entity':
+                text.append(html.unescape(f'&{token["name"]};'))
+                continue
+
+            if text:
+                yield from self.get_text_tokens(''.join(text), skip_depth == 0, at_start)
+                text = []
+            at_start = False
+
+            if token_type in ('StartTag', 'EmptyTag'):
+                attributes = sorted(token['data'].items(), key=lambda item: item[0][1])
+                token['data'] = {name: html.unescape(value) for name, value in attributes}
+                if token_type == 'StartTag' and token['name'] in self.skip_tags:
+                    skip_depth += 1
+            elif token_type == 'EndTag' and token['name'] in self.skip_tags:
+                skip_depth -= 1
+            yield token
+
+        if text:
+            yield from self.get_text_tokens(''.join(text), skip_depth == 0, at_start)
+
+    def get_text_tokens(self, text, linkify, at_start=False):
+        """returns tokens of the text node,
+        with the links, if `linkify` is true.
+        Leading whitespace of the fragment is dropped
+        as by the html5lib document parser."""
+        if at_start:
+            text = text.lstrip(HTML_WHITESPACE)
+            if not text:
+                return []
+        if linkify and self.make_links and self.link_chars_re.search(text):
+            urlized_text = urlize(text, trim_url_limit=self.trim_url_limit)
+            if urlized_text != text:
+                return self.get_urlized_tokens(urlized_text)
+        return [{'type': 'Characters', 'data': text}]
+
+    def get_urlized_tokens(self, urlized_text):
+        """splits output of the urlize into the text and link tokens"""
+        namespace = html5lib_shim.namespaces['html']
+        tokens = []
+        pos = 0
+        for match in self.urlized_link_re.finditer(urlized_text):
+            if match.start() > pos:
+                tokens.append({
+                    'type': 'Characters',
+                    'data': html.unescape(urlized_text[pos:match.start()])
+                })
+            tokens.append({
+                'type': 'StartTag',
+                'name': 'a',
+                'namespace': namespace,
+                'data': {(None, 'href'): html.unescape(match.group(1))}
+            })
+            tokens.append({'type': 'Characters', 'data': html.unescape(match.group(2))})
+            tokens.append({'type': 'EndTag', 'name': 'a', 'namespace': namespace})
+            pos = match.end()
+        if pos < len(urlized_text):
+            tokens.append({'type': 'Characters', 'data': html.unescape(urlized_text[pos:])})
+        return tokens
+
+
+URLIZING_CLEANERS = threading.local()
+
+
+def sanitize_and_urlize_html(html_string, trim_url_limit=40):
+    """Sanitizes an HTML fragment and urlizes the text
+    in a single pass over the tokens - same result as
+    ``sanitize_html(urlize_html(sanitize_html(html_string)))``,
+    except that the whitespace before the links is kept
+    and the escaped markup in the text stays escaped.
+    """
+    tags = django_settings.ASKBOT_ALLOWED_HTML_ELEMENTS
+    attributes = django_settings.ASKBOT_ALLOWED_HTML_ATTRIBUTES
+    #cleaners are reused, but are not thread safe,
+    #a new one is made when the allowed markup changes
+    cleaners = URLIZING_CLEANERS.__dict__
+    cleaner_key = (trim_url_limit, tuple(tags), repr(attributes))
+    cleaner = cleaners.get(cleaner_key)
+    if cleaner is None:
+        url_filter = functools.partial(UrlizeFilter,
+                                       trim_url_limit=trim_url_limit,
+                                       make_links=('a' in tags))
+        cleaner = bleach.sanitizer.Cleaner(
+            tags=tags,
+            attributes=attributes,
+            strip=True,
+            filters=[url_filter]
+        )
+        cleaners[cleaner_key] = cleaner
+
+    result = cleaner.clean(html_string)
+    if html_string.endswith('\n') and not result.endswith('\n'):
+        result += '\n'
+    return result
+
+
 def sanitized(func):
     @functools.wraps(func)
     def wrapped(*args, **kwargs):
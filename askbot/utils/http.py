@@ -55,3 +55,13 @@ def get_request_info(request):
     else:
         info += 'user is anonymous\n'
     return info
+
+
+def get_or_create_session_key(request):
+    """Returns session key, creates the session if necessary.
+    Anonymous visitors get a session only when they
+    submit content which must be kept until they log in"""
+    if request.session.session_key is None:
+        request.session['askbot_write_intent'] = True
+        request.session.save()
+    return request.session.session_key
@@ -5,10 +5,12 @@ This module contains most (but not all) processors for Ajax requests.
 Not so clear if this subdivision was necessary as separation of Ajax and non-ajax views
 is not always very clean.
 """
+import hashlib
 import logging
 from bs4 import BeautifulSoup
 from django.conf import settings as django_settings
 from django.core import exceptions
+from django.core import cache
 #from django.core.management import call_command
 from django.urls import reverse
 from django.contrib.auth.decorators import login_required
@@ -17,11 +19,13 @@ from django.http import HttpResponse
 from django.http import HttpResponseBadRequest
 from django.http import HttpResponseRedirect
 from django.http import HttpResponseForbidden
+from django.db.models import Count
 from django.forms import ValidationError, IntegerField, CharField
 from django.shortcuts import get_object_or_404
 from django.shortcuts import render
 from django.template.loader import get_template
 from django.views.decorators import csrf
+from django.views.decorators.http import condition
 import json
 from django.utils import timezone
 from django.utils import translation
@@ -47,7 +51,9 @@ from askbot import spam_checker
 from django.template import RequestContext
 from askbot.skins.shortcuts import render_into_skin_as_string
 from askbot.skins.shortcuts import render_text_into_skin
+from askbot.models.question import get_title_search_words
 from askbot.models.tag import get_tags_by_names
+from askbot.models.tag_index import TagPrefixIndex
 
 
 def process_vote(user = None, vote_direction = None, post = None):
@@ -278,10 +284,10 @@ def get_tags_by_wildcard(request):
     if wildcard is None:
         return HttpResponseForbidden()
 
-    matching_tags = models.Tag.objects.get_by_wildcards( [wildcard,] )
-    count = matching_tags.count()
-    names = matching_tags.values_list('name', flat = True)[:20]
-    re_data = json.dumps({'tag_count': count, 'tag_names': list(names)})
+    prefix = wildcard[:-1]
+    index = TagPrefixIndex.get_index(translation.get_language())
+    names = index.complete(prefix, 20)
+    re_data = json.dumps({'tag_count': index.count(prefix), 'tag_names': names})
     return HttpResponse(re_data, content_type='application/json')
 
 @decorators.get_only
@@ -332,20 +338,31 @@ def get_html_template(request):
         'html': get_template(template_name).render()
     }
 
+def get_tag_list_etag(request):
+    """ETag of the tag list - changes when the tag index is rebuilt"""
+    language = translation.get_language()
+    return '%s-%s' % (language, TagPrefixIndex.get_version(language))
+
 @decorators.get_only
+@condition(etag_func=get_tag_list_etag)
 def get_tag_list(request):
     """returns tags to use in the autocomplete
-    function
-    """
-    tags = models.Tag.objects.filter(
-                        deleted=False,
-                        status=models.Tag.STATUS_ACCEPTED,
-                        language_code=translation.get_language()
-                    )
+    function, one tag name per line.
 
-    tag_names = tags.values_list(
-                        'name', flat = True
-                    )
+    With parameter `q` - returns up to `limit` names
+    starting with `q`, most used first, otherwise
+    returns all accepted tags in the current language.
+    """
+    index = TagPrefixIndex.get_index(translation.get_language())
+    prefix = request.GET.get('q', '').strip()
+    if prefix:
+        try:
+            limit = int(request.GET.get('limit', const.TAG_AUTOCOMPLETE_DEFAULT_ITEMS))
+        except ValueError:
+            limit = const.TAG_AUTOCOMPLETE_DEFAULT_ITEMS
+        tag_names = index.complete(prefix, max(limit, 1))
+    else:
+        tag_names = index.get_all_names()
 
     output = '\n'.join(map(escape, tag_names))
     return HttpResponse(output, content_type='text/plain')
@@ -636,7 +653,7 @@ def set_question_title(request):
     title = request.POST['title']
 
     spam_checker_params = spam_checker.get_params_from_request(request)
-    enabled = askbot_settings.SPAM_FILTER_ENABLED
+    enabled = spam_checker.should_check_in_request()
     if enabled and spam_checker.is_spam(question.get_text_content(title=title), **spam_checker_params):
         message = _('Spam was detected in the post')
         raise exceptions.PermissionDenied(message)
@@ -683,7 +700,7 @@ def set_post_body(request):
     post = get_object_or_404(models.Post, pk=post_id)
     text = post.get_text_content(body_text=body_text)
     spam_checker_params = spam_checker.get_params_from_request(request)
-    enabled = askbot_settings.SPAM_FILTER_ENABLED
+    enabled = spam_checker.should_check_in_request()
     if enabled and spam_checker.is_spam(text, **spam_checker_params):
         message = _('Spam was detected in the post')
         raise exceptions.PermissionDenied(message)
@@ -706,12 +723,66 @@ def delete_bulk_tag_subscription(request):
     else:
         return HttpResponseRedirect(reverse('list_bulk_tag_subscription'))
 
+def get_title_search_cache_key(query, tag_name):
+    """cache key of the title search results for the
+    normalized query - lowercased words of the query"""
+    words = get_title_search_words(query)
+    key = '\n'.join([translation.get_language(), tag_name or ''] + words)
+    digest = hashlib.md5(key.encode('utf-8')).hexdigest()
+    return 'askbot-title-search-%s' % digest
+
+
+def get_title_search_data(threads, user):
+    """returns list of title search result dictionaries,
+    question posts and answer counts are loaded
+    in bulk, with one query each"""
+    threads = list(threads)
+    thread_ids = [thread.id for thread in threads]
+
+    questions = models.Post.objects.filter(thread_id__in=thread_ids, post_type='question')
+    questions = questions.only('id', 'thread_id', 'post_type', 'language_code')
+    questions_by_thread_id = {question.thread_id: question for question in questions}
+
+    if askbot_settings.GROUPS_ENABLED:
+        answers = models.Post.objects.get_answers(user)
+        answers = answers.filter(thread_id__in=thread_ids, deleted=False)
+        counts = answers.values('thread_id').annotate(count=Count('id', distinct=True))
+        answer_counts = {item['thread_id']: item['count'] for item in counts}
+    else:
+        answer_counts = {thread.id: thread.answer_count for thread in threads}
+
+    thread_list = list()
+    for thread in threads:
+        question = questions_by_thread_id.get(thread.id)
+        if question is None:
+            continue
+        thread._question_cache = question
+        thread_list.append({
+            'title': escape(thread.title),
+            'url': thread.get_absolute_url(),
+            'answer_count': answer_counts.get(thread.id, 0)
+        })
+    return thread_list
+
+
 @decorators.get_only
 def api_get_questions(request):
-    """json api for retrieving questions by title match"""
+    """json api for retrieving questions by title match,
+    used by the search as you type in the ask form.
+
+    Results that do not depend on the user are cached
+    for a short time per normalized query.
+    """
     query = request.GET.get('query_text', '').strip()
     tag_name = request.GET.get('tag_name', None)
 
+    cache_key = None
+    if request.user.is_anonymous or not askbot_settings.GROUPS_ENABLED:
+        cache_key = get_title_search_cache_key(query, tag_name)
+        json_data = cache.cache.get(cache_key)
+        if json_data is not None:
+            return HttpResponse(json_data, content_type="application/json")
+
     if askbot_settings.GROUPS_ENABLED:
         threads = models.Thread.objects.get_visible(user=request.user)
     else:
@@ -721,23 +792,14 @@ def api_get_questions(request):
         threads = threads.filter(tags__name=tag_name)
 
     if query:
-        threads = threads.get_for_title_query(query)
+        threads = threads.get_for_title_prefix_query(query)
 
     #todo: filter out deleted threads, for now there is no way
     threads = threads.distinct()[:30]
 
-    thread_list = list()
-    for thread in threads:#todo: this is a temp hack until thread model is fixed
-        try:
-            thread_list.append({
-                    'title': escape(thread.title),
-                    'url': thread.get_absolute_url(),
-                    'answer_count': thread.get_answer_count(request.user)
-                })
-        except:
-            continue
-
-    json_data = json.dumps(thread_list)
+    json_data = json.dumps(get_title_search_data(threads, request.user))
+    if cache_key:
+        cache.cache.set(cache_key, json_data, const.TITLE_SEARCH_CACHE_TIMEOUT)
     return HttpResponse(json_data, content_type="application/json")
 
 
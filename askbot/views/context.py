@@ -41,7 +41,7 @@ def get_for_inbox(user):
     group_join_requests_count = 0
     if user.is_administrator_or_moderator():
         pending_memberships = GroupMembership.objects.filter(
-                                            group__in=user.get_groups(),
+                                            group__id__in=user.get_group_ids(),
                                             level=GroupMembership.PENDING
                                         )
         group_join_requests_count = pending_memberships.count()
@@ -1,7 +1,12 @@
+import datetime
+import hashlib
+from collections import defaultdict
+from django.core.cache import cache
 from django.http import Http404
 from django.utils.text import format_lazy
 from django.utils.translation import ngettext
 from django.utils.translation import gettext as _
+from django.utils.translation import get_language
 from django.conf import settings as django_settings
 from django.contrib.auth.decorators import login_required
 from django.contrib.contenttypes.models import ContentType
@@ -16,6 +21,16 @@ from askbot.utils.functions import decode_and_loads
 from askbot import const
 from askbot.conf import settings as askbot_settings
 from askbot import models
+from askbot import spam_checker
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+#related objects shown in the moderation queue items,
+#loaded together with the content objects
+QUEUE_RELATED_FIELDS = {
+    models.Post: ('author', 'thread'),
+    models.PostRevision: ('author', 'post__thread'),
+}
 
 #some utility functions
 def get_object(memo):
@@ -121,7 +136,8 @@ def concat_messages(message1, message2):
 def get_activity_types():
     """returns activity types for the memos"""
     activity_types = (const.TYPE_ACTIVITY_MARK_OFFENSIVE,)
-    if askbot_settings.CONTENT_MODERATION_MODE in ('premoderation', 'audit'):
+    if askbot_settings.CONTENT_MODERATION_MODE in ('premoderation', 'audit') \
+        or spam_checker.is_async():
         activity_types += (
             const.TYPE_ACTIVITY_MODERATED_NEW_POST,
             const.TYPE_ACTIVITY_MODERATED_POST_EDIT
@@ -129,48 +145,149 @@ def get_activity_types():
     return activity_types
 
 
+def get_epoch():
+    if getattr(django_settings, 'USE_TZ', False):
+        return EPOCH.replace(tzinfo=datetime.timezone.utc)
+    return EPOCH
+
+
+def get_queue_cursor(memo):
+    """returns keyset pagination cursor pointing
+    past the memo in the moderation queue"""
+    delta = memo.activity.active_at - get_epoch()
+    microseconds = (delta.days * 86400 + delta.seconds) * 10**6 + delta.microseconds
+    return '%d-%d' % (microseconds, memo.id)
+
+
+def parse_queue_cursor(cursor):
+    """returns (timestamp, memo id) from the cursor
+    or None, if cursor is invalid"""
+    try:
+        microseconds, memo_id = (int(bit) for bit in cursor.split('-'))
+    except (AttributeError, ValueError):
+        return None
+    return get_epoch() + datetime.timedelta(microseconds=microseconds), memo_id
+
+
+def load_content_objects(activities):
+    """sets content objects to the activities, loading them
+    with one query per content type, together with the related
+    posts, threads and authors.
+    Returns list of activities whose objects no longer exist"""
+    ids_by_type = defaultdict(set)
+    for act in activities:
+        ids_by_type[act.content_type_id].add(act.object_id)
+
+    objects = dict()
+    for type_id, object_ids in ids_by_type.items():
+        model = ContentType.objects.get_for_id(type_id).model_class()
+        objs = model._base_manager.filter(id__in=object_ids)
+        if model in QUEUE_RELATED_FIELDS:
+            objs = objs.select_related(*QUEUE_RELATED_FIELDS[model])
+        for obj in objs:
+            objects[(type_id, obj.id)] = obj
+
+    missing = list()
+    content_object = models.Activity.content_object
+    for act in activities:
+        obj = objects.get((act.content_type_id, act.object_id))
+        if obj is None:
+            missing.append(act)
+        else:
+            content_object.set_cached_value(act, obj)
+    return missing
+
+
+def get_rendered_content(objects):
+    """returns list of dictionaries with the snippet
+    and sanitized content of the posts or revisions.
+    Rendered content is cached by the hash of the source html,
+    so that edits do not need to invalidate the cache,
+    and by the language of the translated snippet expander."""
+    language = get_language()
+    keys = list()
+    for obj in objects:
+        text = obj.html or obj.text or ''
+        digest = hashlib.md5(text.encode('utf-8')).hexdigest()
+        keys.append('askbot-moderation-item-%s-%s-%s' % (type(obj).__name__, language, digest))
+
+    rendered = cache.get_many(keys)
+    missing = dict()
+    for key, obj in zip(keys, objects):
+        if key not in rendered:
+            rendered[key] = missing[key] = {
+                'snippet': obj.get_snippet(120),
+                'content': sanitize_html(obj.html or obj.text),
+            }
+    if missing:
+        cache.set_many(missing, const.MODERATION_QUEUE_CACHE_TIMEOUT)
+    return [rendered[key] for key in keys]
+
+
 @login_required
 def moderation_queue(request):
-    """Lists moderation queue items"""
+    """Lists moderation queue items, newest first,
+    page by page with keyset pagination on the
+    activity timestamp and the memo id"""
     if not request.user.is_administrator_or_moderator():
         raise Http404
 
     activity_types = get_activity_types()
 
     #2) load the activity notifications according to activity types
-    #todo: insert pagination code here
     memo_set = request.user.get_notifications(activity_types)
+    cursor = parse_queue_cursor(request.GET.get('before'))
+    if cursor:
+        active_at, memo_id = cursor
+        memo_set = memo_set.filter(
+                        Q(activity__active_at__lt=active_at) |
+                        Q(activity__active_at=active_at, id__lt=memo_id)
+                    )
+    page_size = const.MODERATION_QUEUE_PAGE_SIZE
     memo_set = memo_set.select_related(
                     'activity',
-                    'activity__content_type',
+                    'activity__user',
                     'activity__question__thread',
-                    'activity__user'
                 ).order_by(
-                    '-activity__active_at'
-                )[:const.USER_VIEW_DATA_SIZE]
+                    '-activity__active_at', '-id'
+                )[:page_size + 1]
+    memos = list(memo_set)
+
+    next_cursor = None
+    if len(memos) > page_size:
+        memos = memos[:page_size]
+        next_cursor = get_queue_cursor(memos[-1])
+
+    missing = load_content_objects([memo.activity for memo in memos])
+    for act in missing:
+        act.delete()#a temp plug due to bug in the comment deletion
+    missing_ids = set(act.id for act in missing)
+    memos = [memo for memo in memos if memo.activity_id not in missing_ids]
+
+    rendered_items = get_rendered_content(
+                        [memo.activity.content_object for memo in memos]
+                    )
 
     #3) "package" data for the output
     queue = []
-    for memo in memo_set:
-        obj = memo.activity.content_object
-        if obj is None:
-            memo.activity.delete()
-            continue#a temp plug due to bug in the comment deletion
-
+    for memo, rendered in zip(memos, rendered_items):
         act = memo.activity
+        obj = act.content_object
         if act.activity_type == const.TYPE_ACTIVITY_MARK_OFFENSIVE:
             #todo: two issues here - flags are stored differently
             #from activity of new posts and edits
             #second issue: on posts with many edits we don't know whom to block
-            act_user = act.content_object.author
+            act_user = obj.author
             act_message = _('post was flagged as offensive')
             act_type = 'flag'
             ip_addr = None
+            url = obj.get_absolute_url(question_post=act.question)
         else:
             act_user = act.user
             act_message = act.get_activity_type_display()
             act_type = 'edit'
-            ip_addr = act.content_object.ip_addr
+            ip_addr = obj.ip_addr
+            url = obj.get_absolute_url()
 
         item = {
             'id': memo.id,
@@ -178,21 +295,21 @@ def moderation_queue(request):
             'user': act_user,
             'ip_addr': ip_addr,
             'is_new': memo.is_new(),
-            'url': act.get_absolute_url(),
-            'snippet': act.get_snippet(),
+            'url': url,
+            'snippet': rendered['snippet'],
             'title': act.question.thread.title,
             'message_type': act_message,
             'memo_type': act_type,
             'question_id': act.question.id,
-            'content': sanitize_html(obj.html or obj.text),
+            'content': rendered['content'],
         }
         queue.append(item)
 
-    queue.sort(key=lambda x: x['timestamp'], reverse=True)
     reject_reasons = models.PostFlagReason.objects.all().order_by('title')
     data = {'active_tab': 'users',
             'post_reject_reasons': reject_reasons,
-            'queue' : queue}
+            'queue' : queue,
+            'next_cursor': next_cursor}
     template = 'moderation/queue.html'
     return render(request, template, data)
 
@@ -288,6 +405,7 @@ def moderate_post_edits(request):
 
         num_users = 0
         num_posts = 0
+        num_scheduled_posts = 0
         num_ips = 0
 
         moderate_ips = django_settings.ASKBOT_IP_MODERATION_ENABLED
@@ -331,8 +449,12 @@ def moderate_post_edits(request):
                     user.set_status('b')
                     num_users += 1
                 #delete all content by the user
-                num_posts += request.user.delete_all_content_authored_by_user(
+                count, is_deferred = request.user.delete_all_content_authored_by_user(
                                                             user, mark_as_spam=True)
+                if is_deferred:
+                    num_scheduled_posts += count
+                else:
+                    num_posts += count
 
             num_ips = len(ips)
 
@@ -347,8 +469,12 @@ def moderate_post_edits(request):
                     editor.set_status('b')
                     num_users += 1
                 #delete all content by the user
-                num_posts += request.user.delete_all_content_authored_by_user(
+                count, is_deferred = request.user.delete_all_content_authored_by_user(
                                                             editor, mark_as_spam=True)
+                if is_deferred:
+                    num_scheduled_posts += count
+                else:
+                    num_posts += count
 
         if num_ips:
             ips_message = ngettext('%d ip blocked', '%d ips blocked', num_ips) % num_ips
@@ -362,6 +488,12 @@ def moderate_post_edits(request):
             posts_message = ngettext('%d post deleted', '%d posts deleted', num_posts) % num_posts
             result['message'] = concat_messages(result['message'], posts_message)
 
+        if num_scheduled_posts:
+            posts_message = ngettext('deletion of %d post scheduled',
+                                     'deletion of %d posts scheduled',
+                                     num_scheduled_posts) % num_scheduled_posts
+            result['message'] = concat_messages(result['message'], posts_message)
+
     result['memo_ids'] = [memo.id for memo in memo_set]
     result['message'] = force_str(result['message'])
 
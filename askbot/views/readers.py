@@ -34,7 +34,7 @@ from django.contrib.humanize.templatetags import humanize
 from django.http import QueryDict
 from django.conf import settings as django_settings
 
-from askbot import conf, const, exceptions, models, signals
+from askbot import conf, const, exceptions, models, page_cache, signals
 from askbot.conf import settings as askbot_settings
 from askbot.forms import AnswerForm
 from askbot.forms import GetDataForPostForm
@@ -579,6 +579,8 @@ def question(request, id):#refactor - long subroutine. display question body, an
             request.user.message_set.create(message=message)
             return HttpResponseRedirect(thread.get_absolute_url())
 
+    page_cache.set_question_page(request, question_post)
+
     logging.debug('answer_sort_method=' + str(answer_sort_method))
 
     #load answers and post id's->athor_id mapping
@@ -676,11 +678,6 @@ def question(request, id):#refactor - long subroutine. display question body, an
     else:
         group_read_only = False
 
-    #session variable added so that the session is
-    #not empty and is not autodeleted, otherwise anonymous
-    #answer posting is impossible
-    request.session['askbot_write_intent'] = True
-
     data = {
         'active_tab': 'questions',
         'answer' : answer_form,
@@ -18,10 +18,10 @@ import operator
 import urllib.request, urllib.parse, urllib.error
 
 from django.db.models import Count
-from django.db.models import Q
 from django.conf import settings as django_settings
 from django.contrib.auth.decorators import login_required
 from django.core import exceptions as django_exceptions
+from django.core.cache import cache
 from django.core.paginator import Paginator, EmptyPage, InvalidPage
 from django.contrib.contenttypes.models import ContentType
 from django.urls import reverse
@@ -385,7 +385,9 @@ def get_todays_backup_file_name(request, id):
         return {'error': 'user not found'}
 
     if request.user.can_manage_account(subject):
-        return {'file_name': subject.get_todays_backup_file_name()}
+        progress_key = const.USER_DATA_EXPORT_PROGRESS_CACHE_KEY % subject.pk
+        return {'file_name': subject.get_todays_backup_file_name(),
+                'progress': cache.get(progress_key)}
 
     return {'error': 'permission denied'}
 
@@ -441,9 +443,12 @@ def user_moderate(request, subject, context):
             if user_status_form.is_valid():
                 subject.set_status( user_status_form.cleaned_data['user_status'] )
                 if user_status_form.cleaned_data['delete_content'] == True:
-                    num_deleted = request.user.delete_all_content_authored_by_user(subject)
+                    num_deleted, is_deferred = request.user.delete_all_content_authored_by_user(subject)
                     if num_deleted:
-                        num_deleted_message = ngettext('%d post deleted', '%d posts deleted', num_deleted) % num_deleted
+                        if is_deferred:
+                            num_deleted_message = ngettext('deletion of %d post scheduled', 'deletion of %d posts scheduled', num_deleted) % num_deleted
+                        else:
+                            num_deleted_message = ngettext('%d post deleted', '%d posts deleted', num_deleted) % num_deleted
                         user_status_changed_message = format_lazy('{}, {}', user_status_changed_message, num_deleted_message)
             user_status_changed = True
         elif 'send_message' in request.POST:
@@ -508,7 +513,10 @@ def user_moderate(request, subject, context):
         'email_error_message': email_error_message,
         'user_rep_changed': user_rep_changed,
         'user_status_changed': user_status_changed,
-        'user_status_changed_message': user_status_changed_message
+        'user_status_changed_message': user_status_changed_message,
+        'content_deletion_progress': cache.get(
+            const.USER_CONTENT_DELETION_PROGRESS_CACHE_KEY % subject.pk
+        )
     }
     context.update(data)
     return render(request, 'user_profile/user_moderate.html', context)
@@ -557,16 +565,9 @@ def edit_user(request, id):
             #Maybe we need to clear post caches, b/c
             #author info may need to be updated on posts and thread summaries
             if need_to_invalidate_post_caches(user, form):
-                #get threads where users participated
-                thread_ids = models.Post.objects.filter(
-                                    Q(author=user) | Q(last_edited_by=user)
-                                ).values_list(
-                                    'thread__id', flat=True
-                                ).distinct()
-                threads = models.Thread.objects.filter(id__in=thread_ids)
-                for thread in threads:
-                    #for each thread invalidate cache keys for posts, etc
-                    thread.clear_cached_data()
+                #invalidate cache keys for posts, etc in threads
+                #where user participated
+                user.clear_cached_data()
 
             user.real_name = strip_all_tags(form.cleaned_data['realname'])
             user.website = sanitize_html(form.cleaned_data['website'])
@@ -619,7 +620,14 @@ def user_stats(request, user, context):
                     'thread', 'thread__last_activity_by'
                 )
 
+    #precomputed stats match what the public sees
+    stats = models.UserStats.objects.get_for_user(user)
+    use_stats_counts = not askbot_settings.GROUPS_ENABLED
+
     q_paginator = Paginator(questions_qs, const.USER_POSTS_PAGE_SIZE)
+    if use_stats_counts and not (is_mod or is_author):
+        #assigning count skips the COUNT query of the paginator
+        q_paginator.count = stats.question_count
     questions = q_paginator.page(1).object_list
     question_count = q_paginator.count
 
@@ -634,6 +642,8 @@ def user_stats(request, user, context):
     # Top answers
     #
     a_paginator = user.get_top_answers_paginator(request.user)
+    if use_stats_counts:
+        a_paginator.count = stats.answer_count
     top_answers = a_paginator.page(1).object_list
     top_answer_count = a_paginator.count
 
@@ -647,24 +657,15 @@ def user_stats(request, user, context):
     #
     # Votes
     #
-    up_votes = models.Vote.objects.get_up_vote_count_from_user(user)
-    down_votes = models.Vote.objects.get_down_vote_count_from_user(user)
+    up_votes = stats.up_votes
+    down_votes = stats.down_votes
     votes_today = models.Vote.objects.get_votes_count_today_from_user(user)
     votes_total = askbot_settings.MAX_VOTES_PER_USER_PER_DAY
 
     #
     # Tags
     #
-    # INFO: There's bug in Django that makes the following query kind of broken (GROUP BY clause is problematic):
-    #       http://stackoverflow.com/questions/7973461/django-aggregation-does-excessive-group-by-clauses
-    #       Fortunately it looks like it returns correct results for the test data
-    user_tags = models.Tag.objects.filter(
-                                    threads__posts__author=user,
-                                    language_code=get_language()
-                                ).distinct().\
-                    annotate(user_tag_usage_count=Count('threads')).\
-                    order_by('-user_tag_usage_count')[:const.USER_VIEW_DATA_SIZE]
-    user_tags = list(user_tags) # evaluate
+    user_tags = stats.get_tag_usage(get_language())
 
     when = askbot_settings.MARKED_TAGS_ARE_PUBLIC_WHEN
     if when == 'always' or \
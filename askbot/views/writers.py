@@ -43,7 +43,7 @@ from askbot.utils.functions import diff_date
 from askbot.utils import url_utils
 from askbot.utils.file_utils import store_file
 from askbot.utils.functions import encode_jwt
-from askbot.utils.http import is_ajax
+from askbot.utils.http import is_ajax, get_or_create_session_key
 from askbot.utils.loading import load_module
 from askbot.views import context
 from askbot.templatetags import extra_filters_jinja as template_filters
@@ -230,7 +230,7 @@ def ask(request):#view used to ask a new question
 
             content = '{}\n\n{}\n\n{}'.format(title, tagnames, text)
             spam_checker_params = spam_checker.get_params_from_request(request)
-            enabled = askbot_settings.SPAM_FILTER_ENABLED
+            enabled = spam_checker.should_check_in_request()
             if enabled and spam_checker.is_spam(content, **spam_checker_params):
                 message = _('Spam was detected in the post')
                 raise exceptions.PermissionDenied(message)
@@ -270,10 +270,7 @@ def ask(request):#view used to ask a new question
                     return HttpResponseRedirect(reverse('index'))
 
             else:
-                session_key=request.session.session_key
-                if session_key is None:
-                    return HttpResponseForbidden()
-
+                session_key = get_or_create_session_key(request)
                 models.AnonymousQuestion.objects.create(
                     session_key=session_key,
                     title=title,
@@ -288,9 +285,6 @@ def ask(request):#view used to ask a new question
 
     if request.method == 'GET':
         form = forms.AskForm(user=request.user)
-        #session key used only to enable anonymous asking
-        #as django will autodelete empty sessions
-        request.session['askbot_write_intent'] = True
 
     draft_title = ''
     draft_text = ''
@@ -358,7 +352,7 @@ def retag_question(request, id):
         if form.has_changed():
             text = question.get_text_content(tags=form.cleaned_data['tags'])
             spam_checker_params = spam_checker.get_params_from_request(request)
-            enabled = askbot_settings.SPAM_FILTER_ENABLED
+            enabled = spam_checker.should_check_in_request()
             if enabled and spam_checker.is_spam(text, **spam_checker_params):
                 message = _('Spam was detected in the post')
                 raise exceptions.PermissionDenied(message)
@@ -439,7 +433,7 @@ def edit_answer(request, id):
 
                         text = form.cleaned_data['text']
                         spam_checker_params = spam_checker.get_params_from_request(request)
-                        enabled = askbot_settings.SPAM_FILTER_ENABLED
+                        enabled = spam_checker.should_check_in_request()
                         if enabled and spam_checker.is_spam(text, **spam_checker_params):
                             message = _('Spam was detected in the post')
                             raise exceptions.PermissionDenied(message)
@@ -502,11 +496,7 @@ def answer(request, id, form_class=forms.AnswerForm):#process a new answer
     if askbot_settings.READ_ONLY_MODE_ENABLED:
         return HttpResponseRedirect(question.get_absolute_url())
 
-    if request.method == 'GET':
-        #session key used only to enable anonymous asking
-        #as django will autodelete empty sessions
-        request.session['askbot_write_intent'] = True
-    elif request.method == 'POST':
+    if request.method == 'POST':
 
         #this check prevents backward compatilibility
         if form_class == forms.AnswerForm:
@@ -529,7 +519,7 @@ def answer(request, id, form_class=forms.AnswerForm):#process a new answer
                 try:
                     text = form.cleaned_data['text']
                     spam_checker_params = spam_checker.get_params_from_request(request)
-                    enabled = askbot_settings.SPAM_FILTER_ENABLED
+                    enabled = spam_checker.should_check_in_request()
                     if enabled and spam_checker.is_spam(text, **spam_checker_params):
                         message = _('Spam was detected in the post')
                         raise exceptions.PermissionDenied(message)
@@ -554,14 +544,11 @@ def answer(request, id, form_class=forms.AnswerForm):#process a new answer
                 except exceptions.PermissionDenied as e:
                     request.user.message_set.create(message = str(e))
             else:
-                if request.session.session_key is None:
-                    return HttpResponseForbidden()
-
                 models.AnonymousAnswer.objects.create(
                     question=question,
                     wiki=form.cleaned_data['wiki'],
                     text=form.cleaned_data['text'],
-                    session_key=request.session.session_key,
+                    session_key=get_or_create_session_key(request),
                     ip_addr=request.META.get('REMOTE_ADDR'),
                 )
                 # in this case automatically show newest answer on top, due to
@@ -678,7 +665,7 @@ def post_comments(request):#generic ajax handler to load comments to an object
 
             text = form.cleaned_data['comment']
             spam_checker_params = spam_checker.get_params_from_request(request)
-            enabled = askbot_settings.SPAM_FILTER_ENABLED
+            enabled = spam_checker.should_check_in_request()
             if enabled and spam_checker.is_spam(text, **spam_checker_params):
                 message = _('Spam was detected in the post')
                 raise exceptions.PermissionDenied(message)
@@ -713,7 +700,7 @@ def edit_comment(request):
         raise exceptions.PermissionDenied('This content is forbidden')
 
     spam_checker_params = spam_checker.get_params_from_request(request)
-    enabled = askbot_settings.SPAM_FILTER_ENABLED
+    enabled = spam_checker.should_check_in_request()
     if enabled and spam_checker.is_spam(form.cleaned_data['comment'], **spam_checker_params):
         message = _('Spam was detected in the post')
         raise exceptions.PermissionDenied(message)